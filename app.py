@@ -4,57 +4,96 @@ A complete grocery shop management system with customer website, chatbot, and ad
 PostgreSQL + Flask-SQLAlchemy + Flask-Migrate
 """
 
+import time
+_import_started = time.perf_counter()
+
 import os
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
 from functools import wraps
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
+import click
+from flask import (
+    Flask, render_template, request, redirect, url_for, flash, session, jsonify,
+    Response, stream_with_context
+)
 from werkzeug.security import generate_password_hash, check_password_hash
-from werkzeug.utils import secure_filename
 from flask_migrate import Migrate
-from cloudinary_helper import upload_image, CLOUDINARY_ENABLED
 
 from config import Config
+from catalog_cache import get_catalog
+from page_cache import cached_page
+from query_stats import init_query_stats
+from metrics import init_metrics, ORDERS_PLACED, CHATBOT_QUERIES
+from settings_registry import get_settings
+from image_pipeline import (
+    ingest_product_image, derive_product_image, release_product_image, get_uploader,
+    submit_image_job, resume_image_jobs
+)
+from image_storage import save_upload, is_same_image, collect_garbage
+from image_derivatives import product_image, backfill_derivatives, PILLOW_ENABLED
+from static_assets import asset_url, serve_asset
+from order_export import EXPORT_FORMATS, generate_export
+from sales_rollups import get_sales_summary, recompute_rollups
+from cart_pricing import quote_cart, price_order, to_paise
+from order_events import init_order_events, open_order_stream
+from customer_orders import (
+    get_customer_orders, get_customer_orders_version, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+)
 from models import (
     db, init_db, get_all_products, get_product_by_id, search_products,
     add_product, update_product, delete_product, get_products_count,
-    create_order, get_all_orders, get_orders_count, delete_order, update_order_status,
+    create_order, get_all_orders, get_orders_page, get_recent_orders, get_orders_count, delete_order, update_order_status,
     get_admin_by_username, get_all_admins, add_admin, delete_admin, get_admins_count,
     is_master_admin, get_admin_by_id, toggle_product_availability, get_available_products,
-    get_unavailable_count, get_shop_timings, update_setting, get_all_settings,
-    get_orders_by_mobile, add_customer_care_issue, get_all_customer_care_issues,
+    get_unavailable_count, get_shop_timings, update_settings,
+    get_orders_by_mobile, normalize_mobile, add_customer_care_issue, get_all_customer_care_issues,
     get_customer_care_issue_by_id, get_customer_care_issues_by_status,
     update_customer_care_issue, delete_customer_care_issue, get_open_customer_care_count,
-    add_contact_message, get_all_contact_messages, get_contact_message_by_id,
+    add_contact_message, get_all_contact_messages, get_contact_messages_by_email, get_contact_message_by_id,
     mark_contact_message_read, reply_to_contact_message, delete_contact_message,
-    get_unread_contact_count
+    get_unread_contact_count, get_recent_image_jobs, get_image_job_counts, get_image_job_by_id,
+    requeue_image_jobs, touch_catalog, get_order_by_id, claim_idempotency_key, idempotency_fingerprint,
+    purge_idempotency_keys, OutOfStockError, set_product_stock, get_stock_levels
 )
 
 
-app = Flask(__name__)
-app.config.from_object(Config)
+migrate = Migrate()
 
-# Initialize SQLAlchemy and Migrate
-db.init_app(app)
-migrate = Migrate(app, db)
 
-# Create tables at startup (for production on Render)
-with app.app_context():
-    db.create_all()
-    # Create default settings if not exist
-    from models import _create_default_settings, get_admin_by_username, add_admin
-    _create_default_settings()
+def create_app(config_object=Config):
+    """
+    Create and configure the Flask application.
+
+    Touches no database: migrations, default settings and the master admin
+    are run once per deploy by `flask bootstrap` (build.setup_database),
+    not by every worker that imports this module.
+    """
+    app = Flask(__name__)
+    app.config.from_object(config_object)
     
-    # Create default admin if not exists
-    admin_username = os.getenv('ADMIN_USERNAME', 'admin')
-    admin_password = os.getenv('ADMIN_PASSWORD')
-    if admin_password and not get_admin_by_username(admin_username):
-        password_hash = generate_password_hash(admin_password)
-        add_admin(admin_username, password_hash, is_master=True)
-        print(f"Master admin created: {admin_username}")
+    # Initialize SQLAlchemy and Migrate
+    db.init_app(app)
+    migrate.init_app(app, db)
+    init_query_stats(app)
+    init_metrics(app)
+    init_order_events(app)
+    
+    # Ensure upload folder exists
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    return app
 
-# Ensure upload folder exists
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+
+# Routes below are registered on this instance, so their endpoint names
+# (used by url_for in every template) stay unprefixed
+app = create_app()
+
+# Orders shown per page in the admin panel
+ORDERS_PER_PAGE = 50
+
+@app.context_processor
+def template_helpers():
+    """Helpers available in every template."""
+    return {'product_image': product_image, 'asset_url': asset_url}
 
 def allowed_file(filename):
     """Check if file extension is allowed."""
@@ -70,14 +109,23 @@ def admin_required(f):
             return redirect(url_for('admin_login'))
         return f(*args, **kwargs)
     return decorated_function
+# ==================== Asset Routes ====================
+
+@app.route('/assets/<path:filename>')
+def asset(filename):
+    """Fingerprinted static files (see static_assets.asset_url)."""
+    return serve_asset(filename)
+
 # ==================== about Routes ====================
 
 @app.route("/about")
+@cached_page()
 def about():
     return render_template("about.html")
 
 
 @app.route("/contact", methods=['GET', 'POST'])
+@cached_page()
 def contact():
     if request.method == 'POST':
         # Handle contact form submission
@@ -109,17 +157,16 @@ def check_reply():
     """Customer can check their message replies."""
     messages = []
     email = None
+    next_before_id = None
     
     if request.method == 'POST':
         email = request.form.get('email', '').strip()
         if email:
-            # Search for all messages from this email
-            all_msgs = get_all_contact_messages()
-            messages = [msg for msg in all_msgs if msg.email.lower() == email.lower()]
-            if not messages:
-                messages = []
+            # Indexed lookup of this email's messages, one page at a time
+            before_id = request.form.get('before_id', type=int)
+            messages, next_before_id = get_contact_messages_by_email(email, before_id=before_id)
     
-    return render_template("check_reply.html", messages=messages, email=email)
+    return render_template("check_reply.html", messages=messages, email=email, next_before_id=next_before_id)
 
 
 @app.route("/customer-care")
@@ -166,23 +213,26 @@ def report_customer_care_issue():
 # ==================== Customer Routes ====================
 
 @app.route('/')
+@cached_page('catalog', 'settings')
 def index():
     """Home page with featured products (only available ones)."""
-    products = get_available_products()
+    products = get_catalog().available
     shop_timings = get_shop_timings()
     return render_template('index.html', products=products[:8], shop=shop_timings)
 
 @app.route('/products')
+@cached_page('catalog', params=('search',))
 def products():
     """All products page."""
     search_query = request.args.get('search', '')
     if search_query:
         products_list = search_products(search_query)
     else:
-        products_list = get_all_products()
+        products_list = get_catalog().products
     return render_template('products.html', products=products_list, search_query=search_query)
 
 @app.route('/checkout')
+@cached_page()
 def checkout():
     """Checkout page."""
     return render_template('checkout.html')
@@ -193,54 +243,141 @@ def my_orders():
     return render_template('my_orders.html')
 
 @app.route('/api/my-orders/<mobile>')
-def get_customer_orders(mobile):
-    """API endpoint to get orders by mobile number."""
+def get_customer_orders_api(mobile):
+    """API endpoint to get orders by mobile number (paginated, ETag-cached)."""
     try:
-        orders = get_orders_by_mobile(mobile)
-        orders_list = []
-        for order in orders:
-            orders_list.append({
-                'id': order.id,
-                'customer_name': order.customer_name,
-                'mobile': order.mobile,
-                'address': order.address,
-                'items': order.items,
-                'total': order.total,
-                'status': order.status,
-                'created_at': order.date.isoformat() if order.date else None
-            })
-        return jsonify({'success': True, 'orders': orders_list})
+        mobile = normalize_mobile(mobile)
+        if len(mobile) != 10:
+            return jsonify({'success': False, 'message': 'कृपया 10 अंकों का मोबाइल नंबर डालें (Enter a 10 digit mobile number)'}), 400
+        
+        cursor = request.args.get('after') or None
+        limit = min(max(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+        
+        generation, etag = get_customer_orders_version(mobile, cursor, limit)
+        if request.if_none_match.contains(etag):
+            response = app.response_class(status=304)
+        else:
+            page = get_customer_orders(mobile, cursor, limit, generation=generation)
+            response = jsonify({'success': True, 'orders': page['orders'], 'next_cursor': page['next_cursor']})
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
+def json_object():
+    """The request's JSON body if it is an object, else None (missing, malformed, a list...)."""
+    data = request.get_json(silent=True)
+    return data if isinstance(data, dict) else None
+
+def invalid_request():
+    """400 response for a JSON API request whose body is not a usable object."""
+    return jsonify({'success': False, 'message': 'अनुरोध सही नहीं है (Invalid request body)'}), 400
+
+@app.route('/api/cart/quote', methods=['POST'])
+def cart_quote():
+    """API endpoint that prices a whole cart ({items: [{id, qty}]}) in one request."""
+    data = json_object()
+    if data is None:
+        return invalid_request()
+    try:
+        quote = quote_cart(data.get('items', []))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return jsonify({'success': True, **quote.to_dict()})
+
 @app.route('/api/place-order', methods=['POST'])
 def place_order():
-    """API endpoint to place an order."""
+    """
+    API endpoint to place an order.
+
+    An Idempotency-Key header makes retries safe: a repeat of the same
+    request within IDEMPOTENCY_KEY_TTL_HOURS gets the first order back
+    (with Idempotent-Replayed: true) instead of creating another.
+    """
     try:
-        data = request.get_json()
+        data = json_object()
+        if data is None:
+            return invalid_request()
         
-        customer_name = data.get('customer_name', '').strip()
-        mobile = data.get('mobile', '').strip()
-        address = data.get('address', '').strip()
+        customer_name, mobile, address = (data.get(key) or '' for key in ('customer_name', 'mobile', 'address'))
+        if not all(isinstance(value, str) for value in (customer_name, mobile, address)):
+            return invalid_request()
+        customer_name, mobile, address = customer_name.strip(), mobile.strip(), address.strip()
         items = data.get('items', [])
-        total = data.get('total', 0)
+        total = data.get('total')  # What the customer saw; checked against the catalog price
         payment_method = data.get('payment_method', 'cod')
         
         if not customer_name or not mobile or not address or not items:
             return jsonify({'success': False, 'message': 'सभी फील्ड भरें (Please fill all fields)'}), 400
         
-        # Save order to database with payment method
-        order_id = create_order(customer_name, mobile, address, items, total, payment_method)
+        idempotency_key = request.headers.get('Idempotency-Key', '').strip() or None
+        if idempotency_key:
+            if len(idempotency_key) > 100 or not (idempotency_key.isascii() and idempotency_key.isprintable()):
+                return jsonify({'success': False, 'message': 'Invalid Idempotency-Key'}), 400
+            request_hash = idempotency_fingerprint(data)
+            ttl = timedelta(hours=app.config['IDEMPOTENCY_KEY_TTL_HOURS'])
+            existing = claim_idempotency_key(idempotency_key, request_hash, ttl)
+            if existing is not None:
+                return replay_order(existing, request_hash)
+        
+        # Names and prices come from the products table, not the browser's cart
+        try:
+            quote = price_order(items)
+            total_changed = total is not None and to_paise(total) != quote.total_paise
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'success': False, 'message': str(e)}), 400
+        if quote.problems or total_changed:
+            return cart_changed(quote)
+        
+        # Save order to database with payment method, taking it out of stock
+        try:
+            order_id = create_order(customer_name, mobile, address, quote.order_items(), quote.total,
+                                    payment_method, idempotency_key, reserve=quote.reserve)
+        except OutOfStockError:
+            # Another order took the last units after this cart was priced
+            db.session.rollback()
+            return cart_changed(price_order(items))
+        ORDERS_PLACED.inc()
         
         return jsonify({
             'success': True,
             'order_id': order_id,
             'payment_method': payment_method,
-            'total': total
+            'total': quote.total
         })
     except Exception as e:
+        db.session.rollback()
         return jsonify({'success': False, 'message': str(e)}), 500
 
+def cart_changed(quote):
+    """409 response with the current quote for a cart that cannot be ordered as sent."""
+    # Nothing was ordered; the rollback also releases the Idempotency-Key
+    db.session.rollback()
+    message = ('कुछ सामान उपलब्ध नहीं हैं या स्टॉक कम है (Some items are unavailable or out of stock)' if quote.problems
+               else 'दाम बदल गए हैं, कृपया कार्ट दोबारा देखें (Prices have changed, please review your cart)')
+    return jsonify({'success': False, 'message': message, 'quote': quote.to_dict()}), 409
+
+def replay_order(existing, request_hash):
+    """Response for a place-order request whose Idempotency-Key was already used."""
+    if existing.request_hash != request_hash:
+        return jsonify({
+            'success': False,
+            'message': 'यह Idempotency-Key दूसरे ऑर्डर के लिए इस्तेमाल हो चुकी है (Idempotency-Key was used for a different order)'
+        }), 422
+    order = get_order_by_id(existing.order_id) if existing.order_id else None
+    if order is None:
+        return jsonify({'success': False, 'message': 'ऑर्डर नहीं मिला (Order no longer exists)'}), 409
+    response = jsonify({
+        'success': True,
+        'order_id': order.id,
+        'payment_method': order.payment_method,
+        'total': order.total
+    })
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
 @app.route('/api/chatbot', methods=['POST'])
 def chatbot():
     """Chatbot API endpoint."""
@@ -248,19 +385,23 @@ def chatbot():
     user_message = data.get('message', '').strip().lower()
     
     if not user_message:
+        CHATBOT_QUERIES.inc(intent='empty')
         return jsonify({'reply': 'कृपया कुछ टाइप करें (Please type something)'})
     
     # Greetings
     greetings = ['hi', 'hello', 'नमस्ते', 'हेलो', 'हाय']
     if any(greet in user_message for greet in greetings):
+        CHATBOT_QUERIES.inc(intent='greeting')
         return jsonify({'reply': 'नमस्ते! 🙏 Shivkumar Kirana Store में आपका स्वागत है। आप किस सामान का दाम जानना चाहते हैं?'})
     
     # Help
     if 'help' in user_message or 'मदद' in user_message:
+        CHATBOT_QUERIES.inc(intent='help')
         return jsonify({'reply': 'आप किसी भी सामान का नाम टाइप करें, मैं उसका दाम बताऊंगा। जैसे: "चावल", "आटा", "तेल" आदि।'})
     
     # Search for product
     products = search_products(user_message)
+    CHATBOT_QUERIES.inc(intent='product' if products else 'not_found')
     
     if products:
         if len(products) == 1:
@@ -314,20 +455,48 @@ def admin_logout():
 @admin_required
 def admin_dashboard():
     """Admin dashboard."""
+    sales = get_sales_summary()
     stats = {
-        'products': get_products_count(),
-        'orders': get_orders_count(),
+        'products': len(get_catalog(max_age=0).products),
+        'orders': sales['totals']['order_count'],
         'admins': get_admins_count()
     }
-    recent_orders = get_all_orders()[:5]
-    return render_template('admin/dashboard.html', stats=stats, recent_orders=recent_orders)
+    recent_orders = get_recent_orders(5)
+    return render_template('admin/dashboard.html', stats=stats, sales=sales, recent_orders=recent_orders)
 
 @app.route('/admin/products')
 @admin_required
 def admin_products():
     """Admin product management."""
-    products_list = get_all_products()
-    return render_template('admin/products.html', products=products_list)
+    products_list = get_catalog(max_age=0).products
+    return render_template('admin/products.html', products=products_list, stock=get_stock_levels())
+
+def staged_image_from_request():
+    """Save the request's product image to the upload folder, if one was sent."""
+    file = request.files.get('image')
+    if not (file and file.filename and allowed_file(file.filename)):
+        return None
+    if get_uploader() is None:
+        flash('चेतावनी: Cloudinary कनेक्ट नहीं है। इमेज कुछ समय बाद डिलीट हो सकती है (Warning: Image persistence disabled)', 'warning')
+    filename, _ = save_upload(file)
+    return filename
+
+def stock_from_form(field='stock'):
+    """
+    Read a stock count from the product form.
+
+    Returns:
+        int or None: The count, or None if the field was left empty (not tracked)
+
+    Raises:
+        ValueError: If it is not a whole number of zero or more
+    """
+    value = request.form.get(field, '').strip()
+    if not value:
+        return None
+    if not value.isdigit():
+        raise ValueError(value)
+    return int(value)
 
 @app.route('/admin/products/add', methods=['GET', 'POST'])
 @admin_required
@@ -342,28 +511,18 @@ def admin_add_product():
         except ValueError:
             flash('कृपया सही कीमत दर्ज करें (Enter valid price)', 'error')
             return redirect(url_for('admin_add_product'))
+        try:
+            stock = stock_from_form()
+        except ValueError:
+            flash('कृपया सही स्टॉक दर्ज करें (Enter a valid stock count)', 'error')
+            return redirect(url_for('admin_add_product'))
         
-        # Handle image upload - use Cloudinary if configured
-        image_filename = 'default.png'
-        if 'image' in request.files:
-            file = request.files['image']
-            if file and file.filename and allowed_file(file.filename):
-                # Check if Cloudinary is enabled
-                if not CLOUDINARY_ENABLED:
-                    flash('चेतावनी: Cloudinary कनेक्ट नहीं है। इमेज कुछ समय बाद डिलीट हो सकती है (Warning: Image persistence disabled)', 'warning')
-                
-                # Try Cloudinary first
-                cloudinary_url = upload_image(file)
-                if cloudinary_url:
-                    image_filename = cloudinary_url
-                else:
-                    # Fallback to local storage
-                    filename = secure_filename(file.filename)
-                    filename = f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{filename}"
-                    file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
-                    image_filename = filename
+        # Save the image locally; it is shown until the background upload swaps it
+        image_filename = staged_image_from_request()
         
-        add_product(name, price, image_filename)
+        product_id = add_product(name, price, image_filename or 'default.png', stock)
+        if image_filename and ingest_product_image(product_id, image_filename) is None:
+            derive_product_image(image_filename)
         flash(f'"{name}" सफलतापूर्वक जोड़ा गया (Product added)', 'success')
         return redirect(url_for('admin_products'))
     
@@ -387,28 +546,29 @@ def admin_edit_product(product_id):
         except ValueError:
             flash('कृपया सही कीमत दर्ज करें (Enter valid price)', 'error')
             return redirect(url_for('admin_edit_product', product_id=product_id))
+        try:
+            stock = stock_from_form()
+            # What the form showed: orders may have sold some since, which an unchanged field must not undo
+            stock_changed = stock != stock_from_form('stock_shown')
+        except ValueError:
+            flash('कृपया सही स्टॉक दर्ज करें (Enter a valid stock count)', 'error')
+            return redirect(url_for('admin_edit_product', product_id=product_id))
         
-        # Handle image upload - use Cloudinary if configured
-        image_filename = None
-        if 'image' in request.files:
-            file = request.files['image']
-            if file and file.filename and allowed_file(file.filename):
-                # Check if Cloudinary is enabled
-                if not CLOUDINARY_ENABLED:
-                    flash('चेतावनी: Cloudinary कनेक्ट नहीं है। इमेज कुछ समय बाद डिलीट हो सकती है (Warning: Image persistence disabled)', 'warning')
-
-                # Try Cloudinary first
-                cloudinary_url = upload_image(file)
-                if cloudinary_url:
-                    image_filename = cloudinary_url
-                else:
-                    # Fallback to local storage
-                    filename = secure_filename(file.filename)
-                    filename = f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{filename}"
-                    file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
-                    image_filename = filename
+        # Save the image locally; it is shown until the background upload swaps it
+        image_filename = staged_image_from_request()
+        old_image = product.image
+        if image_filename and is_same_image(old_image, image_filename):
+            # Same picture uploaded again: keep the current copy
+            release_product_image(image_filename)
+            image_filename = None
         
         update_product(product_id, name, price, image_filename)
+        if stock_changed:
+            set_product_stock(product_id, stock)
+        if image_filename:
+            if ingest_product_image(product_id, image_filename) is None:
+                derive_product_image(image_filename)
+            release_product_image(old_image)
         flash(f'"{name}" अपडेट हो गया (Product updated)', 'success')
         return redirect(url_for('admin_products'))
     
@@ -420,32 +580,83 @@ def admin_delete_product(product_id):
     """Delete product."""
     product = get_product_by_id(product_id)
     if product:
+        image = product.image
         delete_product(product_id)
+        release_product_image(image)
         flash('प्रोडक्ट डिलीट हो गया (Product deleted)', 'success')
     return redirect(url_for('admin_products'))
 
+def order_filters_from_request():
+    """
+    Read admin order filters from the query string.
+
+    Returns:
+        tuple: (filters as submitted, filters parsed for models.filter_orders)
+    """
+    filters = {
+        'status': request.args.get('status', '').strip(),
+        'payment_method': request.args.get('payment_method', '').strip(),
+        'mobile': request.args.get('mobile', '').strip(),
+        'date_from': request.args.get('date_from', '').strip(),
+        'date_to': request.args.get('date_to', '').strip()
+    }
+    query_filters = dict(filters)
+    for key in ('date_from', 'date_to'):
+        try:
+            query_filters[key] = datetime.strptime(filters[key], '%Y-%m-%d').date() if filters[key] else None
+        except ValueError:
+            query_filters[key] = None
+            filters[key] = ''
+    return filters, query_filters
+
 @app.route('/admin/orders')
 @admin_required
 def admin_orders():
-    """Admin order management."""
-    orders_list = get_all_orders()
-    # Parse JSON items for display
-    orders_parsed = []
-    for order in orders_list:
-        order_dict = {
-            'id': order.id,
-            'customer_name': order.customer_name,
-            'mobile': order.mobile,
-            'address': order.address,
-            'items': order.items,
-            'total': order.total,
-            'payment_method': order.payment_method,
-            'status': order.status,
-            'date': order.date
+    """Admin order management (filtered, one page at a time)."""
+    filters, query_filters = order_filters_from_request()
+    
+    page = get_orders_page(
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        limit=ORDERS_PER_PAGE,
+        **query_filters
+    )
+    active_filters = {key: value for key, value in filters.items() if value}
+    return render_template('admin/orders.html', orders=page['orders'], filters=filters,
+                           active_filters=active_filters, next_cursor=page['next_cursor'],
+                           prev_cursor=page['prev_cursor'])
+
+@app.route('/admin/orders/events')
+@admin_required
+def admin_order_events():
+    """Live feed of new orders and status changes (Server-Sent Events)."""
+    stream = open_order_stream()
+    # The stream stays open for minutes: give the database connection back now
+    db.session.remove()
+    return Response(stream, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/admin/orders/export')
+@admin_required
+def admin_export_orders():
+    """Stream the (filtered) orders as CSV or JSON Lines."""
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        flash('Unknown export format', 'error')
+        return redirect(url_for('admin_orders'))
+    with_items = request.args.get('items') == '1'
+    _, query_filters = order_filters_from_request()
+    
+    filename = f"orders_{datetime.now().strftime('%Y%m%d%H%M%S')}.{export_format}"
+    chunks = generate_export(export_format, with_items=with_items, **query_filters)
+    return Response(
+        stream_with_context(chunks),
+        mimetype=EXPORT_FORMATS[export_format],
+        headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'X-Accel-Buffering': 'no'
         }
-        order_dict['items_list'] = json.loads(order.items)
-        orders_parsed.append(order_dict)
-    return render_template('admin/orders.html', orders=orders_parsed)
+    )
 
 @app.route('/admin/orders/delete/<int:order_id>', methods=['POST'])
 @admin_required
@@ -462,7 +673,14 @@ def admin_update_order_status(order_id):
     status = request.form.get('status', 'pending')
     valid_statuses = ['pending', 'confirmed', 'delivered', 'cancelled']
     if status in valid_statuses:
-        update_order_status(order_id, status)
+        try:
+            update_order_status(order_id, status)
+        except OutOfStockError as e:
+            # Reviving a cancelled order needs its stock back
+            db.session.rollback()
+            flash(f'स्टॉक नहीं बचा, ऑर्डर #{order_id} नहीं बदला '
+                  f'(Product #{e.product_id} is out of stock, order not changed)', 'error')
+            return redirect(url_for('admin_orders'))
         status_names = {'pending': 'Pending', 'confirmed': 'Confirmed', 'delivered': 'Delivered', 'cancelled': 'Cancelled'}
         flash(f'Order #{order_id} status updated to {status_names[status]}', 'success')
     return redirect(url_for('admin_orders'))
@@ -472,21 +690,37 @@ def admin_update_order_status(order_id):
 @admin_required
 def admin_availability():
     """Product availability management."""
-    products_list = get_all_products()
-    unavailable_count = get_unavailable_count()
-    return render_template('admin/availability.html', products=products_list, unavailable_count=unavailable_count)
+    catalog = get_catalog(max_age=0)
+    return render_template('admin/availability.html', products=catalog.products,
+                           unavailable_count=catalog.unavailable_count, stock=get_stock_levels())
 
 @app.route('/admin/availability/toggle/<int:product_id>', methods=['POST'])
 @admin_required
 def admin_toggle_availability(product_id):
     """Toggle product availability."""
-    product = get_product_by_id(product_id)
+    product = toggle_product_availability(product_id)
     if product:
-        new_status = toggle_product_availability(product_id)
-        status_text = "उपलब्ध (Available)" if new_status else "उपलब्ध नहीं (Unavailable)"
+        status_text = "उपलब्ध (Available)" if product.is_available else "उपलब्ध नहीं (Unavailable)"
         flash(f'"{product.name}" अब {status_text}', 'success')
     return redirect(url_for('admin_availability'))
 
+@app.route('/admin/image-jobs')
+@admin_required
+def admin_image_jobs():
+    """Status of background image uploads."""
+    jobs = get_recent_image_jobs(limit=100)
+    counts = get_image_job_counts()
+    return render_template('admin/image_jobs.html', jobs=jobs, counts=counts)
+
+@app.route('/admin/image-jobs/retry/<int:job_id>', methods=['POST'])
+@admin_required
+def admin_retry_image_job(job_id):
+    """Queue a failed image upload again."""
+    if job_id in requeue_image_jobs(job_id=job_id):
+        submit_image_job(job_id)
+        flash('अपलोड फिर से शुरू (Upload queued again)', 'success')
+    return redirect(url_for('admin_image_jobs'))
+
 @app.route('/admin/settings', methods=['GET', 'POST'])
 @admin_required
 def admin_settings():
@@ -496,14 +730,19 @@ def admin_settings():
         close_time = request.form.get('close_time', '21:00')
         phone = request.form.get('phone', '')
         
-        update_setting('shop_open_time', open_time)
-        update_setting('shop_close_time', close_time)
-        update_setting('shop_phone', phone)
-        
-        flash('सेटिंग्स अपडेट हो गई (Settings updated)', 'success')
+        try:
+            update_settings({
+                'shop_open_time': open_time,
+                'shop_close_time': close_time,
+                'shop_phone': phone
+            })
+            flash('सेटिंग्स अपडेट हो गई (Settings updated)', 'success')
+        except ValueError:
+            db.session.rollback()
+            flash('गलत समय (Invalid time, use HH:MM)', 'error')
         return redirect(url_for('admin_settings'))
     
-    settings = get_all_settings()
+    settings = get_settings(max_age=0)
     return render_template('admin/settings.html', settings=settings)
 
 @app.route('/admin/admins')
@@ -589,28 +828,10 @@ def setup_default_admin():
 
 def setup_sample_products():
     """Add sample products if database is empty."""
-    from models import get_products_count, add_product
-    
-    if get_products_count() == 0:
-        sample_products = [
-            ('चावल (Rice) - 1kg', 60),
-            ('गेहूं आटा (Wheat Flour) - 1kg', 45),
-            ('चीनी (Sugar) - 1kg', 50),
-            ('नमक (Salt) - 1kg', 25),
-            ('सरसों तेल (Mustard Oil) - 1L', 180),
-            ('दाल (Toor Dal) - 1kg', 140),
-            ('चाय पत्ती (Tea) - 250g', 80),
-            ('हल्दी (Turmeric) - 100g', 35),
-            ('मिर्च पाउडर (Chili Powder) - 100g', 40),
-            ('धनिया पाउडर (Coriander) - 100g', 30),
-            ('साबुन (Soap)', 35),
-            ('शैम्पू (Shampoo)', 120),
-        ]
-        
-        for name, price in sample_products:
-            add_product(name, price)
-        
-        print(f"Added {len(sample_products)} sample products")
+    from models import add_sample_products
+    added = add_sample_products()
+    if added:
+        print(f"Added {added} sample products")
 
 
 # ==================== Admin Customer Care Routes ====================
@@ -725,14 +946,129 @@ def admin_delete_contact_message(msg_id):
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
+# ==================== CLI Commands ====================
+
+@app.cli.command('export-orders')
+@click.option('--format', 'export_format', type=click.Choice(sorted(EXPORT_FORMATS)), default='csv')
+@click.option('--items', 'with_items', is_flag=True, help='Include line items.')
+@click.option('--output', '-o', type=click.File('w', encoding='utf-8'), default='-', help='Output file (default: stdout).')
+@click.option('--status', default=None)
+@click.option('--payment-method', default=None)
+@click.option('--mobile', default=None)
+@click.option('--date-from', type=click.DateTime(['%Y-%m-%d']), default=None)
+@click.option('--date-to', type=click.DateTime(['%Y-%m-%d']), default=None)
+def export_orders_command(export_format, with_items, output, status, payment_method, mobile, date_from, date_to):
+    """Stream orders to a CSV or JSON Lines file."""
+    chunks = generate_export(
+        export_format, with_items=with_items, status=status, payment_method=payment_method,
+        mobile=mobile, date_from=date_from.date() if date_from else None,
+        date_to=date_to.date() if date_to else None
+    )
+    for chunk in chunks:
+        output.write(chunk)
+
+@app.cli.command('recompute-rollups')
+def recompute_rollups_command():
+    """Rebuild the dashboard sales rollups from the orders table."""
+    written = recompute_rollups()
+    click.echo(f"Rebuilt {written} rollup rows")
+
+@app.cli.command('purge-idempotency-keys')
+def purge_idempotency_keys_command():
+    """Delete order idempotency keys past their TTL."""
+    click.echo(f"Deleted {purge_idempotency_keys()} expired idempotency keys")
+
+@app.cli.command('image-jobs')
+def image_jobs_command():
+    """Retry failed and interrupted image uploads and wait for them."""
+    app.config['IMAGE_UPLOAD_WORKERS'] = 0  # Run each job inline
+    job_ids = resume_image_jobs()
+    done = sum(get_image_job_by_id(job_id).status == 'done' for job_id in job_ids)
+    click.echo(f"Processed {len(job_ids)} image jobs, {done} uploaded")
+
+@app.cli.command('derive-images')
+@click.option('--force', is_flag=True, help='Regenerate existing variants.')
+def derive_images_command(force):
+    """Create resized WebP/JPEG variants of every local product image."""
+    if not PILLOW_ENABLED:
+        raise click.ClickException("Pillow is not installed")
+    upload_folder = app.config['UPLOAD_FOLDER']
+    sources = {
+        product.image for product in get_all_products()
+        if product.image and product.image != 'default.png' and not product.image.startswith('http')
+    }
+    sources.update(
+        name for name in os.listdir(upload_folder)
+        if os.path.isfile(os.path.join(upload_folder, name)) and allowed_file(name)
+    )
+    generated, skipped = backfill_derivatives(sorted(sources), force=force)
+    if generated:
+        touch_catalog()
+    click.echo(f"Variants ready for {generated} images, {skipped} skipped")
+
+@app.cli.command('gc-images')
+@click.option('--delete', 'delete', is_flag=True, help='Actually delete (default is a dry run).')
+@click.option('--min-age', default=60, show_default=True, help='Skip files younger than this many minutes.')
+@click.option('--skip-cloudinary', is_flag=True, help='Only collect local files.')
+def gc_images_command(delete, min_age, skip_cloudinary):
+    """Delete image files and Cloudinary assets no product uses."""
+    garbage = collect_garbage(
+        dry_run=not delete, min_age=timedelta(minutes=min_age), include_cloudinary=not skip_cloudinary
+    )
+    verb = 'Deleted' if delete else 'Would delete'
+    for kind in ('local', 'derived', 'cloudinary'):
+        for name in garbage[kind]:
+            click.echo(f"{verb} {kind}: {name}")
+    click.echo(f"{verb} {len(garbage['local'])} local files, {len(garbage['derived'])} variants, "
+               f"{len(garbage['cloudinary'])} Cloudinary images")
+
+@app.cli.command('bootstrap')
+@click.option('--skip-assets', is_flag=True, help='Only set up the database.')
+def bootstrap_command(skip_assets):
+    """Run migrations, create default settings and the master admin (once per deploy)."""
+    from build import setup_database, build_assets
+    started = time.perf_counter()
+    setup_database()
+    if not skip_assets:
+        build_assets()
+    click.echo(f"Bootstrap finished in {time.perf_counter() - started:.2f}s")
+
+@app.cli.command('datagen')
+@click.option('--products', default=0, show_default=True, help='Products to add.')
+@click.option('--orders', default=0, show_default=True, help='Orders to add.')
+@click.option('--customers', default=1000, show_default=True, help='Distinct customer mobiles.')
+@click.option('--issues', default=0, show_default=True, help='Customer care issues to add.')
+@click.option('--messages', default=0, show_default=True, help='Contact messages to add.')
+@click.option('--items', type=click.Choice(['both', 'json']), default='both', show_default=True,
+              help='Order items as JSON plus order_items rows, or JSON only (pre-order_items data).')
+@click.option('--seed', default=42, show_default=True)
+@click.option('--batch-size', default=50000, show_default=True, help='Rows per COPY/executemany.')
+@click.option('--reset', is_flag=True, help='Delete products, orders, issues and messages first.')
+@click.option('--force', is_flag=True, help='Run even when FLASK_ENV is production.')
+def datagen_command(products, orders, customers, issues, messages, items, seed, batch_size, reset, force):
+    """Bulk-load synthetic products, orders, issues and messages for scale testing."""
+    from datagen import generate
+    if os.environ.get('FLASK_ENV') == 'production' and not force:
+        raise click.ClickException("Refusing to generate data in production (use --force)")
+    try:
+        counts = generate(products, orders, customers, issues, messages, items, seed, reset, batch_size, click.echo)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Generated {sum(v for k, v in counts.items() if k != 'seconds')} rows in {counts['seconds']}s")
+
+# Time from the first import to a ready app, per process (logged by
+# gunicorn.conf.py once a worker has loaded it)
+STARTUP_SECONDS = time.perf_counter() - _import_started
+
 if __name__ == '__main__':
     with app.app_context():
         # Create tables (in case migrations haven't run)
         db.create_all()
         
         # Setup default data
-        from models import _create_default_settings
+        from models import _create_default_settings, _create_default_generations
         _create_default_settings()
+        _create_default_generations()
         setup_default_admin()
         setup_sample_products()
     
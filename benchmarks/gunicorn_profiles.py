@@ -0,0 +1,86 @@
+"""
+Gunicorn profile benchmark
+Starts the app under each gunicorn profile in turn and measures throughput
+and latency of the storefront pages.
+
+Usage:
+    python benchmarks/gunicorn_profiles.py
+    python benchmarks/gunicorn_profiles.py --duration 20 --concurrency 32
+    python benchmarks/gunicorn_profiles.py --profile sync-1 --profile gthread-auto
+    python benchmarks/gunicorn_profiles.py --page-cache   # measure cached pages
+
+Uses DATABASE_URL and SECRET_KEY from the environment / .env like the app
+itself; run `flask --app app bootstrap` against that database first. The
+page cache is switched off by default so every request renders and hits
+the database, which is what the worker settings are about.
+"""
+
+import argparse
+import json
+
+import loadgen
+from run import gunicorn_server
+
+# name -> environment for gunicorn.conf.py; 'auto' leaves WEB_CONCURRENCY
+# to the CPU/memory sizing
+PROFILES = {
+    'sync-1': {'GUNICORN_MODE': 'sync', 'WEB_CONCURRENCY': '1'},
+    'sync-auto': {'GUNICORN_MODE': 'sync'},
+    'gthread-1x4': {'GUNICORN_MODE': 'gthread', 'WEB_CONCURRENCY': '1', 'GUNICORN_THREADS': '4'},
+    'gthread-auto': {'GUNICORN_MODE': 'gthread', 'GUNICORN_THREADS': '4'},
+    'gthread-auto-x8': {'GUNICORN_MODE': 'gthread', 'GUNICORN_THREADS': '8'},
+}
+
+DEFAULT_PATHS = ['/', '/products', '/products?search=dal', '/api/my-orders/9876543210']
+
+
+def run_profile(name, port, args):
+    """Start gunicorn with one profile, warm it up and measure it."""
+    env = dict(PROFILES[name])
+    if not args.page_cache:
+        env['PAGE_CACHE_BACKEND'] = 'none'
+    # Let gunicorn.conf.py match the pool to the threads
+    env['DB_POOL_SIZE'] = ''
+
+    def make_request(rng):
+        return loadgen.request('GET', rng.choice(args.paths))
+
+    with gunicorn_server(port, env, args.verbose) as url:
+        loadgen.run(url, make_request, args.concurrency, args.warmup)
+        result = loadgen.run(url, make_request, args.concurrency, args.duration)
+    result['profile'] = name
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profile', action='append', choices=sorted(PROFILES),
+                        help='Profile to run (repeatable, default: all)')
+    parser.add_argument('--path', dest='paths', action='append', help='Path to request (repeatable)')
+    parser.add_argument('--concurrency', type=int, default=16, help='Concurrent clients (default 16)')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds measured per profile (default 10)')
+    parser.add_argument('--warmup', type=float, default=2, help='Unmeasured seconds first (default 2)')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--page-cache', action='store_true', help='Keep the page cache on')
+    parser.add_argument('--json', help='Also write the results to this file')
+    parser.add_argument('--verbose', action='store_true', help='Show gunicorn output')
+    args = parser.parse_args()
+    args.paths = args.paths or DEFAULT_PATHS
+
+    results = []
+    print(f"{'profile':<18}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for name in args.profile or list(PROFILES):
+        result = run_profile(name, args.port, args)
+        results.append(result)
+        failed = result['requests'] - result['ok'] + sum(result['errors'].values())
+        print(f"{name:<18}{result['req_per_sec']:>10}{result['p50_ms']:>10}"
+              f"{result['p95_ms']:>10}{result['p99_ms']:>10}{failed:>8}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'concurrency': args.concurrency, 'duration': args.duration,
+                       'paths': args.paths, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
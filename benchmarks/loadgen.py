@@ -0,0 +1,186 @@
+"""
+Asyncio HTTP load generator
+Raw HTTP/1.1 over asyncio streams with keep-alive connections, so the
+client costs little next to the server it measures.
+
+A scenario is a name plus a function returning the next Request; run()
+drives it from `concurrency` connections for a fixed time and returns
+throughput and latency percentiles.
+"""
+
+import asyncio
+import json
+import random
+import time
+from collections import Counter, namedtuple
+from urllib.parse import urlsplit
+
+
+Request = namedtuple('Request', ['method', 'path', 'body', 'headers'])
+
+
+def request(method, path, body=None, headers=None):
+    """Build a Request; dict/list bodies are sent as JSON."""
+    headers = dict(headers or {})
+    if isinstance(body, (dict, list)):
+        body = json.dumps(body).encode('utf-8')
+        headers.setdefault('Content-Type', 'application/json')
+    elif isinstance(body, str):
+        body = body.encode('utf-8')
+    return Request(method, path, body, headers)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a sorted list."""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, int(round(pct / 100 * len(values))) - 1))
+    return values[index]
+
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def send(self, req, timeout=30):
+        """
+        Send a request and read the whole response.
+
+        Returns:
+            tuple: (status, headers dict with lower-case names, body bytes)
+        """
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        lines = [f"{req.method} {req.path} HTTP/1.1", f"Host: {self.host}:{self.port}"]
+        lines += [f"{name}: {value}" for name, value in req.headers.items()]
+        if req.body is not None:
+            lines.append(f"Content-Length: {len(req.body)}")
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + (req.body or b''))
+        try:
+            return await asyncio.wait_for(self._read_response(), timeout)
+        except BaseException:
+            self.close()
+            raise
+
+    async def _read_response(self):
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("Server closed the connection")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            body = bytearray()
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    await self.reader.readline()
+                    break
+                body += await self.reader.readexactly(size)
+                await self.reader.readexactly(2)
+            body = bytes(body)
+        elif 'content-length' in headers:
+            body = await self.reader.readexactly(int(headers['content-length']))
+        else:
+            body = await self.reader.read()
+            self.close()
+
+        if headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status, headers, body
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+async def _worker(base, make_request, deadline, rng, latencies, statuses, errors):
+    conn = Connection(base.hostname, base.port or 80)
+    try:
+        while time.monotonic() < deadline:
+            req = make_request(rng)
+            started = time.perf_counter()
+            try:
+                status, _, _ = await conn.send(req)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, IndexError) as e:
+                errors[type(e).__name__] += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+            statuses[status] += 1
+    finally:
+        conn.close()
+
+
+async def run_async(url, make_request, concurrency=16, duration=10.0, seed=0):
+    """Coroutine behind run()."""
+    base = urlsplit(url)
+    latencies = []
+    statuses = Counter()
+    errors = Counter()
+    deadline = time.monotonic() + duration
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        _worker(base, make_request, deadline, random.Random(f"{seed}-{n}"), latencies, statuses, errors)
+        for n in range(concurrency)
+    ])
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    ms = [value * 1000 for value in latencies]
+    ok = sum(count for status, count in statuses.items() if status < 400)
+    return {
+        'requests': len(latencies),
+        'ok': ok,
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'errors': dict(errors),
+        'seconds': round(elapsed, 2),
+        'req_per_sec': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'mean_ms': round(sum(ms) / len(ms), 2) if ms else 0.0,
+        'p50_ms': round(percentile(ms, 50), 2),
+        'p95_ms': round(percentile(ms, 95), 2),
+        'p99_ms': round(percentile(ms, 99), 2),
+        'max_ms': round(ms[-1], 2) if ms else 0.0,
+    }
+
+
+def run(url, make_request, concurrency=16, duration=10.0, seed=0):
+    """
+    Drive one scenario.
+
+    Args:
+        url: Server base URL, e.g. http://127.0.0.1:8765
+        make_request: Callable taking a random.Random and returning a Request
+        concurrency: Simultaneous connections
+        duration: Seconds to run
+        seed: Seed for the per-connection random generators
+
+    Returns:
+        dict: requests, statuses, errors, req_per_sec and mean/p50/p95/p99/max in ms
+    """
+    return asyncio.run(run_async(url, make_request, concurrency, duration, seed))
+
+
+def send(url, req):
+    """Send a single request (setup steps such as logging in)."""
+    base = urlsplit(url)
+
+    async def once():
+        conn = Connection(base.hostname, base.port or 80)
+        try:
+            return await conn.send(req)
+        finally:
+            conn.close()
+
+    return asyncio.run(once())
@@ -0,0 +1,254 @@
+"""
+Storefront and order API benchmark
+Seeds a database, starts the app under gunicorn and drives each scenario
+with the asyncio load generator, then saves the results as JSON.
+
+Usage:
+    python benchmarks/run.py --seed-data                 # seed, then run everything
+    python benchmarks/run.py --scenario search --scenario chatbot --duration 20
+    python benchmarks/run.py --url http://127.0.0.1:5000 # an already running server
+    python benchmarks/run.py --compare benchmarks/results/<earlier>.json
+
+Scenarios:
+    home          GET /
+    search        GET /products?search=<term>  (Hindi, English and misses)
+    chatbot       POST /api/chatbot
+    place_order   POST /api/place-order        (writes orders!)
+    my_orders     GET /api/my-orders/<mobile>
+    admin_orders  GET /admin/orders            (logs in with ADMIN_USERNAME/ADMIN_PASSWORD)
+
+Results go to benchmarks/results/<time>-<commit>.json; --compare prints
+the change in throughput and p95 against an earlier file, which is how a
+regression between two commits shows up.
+"""
+
+import argparse
+import json
+import os
+import platform
+import signal
+import subprocess
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from urllib.parse import quote, urlencode
+
+import loadgen
+import seed as seeding
+
+BASE_DIR = seeding.BASE_DIR
+RESULTS_DIR = os.path.join(BASE_DIR, 'benchmarks', 'results')
+
+
+# ==================== Server ====================
+
+def wait_for_server(url, timeout=30):
+    """Poll until the server answers, raising RuntimeError on timeout."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            loadgen.send(url, loadgen.request('GET', '/about'))
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not start within {timeout}s")
+
+
+@contextmanager
+def gunicorn_server(port, env=None, verbose=False):
+    """
+    Run `gunicorn -c gunicorn.conf.py app:app` for the duration of a block.
+
+    Args:
+        port: Port to listen on
+        env: Extra environment (GUNICORN_MODE, WEB_CONCURRENCY, ...)
+        verbose: Show gunicorn's output
+
+    Yields:
+        str: The server's base URL
+    """
+    full_env = dict(os.environ, PORT=str(port), **(env or {}))
+    full_env.setdefault('GUNICORN_MAX_REQUESTS', '0')  # A worker restart mid-run would skew p99
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+        cwd=BASE_DIR, env=full_env,
+        stdout=subprocess.DEVNULL, stderr=None if verbose else subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        wait_for_server(url)
+        yield url
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+# ==================== Scenarios ====================
+
+def admin_cookie(url):
+    """Log in as ADMIN_USERNAME/ADMIN_PASSWORD and return the session cookie."""
+    password = os.environ.get('ADMIN_PASSWORD')
+    if not password:
+        return None
+    form = urlencode({'username': os.environ.get('ADMIN_USERNAME', 'admin'), 'password': password})
+    status, headers, _ = loadgen.send(url, loadgen.request(
+        'POST', '/admin/login', form, {'Content-Type': 'application/x-www-form-urlencoded'}
+    ))
+    cookie = headers.get('set-cookie', '').split(';')[0]
+    return cookie if status == 302 and cookie else None
+
+
+def build_scenarios(url, products, mobiles, terms):
+    """
+    Map scenario names to request factories.
+
+    Args:
+        url: Server base URL (for logging in)
+        products: [(id, name, price)] that orders are placed for
+        mobiles: Customer mobiles with seeded orders
+        terms: Search terms
+    """
+    def place_order(rng):
+        items = [
+            {'id': product_id, 'name': name, 'price': price, 'qty': rng.randint(1, 3)}
+            for product_id, name, price in rng.sample(products, min(len(products), rng.randint(1, 4)))
+        ]
+        return loadgen.request('POST', '/api/place-order', {
+            'customer_name': 'Load Test', 'mobile': rng.choice(mobiles), 'address': 'Benchmark Street',
+            'items': items, 'total': sum(item['price'] * item['qty'] for item in items),
+            'payment_method': 'cod'
+        })
+
+    scenarios = {
+        'home': lambda rng: loadgen.request('GET', '/'),
+        'search': lambda rng: loadgen.request('GET', '/products?search=' + quote(rng.choice(terms))),
+        'chatbot': lambda rng: loadgen.request('POST', '/api/chatbot', {'message': rng.choice(terms)}),
+        'place_order': place_order if products else None,
+        'my_orders': lambda rng: loadgen.request('GET', '/api/my-orders/' + rng.choice(mobiles)),
+    }
+    cookie = admin_cookie(url)
+    scenarios['admin_orders'] = (
+        (lambda rng: loadgen.request('GET', '/admin/orders', headers={'Cookie': cookie})) if cookie else None
+    )
+    return scenarios
+
+
+# ==================== Results ====================
+
+def git_commit():
+    """Short commit hash of the tree being measured ('+dirty' if modified)."""
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, text=True).strip()
+        dirty = subprocess.call(['git', 'diff', '--quiet', 'HEAD'], cwd=BASE_DIR) != 0
+        return commit + ('+dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def print_table(results, baseline=None):
+    """Print one line per scenario, with the change against a baseline run."""
+    header = f"{'scenario':<14}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}"
+    if baseline:
+        header += f"{'Δ req/s':>10}{'Δ p95':>9}"
+    print(header)
+    for name, result in results.items():
+        failed = result['requests'] - result['ok'] + sum(result['errors'].values())
+        line = (f"{name:<14}{result['req_per_sec']:>9}{result['p50_ms']:>9}"
+                f"{result['p95_ms']:>9}{result['p99_ms']:>9}{failed:>8}")
+        old = (baseline or {}).get(name)
+        if old:
+            line += f"{_change(old['req_per_sec'], result['req_per_sec']):>10}{_change(old['p95_ms'], result['p95_ms']):>9}"
+        print(line)
+
+
+def _change(old, new):
+    if not old:
+        return '-'
+    return f"{(new - old) / old * 100:+.0f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenario', action='append', help='Scenario to run (repeatable, default: all)')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds per scenario (default 10)')
+    parser.add_argument('--warmup', type=float, default=2, help='Unmeasured seconds first (default 2)')
+    parser.add_argument('--concurrency', type=int, default=16, help='Connections (default 16)')
+    parser.add_argument('--url', help='Benchmark a running server instead of starting gunicorn')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--seed-data', action='store_true', help='Seed the database first (see benchmarks/seed.py)')
+    parser.add_argument('--reset', action='store_true', help='With --seed-data: delete existing data first')
+    parser.add_argument('--products', type=int, default=500)
+    parser.add_argument('--orders', type=int, default=5000)
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--customers', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for data and requests')
+    parser.add_argument('--no-page-cache', action='store_true', help='Start the server with PAGE_CACHE_BACKEND=none')
+    parser.add_argument('--out', help='Results file (default: benchmarks/results/<time>-<commit>.json)')
+    parser.add_argument('--compare', help='Earlier results file to compare against')
+    parser.add_argument('--verbose', action='store_true', help='Show gunicorn output')
+    args = parser.parse_args()
+
+    seeded = None
+    if args.seed_data:
+        seeded = seeding.seed_database(args.products, args.orders, args.messages,
+                                       args.customers, args.seed, args.reset)
+        print(f"Seeded {seeded['products']} products, {seeded['orders']} orders, "
+              f"{seeded['messages']} messages in {seeded['seconds']}s")
+
+    products = seeding.sample_products(limit=200)
+    mobiles = seeding.customer_mobiles(args.customers, args.seed)
+    terms = seeding.search_terms(args.seed)
+
+    env = {'PAGE_CACHE_BACKEND': 'none'} if args.no_page_cache else {}
+    server = nullcontext(args.url.rstrip('/')) if args.url else gunicorn_server(args.port, env, args.verbose)
+    results = {}
+    with server as url:
+        scenarios = build_scenarios(url, products, mobiles, terms)
+        for name in args.scenario or list(scenarios):
+            make_request = scenarios.get(name)
+            if make_request is None:
+                reason = 'unknown scenario' if name not in scenarios else 'needs ADMIN_PASSWORD' if name == 'admin_orders' else 'no products'
+                print(f"Skipping {name} ({reason})")
+                continue
+            if args.warmup:
+                loadgen.run(url, make_request, args.concurrency, args.warmup, args.seed)
+            results[name] = loadgen.run(url, make_request, args.concurrency, args.duration, args.seed)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)['scenarios']
+    print_table(results, baseline)
+
+    commit = git_commit()
+    report = {
+        'meta': {
+            'commit': commit,
+            'time': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'url': args.url or 'gunicorn -c gunicorn.conf.py',
+            'database': os.environ.get('DATABASE_URL', '').split('://')[0],
+            'concurrency': args.concurrency,
+            'duration': args.duration,
+            'page_cache': not args.no_page_cache,
+            'seeded': seeded,
+        },
+        'scenarios': results,
+    }
+    out = args.out or os.path.join(
+        RESULTS_DIR, f"{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}-{commit.replace('+', '-')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Saved {out}")
+
+
+if __name__ == '__main__':
+    main()
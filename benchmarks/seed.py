@@ -0,0 +1,88 @@
+"""
+Benchmark data seeding
+Fills the configured database with deterministic synthetic data using the
+generator behind `flask datagen` (see datagen.py).
+
+Usage:
+    python benchmarks/seed.py --products 500 --orders 5000 --messages 200
+    python benchmarks/seed.py --reset ...   # delete existing products/orders/messages first
+
+Orders come from a fixed pool of customer mobiles and everything from a
+seeded random generator, so the same arguments always produce the same
+data and the load generator can rebuild the mobiles and search terms
+without asking the database. Uses DATABASE_URL like the app; never point
+it at production, --reset deletes data.
+"""
+
+import argparse
+import os
+import random
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from datagen import ITEMS, customer_mobiles  # noqa: E402
+
+
+def search_terms(seed=42):
+    """Search queries the load generator sends: hits in both scripts plus misses."""
+    rng = random.Random(f"{seed}-search")
+    terms = [hi for hi, _ in ITEMS] + [en.lower() for _, en in ITEMS]
+    rng.shuffle(terms)
+    return terms + ['xyzzy', 'pizza', 'laptop']
+
+
+def sample_products(limit=200):
+    """
+    Read available products from the database for the order scenario.
+
+    Returns:
+        list: [(id, name, price)]
+    """
+    from app import app
+    from models import db, Product
+    with app.app_context():
+        rows = db.session.execute(
+            db.select(Product.id, Product.name, Product.price)
+            .where(Product.is_available.is_(True)).order_by(Product.id).limit(limit)
+        ).all()
+    return [tuple(row) for row in rows]
+
+
+def seed_database(products=500, orders=5000, messages=200, customers=200, seed=42, reset=False):
+    """
+    Insert synthetic data in bulk.
+
+    Returns:
+        dict: Row counts and seconds taken
+    """
+    from app import app
+    from datagen import generate
+    with app.app_context():
+        counts = generate(products=products, orders=orders, customers=customers, messages=messages,
+                          seed=seed, reset=reset, log=lambda line: None)
+    return {
+        'products': counts.get('products', 0), 'orders': counts.get('orders', 0),
+        'messages': counts.get('contact_messages', 0), 'customers': customers,
+        'seconds': counts['seconds']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=500)
+    parser.add_argument('--orders', type=int, default=5000)
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--customers', type=int, default=200, help='Distinct customer mobiles')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--reset', action='store_true', help='Delete existing products, orders and messages first')
+    args = parser.parse_args()
+    result = seed_database(args.products, args.orders, args.messages, args.customers, args.seed, args.reset)
+    print(f"Seeded {result['products']} products, {result['orders']} orders, "
+          f"{result['messages']} messages in {result['seconds']}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+Stock contention benchmark
+Many customers check out the same product at once (sugar before Diwali)
+while others keep buying the rest of the store, under gunicorn.
+
+Usage:
+    python benchmarks/stock_contention.py
+    python benchmarks/stock_contention.py --stock 5000 --concurrency 64 --duration 20
+    python benchmarks/stock_contention.py --hot-share 1.0   # everyone wants sugar
+
+Gives one product (--hot-product, default: the first available one) a
+stock count and runs two phases: the rest of the store alone, then the
+same load with a rush on the hot product. Afterwards it checks the books:
+the hot product's units in orders placed during the run must equal the
+stock taken, stock must never go below zero, and a sold-out product must
+be unavailable. The other products' p50 in both phases shows whether
+the rush held up the rest of the store: their orders should never wait
+on a lock that rush orders hold. Throughput says less on a small box,
+where both phases share the same CPUs.
+
+Places real orders and changes stock: run it against a local database
+only, with products loaded (`python benchmarks/seed.py --reset`).
+"""
+
+import argparse
+import asyncio
+import json
+
+import loadgen
+import seed as seeding
+from run import gunicorn_server
+
+
+def prepare(hot_product, stock):
+    """
+    Give the hot product its stock and pick the other products.
+
+    Returns:
+        tuple: (hot product id, [cold product ids], last order id before the run)
+    """
+    from app import app
+    from models import db, Order, set_product_stock
+    products = [product_id for product_id, _, _ in seeding.sample_products(limit=200)]
+    hot = hot_product or products[0]
+    with app.app_context():
+        set_product_stock(hot, stock)
+        last_order = db.session.execute(db.select(db.func.max(Order.id))).scalar() or 0
+    return hot, [product_id for product_id in products if product_id != hot], last_order
+
+
+def check_books(hot, stock, last_order):
+    """
+    Compare units sold with stock taken for orders placed after last_order.
+
+    Returns:
+        dict: sold, stock_left, is_available, oversold
+    """
+    from app import app
+    from models import db, Order, OrderItem, Product
+    with app.app_context():
+        sold = db.session.execute(
+            db.select(db.func.coalesce(db.func.sum(OrderItem.qty), 0))
+            .join(Order, Order.id == OrderItem.order_id)
+            .where(Order.id > last_order, OrderItem.product_id == hot)
+        ).scalar()
+        product = db.session.get(Product, hot)
+        left, available = product.stock, product.is_available
+    return {
+        'sold': sold, 'stock_left': left, 'is_available': available,
+        'oversold': left < 0 or sold != stock - left or (left == 0 and available)
+    }
+
+
+def order_request(product_ids, mobiles):
+    """Request factory placing an order for 1-3 units of 1-3 of the given products."""
+    def make_request(rng):
+        picked = rng.sample(product_ids, min(len(product_ids), rng.randint(1, 3)))
+        return loadgen.request('POST', '/api/place-order', {
+            'customer_name': 'Load Test', 'mobile': rng.choice(mobiles), 'address': 'Benchmark Street',
+            'items': [{'id': product_id, 'qty': rng.randint(1, 3)} for product_id in picked],
+            'payment_method': 'cod'
+        })
+    return make_request
+
+
+async def rush(url, hot, cold, mobiles, concurrency, hot_share, duration, seed):
+    """Run hot and cold checkouts side by side; returns (hot, cold) results."""
+    hot_connections = max(1, round(concurrency * hot_share))
+    runs = [loadgen.run_async(url, order_request([hot], mobiles), hot_connections, duration, seed)]
+    if cold and hot_connections < concurrency:
+        runs.append(loadgen.run_async(url, order_request(cold, mobiles), concurrency - hot_connections,
+                                      duration, seed))
+    results = await asyncio.gather(*runs)
+    return results[0], (results[1] if len(results) > 1 else None)
+
+
+def print_line(name, result):
+    if result is None:
+        return
+    print(f"{name:<22}{result['req_per_sec']:>9}{result['p50_ms']:>9}{result['p95_ms']:>9}"
+          f"{result['statuses'].get('200', 0):>8}{result['statuses'].get('409', 0):>8}"
+          f"{result['requests'] - result['statuses'].get('200', 0) - result['statuses'].get('409', 0):>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hot-product', type=int, help='Product everyone rushes for (default: first available)')
+    parser.add_argument('--stock', type=int, default=1000, help='Stock of the hot product (default 1000)')
+    parser.add_argument('--concurrency', type=int, default=32, help='Connections (default 32)')
+    parser.add_argument('--hot-share', type=float, default=0.75, help='Share of connections after the hot product')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds per phase (default 10)')
+    parser.add_argument('--customers', type=int, default=200, help='Distinct customer mobiles')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='Also write the results to this file')
+    parser.add_argument('--verbose', action='store_true', help='Show gunicorn output')
+    args = parser.parse_args()
+
+    hot, cold, last_order = prepare(args.hot_product, args.stock)
+    # Many customers, as in a real rush (one customer's orders share a cache counter row)
+    mobiles = seeding.customer_mobiles(args.customers, args.seed)
+    cold_connections = args.concurrency - max(1, round(args.concurrency * args.hot_share))
+    with gunicorn_server(args.port, verbose=args.verbose) as url:
+        alone = None
+        if cold and cold_connections > 0:
+            alone = loadgen.run(url, order_request(cold, mobiles), cold_connections, args.duration, args.seed)
+        hot_result, cold_result = asyncio.run(
+            rush(url, hot, cold, mobiles, args.concurrency, args.hot_share, args.duration, args.seed)
+        )
+    books = check_books(hot, args.stock, last_order)
+
+    print(f"{'phase':<22}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'200':>8}{'409':>8}{'other':>8}")
+    print_line('other products alone', alone)
+    print_line('other products + rush', cold_result)
+    print_line(f'rush on #{hot}', hot_result)
+    print(f"\nHot product #{hot}: {books['sold']} of {args.stock} sold, {books['stock_left']} left, "
+          f"{'available' if books['is_available'] else 'unavailable'}")
+    print("❌ Oversold or miscounted!" if books['oversold'] else "✅ No oversell")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'hot_product': hot, 'stock': args.stock, 'concurrency': args.concurrency,
+                       'hot_share': args.hot_share, 'duration': args.duration, 'books': books,
+                       'other_alone': alone, 'other_with_rush': cold_result, 'rush': hot_result}, f, indent=2)
+    return 1 if books['oversold'] else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
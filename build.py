@@ -1,26 +1,31 @@
 """
 Build script for Render deployment.
-Creates all database tables and initializes default data.
+Migrates the database to the latest revision and initializes default data.
 """
 
 import os
 import sys
 
 # Set up the Flask app
-from app import app, db
-from models import _create_default_settings
+from app import app
+from flask_migrate import upgrade
+from models import _create_default_settings, _create_default_generations
 from werkzeug.security import generate_password_hash
 
 def setup_database():
-    """Create all tables and initialize data."""
+    """Run the migrations and initialize data."""
     with app.app_context():
-        print("Creating database tables...")
-        db.create_all()
-        print("Tables created successfully!")
+        # Never db.create_all(): it skips tables that exist, so new columns,
+        # constraints and backfills would not reach an existing database,
+        # and a new one would be left without an Alembic revision
+        print("Running database migrations...")
+        upgrade()
+        print("Database is at the latest revision!")
         
         # Create default settings
         print("Creating default settings...")
         _create_default_settings()
+        _create_default_generations()
         
         # Create default admin if not exists
         print("Setting up default admin...")
@@ -37,33 +42,26 @@ def setup_database():
             print("Admin already exists or ADMIN_PASSWORD not set")
         
         # Add sample products if empty
-        from models import get_products_count, add_product
+        from models import add_sample_products, get_products_count
         
-        if get_products_count() == 0:
-            print("Adding sample products...")
-            sample_products = [
-                ('चावल (Rice) - 1kg', 60),
-                ('गेहूं आटा (Wheat Flour) - 1kg', 45),
-                ('चीनी (Sugar) - 1kg', 50),
-                ('नमक (Salt) - 1kg', 25),
-                ('सरसों तेल (Mustard Oil) - 1L', 180),
-                ('दाल (Toor Dal) - 1kg', 140),
-                ('चाय पत्ती (Tea) - 250g', 80),
-                ('हल्दी (Turmeric) - 100g', 35),
-                ('मिर्च पाउडर (Chili Powder) - 100g', 40),
-                ('धनिया पाउडर (Coriander) - 100g', 30),
-                ('साबुन (Soap)', 35),
-                ('शैम्पू (Shampoo)', 120),
-            ]
-            
-            for name, price in sample_products:
-                add_product(name, price)
-            
-            print(f"Added {len(sample_products)} sample products")
+        added = add_sample_products()
+        if added:
+            print(f"Added {added} sample products")
         else:
             print(f"Products already exist: {get_products_count()} products")
         
         print("\n✅ Database setup complete!")
 
+def build_assets():
+    """Fingerprint and precompress static files for /assets."""
+    from static_assets import build_asset_manifest, BROTLI_ENABLED
+    print("Building static asset manifest...")
+    manifest = build_asset_manifest()
+    compressed = sum(1 for entry in manifest.values() if entry['encodings'])
+    print(f"Fingerprinted {len(manifest)} files, precompressed {compressed}"
+          f"{'' if BROTLI_ENABLED else ' (gzip only, brotli not installed)'}")
+
 if __name__ == '__main__':
-    setup_database()
+    if 'assets' not in sys.argv[1:]:
+        setup_database()
+    build_assets()
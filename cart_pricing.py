@@ -0,0 +1,155 @@
+"""
+Cart Pricing Module
+Prices a submitted cart from the product catalog, never from the browser.
+
+The cart kept in localStorage only says which products and how many of
+each; names, prices and availability come from one lookup of all of its
+product ids: the catalog snapshot for quotes, one IN (...) query when an
+order is placed. Amounts are integer paise throughout so that totals add
+up exactly; rupees only appear at the edges (Order.total, JSON).
+
+Stock is only checked when an order is placed: catalog snapshots do not
+carry it, since every order would otherwise invalidate them.
+"""
+
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from models import get_products_by_ids
+
+
+MAX_LINES = 100
+MAX_QTY = 99
+
+
+def to_paise(rupees):
+    """Convert a rupee amount (number or numeric string) to integer paise."""
+    try:
+        return int((Decimal(str(rupees)) * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+    except (InvalidOperation, ValueError):
+        raise ValueError(f"Invalid amount: {rupees!r}")
+
+
+def to_rupees(paise):
+    """Convert integer paise to rupees for Order.total and JSON responses."""
+    return paise / 100
+
+
+def _positive_int(value):
+    """value as an int if it is a whole number above zero, else None."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, int) or (isinstance(value, str) and value.strip().isdigit()):
+        value = int(value)
+        return value if value > 0 else None
+    return None
+
+
+def parse_cart(items):
+    """
+    Validate cart items ({id, qty, ...}) and merge repeated products.
+
+    Only id and qty are used; any name or price sent along is ignored.
+
+    Returns:
+        list: [(product_id, qty)] in cart order
+
+    Raises:
+        ValueError: If the cart is malformed
+    """
+    if not isinstance(items, list):
+        raise ValueError('कार्ट सही नहीं है (Invalid cart)')
+    quantities = {}
+    for item in items:
+        product_id = _positive_int(item.get('id')) if isinstance(item, dict) else None
+        qty = _positive_int(item.get('qty')) if isinstance(item, dict) else None
+        if product_id is None or qty is None:
+            raise ValueError('कार्ट सही नहीं है (Invalid cart item)')
+        quantities[product_id] = quantities.get(product_id, 0) + qty
+        if quantities[product_id] > MAX_QTY:
+            raise ValueError(f'एक सामान के अधिकतम {MAX_QTY} पीस (At most {MAX_QTY} of an item)')
+    if len(quantities) > MAX_LINES:
+        raise ValueError(f'कार्ट में अधिकतम {MAX_LINES} सामान (At most {MAX_LINES} items per cart)')
+    return list(quantities.items())
+
+
+class CartQuote:
+    """A priced cart: lines that can be ordered and products that cannot."""
+
+    __slots__ = ('lines', 'problems', 'reserve', 'total_paise')
+
+    def __init__(self, lines, problems, reserve=()):
+        self.lines = lines  # [(product_id, name, unit_paise, qty)]
+        # [(product_id, reason, stock)], reason 'not_found', 'unavailable' or
+        # 'out_of_stock' (stock is what is left, otherwise None)
+        self.problems = problems
+        self.reserve = list(reserve)  # [(product_id, qty)] of lines whose stock is tracked
+        self.total_paise = sum(unit_paise * qty for _, _, unit_paise, qty in lines)
+
+    @property
+    def total(self):
+        """Total in rupees."""
+        return to_rupees(self.total_paise)
+
+    def order_items(self):
+        """Cart items ({id, name, price, qty}) for create_order, at catalog prices."""
+        return [
+            {'id': product_id, 'name': name, 'price': to_rupees(unit_paise), 'qty': qty}
+            for product_id, name, unit_paise, qty in self.lines
+        ]
+
+    def to_dict(self):
+        return {
+            'items': [
+                {'id': product_id, 'name': name, 'price': to_rupees(unit_paise), 'qty': qty,
+                 'subtotal': to_rupees(unit_paise * qty)}
+                for product_id, name, unit_paise, qty in self.lines
+            ],
+            'unavailable': [
+                {'id': product_id, 'reason': reason, **({'stock': stock} if stock is not None else {})}
+                for product_id, reason, stock in self.problems
+            ],
+            'total': self.total,
+            'total_paise': self.total_paise
+        }
+
+
+def price_cart(cart, products):
+    """
+    Price parsed cart lines.
+
+    Args:
+        cart: [(product_id, qty)] from parse_cart()
+        products: Mapping of product id -> product (name, price, is_available)
+
+    Returns:
+        CartQuote: Unknown, unavailable and short products end up in quote.problems
+    """
+    lines, problems, reserve = [], [], []
+    for product_id, qty in cart:
+        product = products.get(product_id)
+        stock = getattr(product, 'stock', None)  # Catalog snapshot records have no stock
+        if product is None:
+            problems.append((product_id, 'not_found', None))
+        elif not product.is_available:
+            problems.append((product_id, 'unavailable', None))
+        elif stock is not None and stock < qty:
+            problems.append((product_id, 'out_of_stock', stock))
+        else:
+            lines.append((product_id, product.name, to_paise(product.price), qty))
+            if stock is not None:
+                reserve.append((product_id, qty))
+    return CartQuote(lines, problems, reserve)
+
+
+def quote_cart(items):
+    """Price a cart from the catalog snapshot (no query while it is current)."""
+    from catalog_cache import get_catalog
+    return price_cart(parse_cart(items), get_catalog().by_id)
+
+
+def price_order(items):
+    """Price a cart being ordered from the products table, in one query."""
+    cart = parse_cart(items)
+    return price_cart(cart, get_products_by_ids([product_id for product_id, _ in cart]))
@@ -0,0 +1,129 @@
+"""
+Catalog Cache Module
+Process-wide, read-mostly snapshot of the product catalog.
+
+Each gunicorn worker keeps one immutable snapshot of all products plus the
+search index built from it. The snapshot is tagged with the 'catalog'
+generation counter from the database; add/update/delete/toggle bump that
+counter in the same transaction, so a worker only has to read one integer
+to know whether its snapshot is still current.
+
+Most changes (a sell-out, an availability toggle, a new price) leave every
+name as it was; the new snapshot then shares the previous one's search
+index instead of building it again.
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+from flask import current_app
+
+from metrics import CACHE_REQUESTS
+from models import Product, get_generation
+from search_index import ProductSearchIndex
+
+
+CatalogProduct = namedtuple(
+    'CatalogProduct',
+    ['id', 'name', 'price', 'image', 'is_available', 'created_at']
+)
+
+
+class CatalogSnapshot:
+    """Immutable view of the product catalog at one generation."""
+
+    __slots__ = ('generation', 'products', 'available', 'by_id', 'unavailable_count', 'search_index')
+
+    def __init__(self, generation, products, previous=None):
+        """
+        Args:
+            previous: The snapshot this one replaces, whose search index is
+                reused if no product was added, removed or renamed
+        """
+        self.generation = generation
+        # Newest first, like get_all_products()
+        self.products = tuple(sorted(products, key=lambda p: p.id, reverse=True))
+        self.available = tuple(p for p in self.products if p.is_available)
+        self.by_id = {p.id: p for p in self.products}
+        self.unavailable_count = len(self.products) - len(self.available)
+        if previous is not None and self._same_names(previous):
+            self.search_index = previous.search_index
+        else:
+            self.search_index = ProductSearchIndex((p.id, p.name) for p in self.products)
+
+    def _same_names(self, other):
+        """True if other has exactly these products under the same names."""
+        if len(other.by_id) != len(self.by_id):
+            return False
+        for product_id, product in self.by_id.items():
+            old = other.by_id.get(product_id)
+            if old is None or old.name != product.name:
+                return False
+        return True
+
+    def get(self, product_id):
+        """Get a product record by ID, or None."""
+        return self.by_id.get(product_id)
+
+    def search(self, query, limit=None):
+        """Search product names, best matches first."""
+        return [self.by_id[pid] for pid in self.search_index.search(query, limit=limit)]
+
+
+_snapshot = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def _load_snapshot(generation, previous=None):
+    """Read every product row once and build a snapshot."""
+    rows = Product.query.with_entities(
+        Product.id, Product.name, Product.price, Product.image,
+        Product.is_available, Product.created_at
+    ).all()
+    return CatalogSnapshot(generation, [CatalogProduct(*row) for row in rows], previous)
+
+
+def get_catalog(max_age=None):
+    """
+    Get the current catalog snapshot.
+
+    Args:
+        max_age: Seconds a checked snapshot may be reused without reading the
+                 generation counter again. Defaults to the
+                 CATALOG_CHECK_INTERVAL config value; pass 0 on admin pages
+                 that must reflect another worker's change immediately.
+
+    Returns:
+        CatalogSnapshot: Shared, read-only catalog
+    """
+    global _snapshot, _checked_at
+
+    if max_age is None:
+        max_age = current_app.config.get('CATALOG_CHECK_INTERVAL', 1.0)
+
+    snapshot = _snapshot
+    now = time.monotonic()
+    if snapshot is not None and now - _checked_at < max_age:
+        CACHE_REQUESTS.inc(cache='catalog', result='hit')
+        return snapshot
+
+    generation = get_generation('catalog')
+    if snapshot is None or snapshot.generation != generation:
+        with _lock:
+            snapshot = _snapshot
+            if snapshot is None or snapshot.generation != generation:
+                snapshot = _load_snapshot(generation, snapshot)
+                _snapshot = snapshot
+        CACHE_REQUESTS.inc(cache='catalog', result='miss')
+    else:
+        CACHE_REQUESTS.inc(cache='catalog', result='hit')
+    _checked_at = now
+    return snapshot
+
+
+def invalidate_catalog():
+    """Force the next get_catalog() call to re-check the generation."""
+    global _checked_at
+    _checked_at = 0.0
@@ -4,13 +4,15 @@ Handles image upload to Cloudinary for persistent storage on Render.
 """
 
 import os
-import cloudinary
-import cloudinary.uploader
-from werkzeug.utils import secure_filename
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# The cloudinary package is imported and configured on first use, so
+# importing this module costs nothing at worker startup
+_enabled = None
+
+
 # Configure Cloudinary from environment variables
 def configure_cloudinary():
     """Configure Cloudinary with environment variables."""
@@ -20,6 +22,7 @@ def configure_cloudinary():
     
     if all([cloud_name, api_key, api_secret]):
         try:
+            import cloudinary
             cloudinary.config(
                 cloud_name=cloud_name,
                 api_key=api_key,
@@ -35,8 +38,13 @@ def configure_cloudinary():
         print("Cloudinary credentials missing in environment variables.")
         return False
 
-# Check if Cloudinary is configured
-CLOUDINARY_ENABLED = configure_cloudinary()
+
+def cloudinary_enabled():
+    """Check if Cloudinary is configured (configuring it on the first call)."""
+    global _enabled
+    if _enabled is None:
+        _enabled = configure_cloudinary()
+    return _enabled
 
 
 def upload_image(file, folder="kirana_products"):
@@ -50,7 +58,7 @@ def upload_image(file, folder="kirana_products"):
     Returns:
         str: The Cloudinary URL if successful, None if failed
     """
-    if not CLOUDINARY_ENABLED:
+    if not cloudinary_enabled():
         print("Cloudinary not configured, skipping cloud upload")
         return None
     
@@ -58,6 +66,7 @@ def upload_image(file, folder="kirana_products"):
         return None
     
     try:
+        import cloudinary.uploader
         # Upload to Cloudinary
         result = cloudinary.uploader.upload(
             file,
@@ -78,6 +87,40 @@ def upload_image(file, folder="kirana_products"):
         return None
 
 
+def upload_image_path(path, folder="kirana_products"):
+    """
+    Upload an image file from disk to Cloudinary.
+
+    Unlike upload_image(), errors are raised so the caller can retry.
+
+    Args:
+        path: Local file path
+        folder: Cloudinary folder name to organize images
+
+    Returns:
+        str: The Cloudinary URL
+    """
+    if not cloudinary_enabled():
+        raise RuntimeError("Cloudinary is not configured")
+    import cloudinary.uploader
+
+    # Files are named by content hash, so identical images share one asset
+    public_id = os.path.splitext(os.path.basename(path))[0]
+    result = cloudinary.uploader.upload(
+        path,
+        folder=folder,
+        public_id=public_id,
+        overwrite=False,
+        resource_type="image",
+        transformation=[
+            {"width": 500, "height": 500, "crop": "limit"},
+            {"quality": "auto"},
+            {"fetch_format": "auto"}
+        ]
+    )
+    return result['secure_url']
+
+
 def delete_image(public_id):
     """
     Delete image from Cloudinary by public_id.
@@ -88,10 +131,11 @@ def delete_image(public_id):
     Returns:
         bool: True if deleted successfully
     """
-    if not CLOUDINARY_ENABLED:
+    if not cloudinary_enabled():
         return False
     
     try:
+        import cloudinary.uploader
         result = cloudinary.uploader.destroy(public_id)
         return result.get('result') == 'ok'
     except Exception as e:
@@ -99,6 +143,30 @@ def delete_image(public_id):
         return False
 
 
+def list_images(folder="kirana_products"):
+    """
+    List every image stored in a Cloudinary folder.
+
+    Yields:
+        tuple: (public_id, created_at) with created_at as an ISO string
+    """
+    if not cloudinary_enabled():
+        return
+    import cloudinary.api
+
+    next_cursor = None
+    while True:
+        options = {'type': 'upload', 'prefix': folder + '/', 'max_results': 500}
+        if next_cursor:
+            options['next_cursor'] = next_cursor
+        result = cloudinary.api.resources(**options)
+        for resource in result.get('resources', []):
+            yield resource['public_id'], resource.get('created_at')
+        next_cursor = result.get('next_cursor')
+        if not next_cursor:
+            return
+
+
 def get_public_id_from_url(url):
     """
     Extract public_id from Cloudinary URL for deletion.
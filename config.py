@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -6,6 +7,45 @@ load_dotenv()
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
+
+def _env_bool(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def engine_options(database_url):
+    """
+    SQLAlchemy engine options for the configured database.
+
+    The pool is per gunicorn worker process: DB_POOL_SIZE should cover the
+    worker's threads (gunicorn.conf.py defaults it to GUNICORN_THREADS), and
+    workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) must stay below the
+    database's connection limit.
+
+    Args:
+        database_url: SQLALCHEMY_DATABASE_URI
+
+    Returns:
+        dict: Value for SQLALCHEMY_ENGINE_OPTIONS
+    """
+    options = {
+        'pool_pre_ping': _env_bool('DB_POOL_PRE_PING', True),
+    }
+    if not database_url.startswith('postgres'):
+        return options  # SQLite: the default pool suits a local file
+
+    options.update({
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', '5')),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', '5')),
+        'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', '10')),
+        # Hosted Postgres drops idle connections; recycle before it does
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', '1800')),
+    })
+    return options
+
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY')
     if not SECRET_KEY:
@@ -17,6 +57,58 @@ class Config:
         raise ValueError("DATABASE_URL environment variable is required! Please add it to .env file.")
     
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    # Server-side limit for the web workers' queries (0 = none), so a
+    # runaway query frees its connection instead of holding a thread.
+    # Applied by gunicorn.conf.py only: CLI commands stay unbounded
+    STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', '15000'))
+    
+    # Query instrumentation (see query_stats.py)
+    SERVER_TIMING = _env_bool('SERVER_TIMING', True)
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '200'))
+    # Flag a request that runs one statement this many times (0 = off)
+    N_PLUS_ONE_THRESHOLD = int(os.environ.get('N_PLUS_ONE_THRESHOLD', '0'))
+    N_PLUS_ONE_RAISE = _env_bool('N_PLUS_ONE_RAISE', False)
+    
+    # /metrics (see metrics.py). gunicorn.conf.py sets METRICS_DIR so the
+    # workers' values are added up; without it each process reports its own
+    METRICS_ENABLED = _env_bool('METRICS_ENABLED', True)
+    METRICS_DIR = os.environ.get('METRICS_DIR') or None
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN') or None
+    
+    # Seconds a worker reuses its catalog snapshot before re-checking the
+    # catalog generation counter in the database
+    CATALOG_CHECK_INTERVAL = float(os.environ.get('CATALOG_CHECK_INTERVAL', '1'))
+    # Same for the shop settings snapshot
+    SETTINGS_CHECK_INTERVAL = float(os.environ.get('SETTINGS_CHECK_INTERVAL', '1'))
+    
+    # Storefront page cache: 'memory' (per worker), 'filesystem' (shared by
+    # the workers on one machine) or 'none'
+    PAGE_CACHE_BACKEND = os.environ.get('PAGE_CACHE_BACKEND', 'memory')
+    PAGE_CACHE_DIR = os.environ.get('PAGE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'kirana-page-cache'))
+    PAGE_CACHE_MAX_ENTRIES = int(os.environ.get('PAGE_CACHE_MAX_ENTRIES', '512'))
+    PAGE_CACHE_CHECK_INTERVAL = float(os.environ.get('PAGE_CACHE_CHECK_INTERVAL', '1'))
+    # Part of every page cache key, so a deploy never serves old templates
+    PAGE_CACHE_VERSION = os.environ.get('RENDER_GIT_COMMIT', '')
+    
+    # How long /api/place-order remembers an Idempotency-Key (replays within
+    # it return the first order; `flask purge-idempotency-keys` clears old ones)
+    IDEMPOTENCY_KEY_TTL_HOURS = float(os.environ.get('IDEMPOTENCY_KEY_TTL_HOURS', '24'))
+    
+    # Live order feed for admin pages (see order_events.py). Each open stream
+    # holds a worker thread, so only a few per process, and each ends after
+    # a while so the browser reconnects; sync workers get none by default
+    ORDER_EVENTS_MAX_STREAMS = int(os.environ.get(
+        'ORDER_EVENTS_MAX_STREAMS', '0' if os.environ.get('GUNICORN_MODE') == 'sync' else '2'
+    ))
+    ORDER_EVENTS_MAX_SECONDS = float(os.environ.get('ORDER_EVENTS_MAX_SECONDS', '300'))
+    
+    # Background image uploads: 'cloudinary', 'local' (stand-in that copies
+    # into static/images/uploads/cdn) or empty for Cloudinary when configured
+    IMAGE_UPLOADER = os.environ.get('IMAGE_UPLOADER', '')
+    IMAGE_UPLOAD_WORKERS = int(os.environ.get('IMAGE_UPLOAD_WORKERS', '2'))  # 0 uploads inline
+    IMAGE_UPLOAD_MAX_ATTEMPTS = int(os.environ.get('IMAGE_UPLOAD_MAX_ATTEMPTS', '3'))
+    IMAGE_UPLOAD_RETRY_DELAY = float(os.environ.get('IMAGE_UPLOAD_RETRY_DELAY', '2'))
     
     # Upload Configuration
     UPLOAD_FOLDER = os.path.join(BASE_DIR, 'static', 'images', 'uploads')
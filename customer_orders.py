@@ -0,0 +1,114 @@
+"""
+Customer Orders Module
+Cached order history lookups for the public "My Orders" page.
+
+Each customer's orders are covered by a cache generation counter (one of
+CUSTOMER_ORDER_BUCKETS shared by mobile hash, see
+customer_orders_generation), bumped in the same transaction as
+create_order, update_order_status and delete_order. A cached page is
+reused while that counter is unchanged, and the counter doubles as the
+page's ETag, so a poll that gets 304 Not Modified costs one primary-key
+lookup.
+
+Anyone who types a mobile number sees its orders, so pages carry only
+what my_orders.html shows, with the name, mobile and address masked.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+from models import get_generation, get_orders_page, customer_orders_generation
+
+
+MAX_CACHED_PAGES = 2048
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 50
+
+_cache = OrderedDict()  # (mobile, cursor, limit) -> (generation, payload)
+_lock = threading.Lock()
+
+
+def customer_orders_etag(mobile, cursor, limit, generation):
+    """ETag for one page of a customer's orders at a given generation."""
+    key = f"{customer_orders_generation(mobile)}|{mobile}|{cursor or ''}|{limit}|{generation}"
+    return hashlib.sha1(key.encode()).hexdigest()[:20]
+
+
+def _mask(text, visible):
+    """Hide all but the last `visible` characters of text (at most six dots in front)."""
+    text = text or ''
+    return '•' * min(max(len(text) - visible, 0), 6) + text[-visible:]
+
+
+def _order_payload(order):
+    """JSON-ready view of an order for the customer, personal details masked."""
+    first_name = (order.customer_name or '').split()
+    return {
+        'id': order.id,
+        'customer_name': first_name[0] if first_name else '',
+        'mobile': _mask(order.mobile, 4),
+        'address': _mask(order.address, 6),
+        'items': [
+            {'name': item.name, 'price': item.unit_price, 'qty': item.qty, 'subtotal': item.subtotal}
+            for item in order.order_items
+        ],
+        'total': order.total,
+        'status': order.status,
+        'created_at': order.date.isoformat() if order.date else None
+    }
+
+
+def get_customer_orders_version(mobile, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Get the current ETag of a page without loading any orders.
+
+    Returns:
+        tuple: (generation, etag)
+    """
+    generation = get_generation(customer_orders_generation(mobile))
+    return generation, customer_orders_etag(mobile, cursor, limit, generation)
+
+
+def get_customer_orders(mobile, cursor=None, limit=DEFAULT_PAGE_SIZE, generation=None):
+    """
+    Get one page of a customer's orders, newest first.
+
+    Args:
+        mobile: Normalized mobile number
+        cursor: next_cursor from the previous page
+        limit: Page size
+        generation: Current generation, if the caller already read it
+
+    Returns:
+        dict: {'orders': [...], 'next_cursor': str|None}
+    """
+    if generation is None:
+        generation = get_generation(customer_orders_generation(mobile))
+    key = (mobile, cursor, limit)
+
+    with _lock:
+        entry = _cache.get(key)
+        if entry is not None and entry[0] == generation:
+            _cache.move_to_end(key)
+            return entry[1]
+
+    page = get_orders_page(mobile=mobile, after=cursor, limit=limit)
+    payload = {
+        'orders': [_order_payload(order) for order in page['orders']],
+        'next_cursor': page['next_cursor']
+    }
+
+    with _lock:
+        _cache[key] = (generation, payload)
+        _cache.move_to_end(key)
+        while len(_cache) > MAX_CACHED_PAGES:
+            _cache.popitem(last=False)
+    return payload
+
+
+def invalidate_customer_orders(mobile):
+    """Drop this worker's cached pages for one customer."""
+    with _lock:
+        for key in [key for key in _cache if key[0] == mobile]:
+            del _cache[key]
@@ -0,0 +1,470 @@
+"""
+Synthetic data generator
+Bulk-loads realistic, skewed data into the configured database for scale
+testing: products, orders (JSON items and order_items rows), customer care
+issues and contact messages.
+
+Usage:
+    flask --app app datagen --products 20000 --orders 1000000 --customers 100000
+    flask --app app datagen --orders 200000 --items json   # orders from before order_items
+    flask --app app datagen --reset ...                    # empty the tables first
+
+Shape of the data:
+    - Product popularity and customer repeat purchases follow a Zipf
+      distribution, so a few products and customers account for most orders
+    - Dates cluster towards the present (a growing shop) and an order's
+      status, like an issue's, depends on its age
+    - 70% cash on delivery, 30% UPI; 1-8 items per order
+
+On PostgreSQL rows are streamed with COPY, elsewhere with batched
+executemany. Everything is drawn from one seed, so the same arguments give
+the same rows. Adds to whatever is in the database; never run it against
+production.
+"""
+
+import json
+import random
+import time
+from bisect import bisect
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from models import (
+    db, Product, Order, OrderItem, CustomerCare, ContactMessage, SalesRollup, IdempotencyKey,
+    bulk_insert, bump_generations, chunked, customer_orders_generation, touch_catalog
+)
+
+ITEMS = [
+    ('चावल', 'Rice'), ('गेहूं आटा', 'Wheat Flour'), ('चीनी', 'Sugar'), ('नमक', 'Salt'),
+    ('सरसों तेल', 'Mustard Oil'), ('तूर दाल', 'Toor Dal'), ('मूंग दाल', 'Moong Dal'),
+    ('चना दाल', 'Chana Dal'), ('चाय पत्ती', 'Tea'), ('हल्दी', 'Turmeric'),
+    ('मिर्च पाउडर', 'Chili Powder'), ('धनिया पाउडर', 'Coriander'), ('जीरा', 'Cumin'),
+    ('साबुन', 'Soap'), ('शैम्पू', 'Shampoo'), ('बिस्कुट', 'Biscuits'), ('घी', 'Ghee'),
+    ('पोहा', 'Poha'), ('सूजी', 'Semolina'), ('बेसन', 'Gram Flour'), ('गुड़', 'Jaggery'),
+    ('मूंगफली', 'Peanuts'), ('रिफाइंड तेल', 'Refined Oil'), ('माचिस', 'Matchbox'),
+    ('अगरबत्ती', 'Incense Sticks'), ('डिटर्जेंट', 'Detergent'), ('टूथपेस्ट', 'Toothpaste'),
+    ('नूडल्स', 'Noodles'), ('कॉफ़ी', 'Coffee'), ('दूध पाउडर', 'Milk Powder'),
+]
+BRANDS = ['', 'Tata', 'Aashirvaad', 'Fortune', 'Patanjali', 'Dabur', 'Amul', 'Saffola',
+          'Everest', 'MDH', 'Parle', 'Britannia']
+VARIANTS = ['', 'Premium', 'Organic', 'Classic', 'Gold', 'Family Pack', 'Local', 'Super']
+SIZES = [('100g', 0.2), ('250g', 0.4), ('500g', 0.7), ('1kg', 1.0), ('2kg', 1.9), ('5kg', 4.5),
+         ('200ml', 0.3), ('500ml', 0.6), ('1L', 1.0)]
+FIRST_NAMES = ['Ramesh', 'Sunita', 'Amit', 'Priya', 'Suresh', 'Kavita', 'Rahul', 'Anita', 'Vijay',
+               'Pooja', 'Manoj', 'Rekha', 'Sanjay', 'Neha', 'Deepak', 'Geeta', 'Arjun', 'Meena']
+LAST_NAMES = ['Sharma', 'Verma', 'Gupta', 'Yadav', 'Singh', 'Patel', 'Kumar', 'Jain', 'Mishra',
+              'Tiwari', 'Chauhan', 'Agarwal']
+LOCALITIES = ['Gandhi Nagar', 'Station Road', 'Nehru Colony', 'Shivaji Chowk', 'Ram Nagar',
+              'Subhash Marg', 'Civil Lines', 'Old Bazaar']
+
+# (value, weight) tables
+ITEM_COUNTS = [(1, 30), (2, 25), (3, 18), (4, 12), (5, 7), (6, 4), (7, 2), (8, 2)]
+QUANTITIES = [(1, 60), (2, 22), (3, 10), (4, 5), (5, 3)]
+PAYMENT_METHODS = [('cod', 70), ('upi', 30)]
+ORDER_STATUSES = [  # (younger than, statuses)
+    (timedelta(hours=2), [('pending', 70), ('confirmed', 28), ('cancelled', 2)]),
+    (timedelta(days=2), [('pending', 15), ('confirmed', 55), ('delivered', 25), ('cancelled', 5)]),
+    (None, [('pending', 1), ('confirmed', 2), ('delivered', 88), ('cancelled', 9)]),
+]
+ISSUE_TYPES = [('not_received', 25), ('quality', 20), ('wrong_item', 15), ('damaged', 12),
+               ('payment', 10), ('refund', 10), ('app', 5), ('other', 3)]
+ISSUE_PRIORITIES = [('low', 15), ('normal', 60), ('high', 20), ('urgent', 5)]
+ISSUE_STATUSES = [
+    (timedelta(days=1), [('open', 70), ('in-progress', 25), ('resolved', 5)]),
+    (timedelta(days=7), [('open', 30), ('in-progress', 40), ('resolved', 30)]),
+    (None, [('open', 5), ('in-progress', 10), ('resolved', 85)]),
+]
+ISSUE_DESCRIPTIONS = {
+    'not_received': 'ऑर्डर अभी तक नहीं मिला (Order not received yet)',
+    'quality': 'सामान की क्वालिटी ठीक नहीं थी (Poor quality)',
+    'wrong_item': 'गलत सामान आया (Received the wrong item)',
+    'damaged': 'पैकेट फटा हुआ था (Packet was damaged)',
+    'payment': 'UPI पेमेंट कट गया पर ऑर्डर नहीं हुआ (Payment deducted, no order)',
+    'refund': 'रिफंड अभी तक नहीं आया (Refund still pending)',
+    'app': 'वेबसाइट पर कार्ट खाली हो जाता है (Cart keeps emptying)',
+    'other': 'दुकान का समय बताइए (Please share shop timings)',
+}
+MESSAGES = [
+    'क्या आप होम डिलीवरी करते हैं? (Do you deliver?)',
+    'Please add more organic products.',
+    'दुकान रविवार को खुली रहती है? (Open on Sunday?)',
+    'My order was delivered late.',
+    'Do you accept bulk orders for a wedding?',
+    'कृपया पतंजलि का सामान भी रखें (Please stock Patanjali products)',
+]
+
+BATCH_SIZE = 50000
+INDEX_REBUILD_MIN_ROWS = 100000  # Bigger order loads drop and rebuild indexes (PostgreSQL)
+
+
+# ==================== Sampling Helpers ====================
+
+class Weighted:
+    """Draws values from a (value, weight) table."""
+
+    def __init__(self, pairs):
+        pairs = list(pairs)
+        self.values = [value for value, _ in pairs]
+        self.cumulative = list(accumulate(weight for _, weight in pairs))
+        self.total = self.cumulative[-1]
+
+    def draw(self, rng):
+        return self.values[bisect(self.cumulative, rng.random() * self.total)]
+
+    def sample(self, rng, k):
+        """k draws at once, much cheaper per value than draw()."""
+        return rng.choices(self.values, cum_weights=self.cumulative, k=k)
+
+
+def zipf(values, exponent, rng):
+    """A Weighted over values in random rank order, weight 1/rank**exponent."""
+    ranked = list(values)
+    rng.shuffle(ranked)
+    return Weighted((value, 1 / rank ** exponent) for rank, value in enumerate(ranked, 1))
+
+
+def _by_age(table):
+    return [(limit, Weighted(pairs)) for limit, pairs in table]
+
+
+def _draw_by_age(tables, age, rng):
+    for limit, weighted in tables:
+        if limit is None or age < limit:
+            return weighted.draw(rng)
+
+
+def recent_time(rng, now, days):
+    """A moment in the last `days` days, denser towards now (quadratic growth)."""
+    return now - timedelta(seconds=days * 86400 * rng.random() ** 2)
+
+
+def customer_mobiles(count, seed=42):
+    """The pool of customer mobile numbers orders are placed from."""
+    rng = random.Random(f"{seed}-mobiles")
+    return [f"{rng.choice('6789')}{rng.randrange(10 ** 9):09d}" for _ in range(count)]
+
+
+def customer_profile(mobile):
+    """Name and address that always go with a mobile."""
+    number = int(mobile)
+    name = f"{FIRST_NAMES[number % len(FIRST_NAMES)]} {LAST_NAMES[number // 31 % len(LAST_NAMES)]}"
+    address = (f"House {number // 997 % 400 + 1}, Ward {number // 7 % 30 + 1}, "
+               f"{LOCALITIES[number // 13 % len(LOCALITIES)]}")
+    return name, address
+
+
+# ==================== Row Generators ====================
+
+def generate_products(count, seed=42, now=None):
+    """
+    Build product rows.
+
+    Returns:
+        list: (name, price, image, is_available, created_at) tuples
+    """
+    rng = random.Random(f"{seed}-products")
+    now = now or datetime.utcnow()
+    base_prices = {english: rng.randrange(20, 400) for _, english in ITEMS}
+    products = []
+    for i in range(count):
+        hindi, english = ITEMS[i % len(ITEMS)]
+        brand = BRANDS[(i // len(ITEMS)) % len(BRANDS)]
+        variant = VARIANTS[(i // (len(ITEMS) * len(BRANDS))) % len(VARIANTS)]
+        size, factor = rng.choice(SIZES)
+        label = ' '.join(part for part in (brand, english, variant) if part)
+        price = round(base_prices[english] * factor * rng.uniform(0.8, 1.3))
+        products.append((
+            f"{hindi} ({label}) - {size}", float(max(price, 5)), 'default.png',
+            rng.random() > 0.08, recent_time(rng, now, 730)
+        ))
+    return products
+
+
+def generate_orders(count, products, mobiles, first_id, seed=42, items='both',
+                    product_skew=1.1, customer_skew=0.8, days=365, now=None):
+    """
+    Build orders and their line items, lazily.
+
+    Args:
+        count: Number of orders
+        products: [(id, name, price)] to pick items from
+        mobiles: Customer mobile pool
+        first_id: Id of the first order (ids are assigned here so items can refer to them)
+        items: 'both' (JSON column and order_items rows, like create_order) or 'json' only
+        product_skew, customer_skew: Zipf exponents
+
+    Yields:
+        tuple: (order tuple, [order item tuples]); order tuples are (id, customer_name,
+            mobile, address, items, total, payment_method, status, date), item tuples
+            (order_id, product_id, name, unit_price, qty)
+    """
+    rng = random.Random(f"{seed}-orders")
+    now = now or datetime.utcnow()
+    pick_product = zipf(range(len(products)), product_skew, rng)
+    pick_customer = zipf(range(len(mobiles)), customer_skew, rng)
+    item_counts = Weighted(ITEM_COUNTS)
+    quantities = Weighted(QUANTITIES)
+    payment_methods = Weighted(PAYMENT_METHODS)
+    statuses = _by_age(ORDER_STATUSES)
+    # The JSON for each product up to its qty, matching json.dumps() of a cart item
+    prefixes = [
+        f'{{"id": {product_id}, "name": {json.dumps(name)}, "price": {json.dumps(price)}, "qty": '
+        for product_id, name, price in products
+    ]
+    profiles = [customer_profile(mobile) for mobile in mobiles]
+    normalized = items == 'both'
+    span = days * 86400
+
+    # Draw a chunk of orders' random choices at a time: rng.choices() is far
+    # cheaper per value than a Python-level draw per field
+    for chunk_start in range(first_id, first_id + count, 10000):
+        order_ids = range(chunk_start, min(chunk_start + 10000, first_id + count))
+        sizes = item_counts.sample(rng, len(order_ids))
+        picks = iter(pick_product.sample(rng, sum(sizes)))
+        qtys = iter(quantities.sample(rng, sum(sizes)))
+        customers = pick_customer.sample(rng, len(order_ids))
+        payments = payment_methods.sample(rng, len(order_ids))
+        for order_id, size, customer, payment in zip(order_ids, sizes, customers, payments):
+            line_items = []
+            parts = []
+            total = 0.0
+            seen = set()
+            for _ in range(size):
+                index = next(picks)
+                qty = next(qtys)
+                if index in seen:
+                    continue
+                seen.add(index)
+                product_id, name, price = products[index]
+                total += price * qty
+                parts.append(f'{prefixes[index]}{qty}}}')
+                if normalized:
+                    line_items.append((order_id, product_id, name, price, qty))
+            age = timedelta(seconds=span * rng.random() ** 2)
+            name, address = profiles[customer]
+            yield (
+                (order_id, name, mobiles[customer], address, '[' + ', '.join(parts) + ']', total,
+                 payment, _draw_by_age(statuses, age, rng), now - age),
+                line_items
+            )
+
+
+def generate_issues(count, mobiles, order_ids=None, seed=42, days=180, now=None):
+    """
+    Build customer care issue rows.
+
+    Args:
+        order_ids: (low, high) range of order ids that issues may refer to
+
+    Returns:
+        list: (name, email, phone, order_id, issue_type, description, priority, status,
+            created_at, updated_at, admin_response, resolved_at) tuples
+    """
+    rng = random.Random(f"{seed}-issues")
+    now = now or datetime.utcnow()
+    issue_types = Weighted(ISSUE_TYPES)
+    priorities = Weighted(ISSUE_PRIORITIES)
+    statuses = _by_age(ISSUE_STATUSES)
+    issues = []
+    for i in range(count):
+        mobile = rng.choice(mobiles)
+        name, _ = customer_profile(mobile)
+        issue_type = issue_types.draw(rng)
+        created = recent_time(rng, now, days)
+        status = _draw_by_age(statuses, now - created, rng)
+        updated = created if status == 'open' else min(now, created + timedelta(hours=rng.expovariate(1 / 12)))
+        order_id = None
+        if order_ids and issue_type != 'app' and rng.random() < 0.7:
+            order_id = str(rng.randint(*order_ids))
+        issues.append((
+            name, f"{name.replace(' ', '.').lower()}{i}@example.com", mobile, order_id, issue_type,
+            ISSUE_DESCRIPTIONS[issue_type], priorities.draw(rng), status, created, updated,
+            None if status == 'open' else 'हम देख रहे हैं (We are looking into it)',
+            updated if status == 'resolved' else None
+        ))
+    return issues
+
+
+def generate_messages(count, seed=42, days=180, now=None):
+    """
+    Build contact message rows.
+
+    Returns:
+        list: (name, email, email_normalized, message, is_read, admin_reply, created_at) tuples
+    """
+    rng = random.Random(f"{seed}-messages")
+    now = now or datetime.utcnow()
+    messages = []
+    for i in range(count):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        email = f"{name.split()[0].lower()}{i}@example.com"
+        created = recent_time(rng, now, days)
+        is_read = now - created > timedelta(days=2) or rng.random() < 0.3
+        reply = 'धन्यवाद! (Thank you!)' if is_read and rng.random() < 0.4 else None
+        messages.append((name, email, email, rng.choice(MESSAGES), is_read, reply, created))
+    return messages
+
+
+# ==================== Loading ====================
+
+def _next_id(model):
+    return (db.session.query(db.func.max(model.id)).scalar() or 0) + 1
+
+
+def _sync_sequence(model):
+    """Move a PostgreSQL id sequence past explicitly inserted ids."""
+    if db.session.get_bind().dialect.name == 'postgresql':
+        table = model.__tablename__
+        db.session.execute(db.text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f"(SELECT COALESCE(MAX(id), 0) + 1 FROM {table}), false)"
+        ))
+
+
+@contextmanager
+def deferred_indexes(tables):
+    """
+    Drop secondary indexes and foreign keys for a bulk load and recreate them after.
+
+    One index build is much cheaper than updating every index per row. The
+    drops, the load and the rebuild share a transaction, so a failed load
+    leaves the schema as it was; the tables stay locked until the commit.
+    """
+    rebuild = []
+    for table in tables:
+        indexes = db.session.execute(db.text(
+            "SELECT indexrelid::regclass::text, pg_get_indexdef(indexrelid) FROM pg_index "
+            "WHERE indrelid = CAST(:table AS regclass) AND NOT indisprimary AND NOT indisunique"
+        ), {'table': table}).all()
+        foreign_keys = db.session.execute(db.text(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = CAST(:table AS regclass) AND contype = 'f'"
+        ), {'table': table}).all()
+        for name, definition in indexes:
+            db.session.execute(db.text(f"DROP INDEX {name}"))
+            rebuild.append(definition)
+        for name, definition in foreign_keys:
+            db.session.execute(db.text(f"ALTER TABLE {table} DROP CONSTRAINT {name}"))
+            rebuild.append(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition}")
+    yield
+    db.session.execute(db.text("SET LOCAL maintenance_work_mem = '256MB'"))
+    for statement in rebuild:
+        db.session.execute(db.text(statement))
+
+
+def reset_data():
+    """Delete all products, orders (and their idempotency keys), issues, messages and rollups."""
+    models = (IdempotencyKey, OrderItem, Order, CustomerCare, ContactMessage, Product, SalesRollup)
+    if db.session.get_bind().dialect.name == 'postgresql':
+        tables = ', '.join(model.__tablename__ for model in models)
+        db.session.execute(db.text(f"TRUNCATE {tables} RESTART IDENTITY"))
+    else:
+        for model in models:
+            db.session.execute(db.delete(model))
+    db.session.commit()
+
+
+def generate(products=0, orders=0, customers=1000, issues=0, messages=0, items='both',
+             seed=42, reset=False, batch_size=BATCH_SIZE, log=print):
+    """
+    Generate and bulk-load synthetic data (needs an app context).
+
+    Orders are placed for the new products, or for existing ones when no
+    products are generated. Afterwards the sales rollups are rebuilt and
+    the catalog and affected customers' cached order lists invalidated.
+
+    Args:
+        products, orders, issues, messages: Rows to add
+        customers: Size of the customer mobile pool (see customer_mobiles())
+        items: 'both' or 'json' (orders without order_items rows)
+        seed: Random seed
+        reset: Empty the tables first (see reset_data())
+        log: Called with a progress line per table
+
+    Returns:
+        dict: Rows added per table and total seconds
+    """
+    postgres = db.session.get_bind().dialect.name == 'postgresql'
+    return _generate(products, orders, customers, issues, messages, items, seed, reset, batch_size, log,
+                     bulk=postgres and orders >= INDEX_REBUILD_MIN_ROWS)
+
+
+def _generate(products, orders, customers, issues, messages, items, seed, reset, batch_size, log, bulk):
+    started = time.perf_counter()
+    now = datetime.utcnow()
+    counts = {}
+    if reset:
+        reset_data()
+
+    def timed(name, load):
+        table_started = time.perf_counter()
+        counts[name] = load()
+        db.session.commit()
+        log(f"{name}: {counts[name]} rows in {time.perf_counter() - table_started:.1f}s")
+
+    if products:
+        first_product = _next_id(Product)
+        timed('products', lambda: bulk_insert(
+            Product.__table__, ['id', 'name', 'price', 'image', 'is_available', 'created_at'],
+            ((first_product + i,) + row for i, row in enumerate(generate_products(products, seed, now))),
+            batch_size
+        ))
+        _sync_sequence(Product)
+        catalog_filter = Product.id >= first_product
+    else:
+        catalog_filter = db.true()
+
+    mobiles = customer_mobiles(customers, seed)
+    first_order = _next_id(Order)
+    if orders:
+        catalog = [tuple(row) for row in db.session.execute(
+            db.select(Product.id, Product.name, Product.price).where(catalog_filter).order_by(Product.id)
+        )]
+        if not catalog:
+            raise ValueError("No products to place orders for")
+
+        def load_orders():
+            rows = generate_orders(orders, catalog, mobiles, first_order, seed, items, now=now)
+            order_columns = ['id', 'customer_name', 'mobile', 'address', 'items', 'total',
+                             'payment_method', 'status', 'date']
+            item_columns = ['order_id', 'product_id', 'name', 'unit_price', 'qty']
+            loaded = item_count = 0
+            with deferred_indexes(['orders', 'order_items']) if bulk else nullcontext():
+                for batch in chunked(rows, batch_size):
+                    loaded += bulk_insert(Order.__table__, order_columns, (order for order, _ in batch), batch_size)
+                    item_count += bulk_insert(
+                        OrderItem.__table__, item_columns,
+                        (item for _, line_items in batch for item in line_items), batch_size
+                    )
+            counts['order_items'] = item_count
+            return loaded
+
+        timed('orders', load_orders)
+        _sync_sequence(Order)
+
+    if issues:
+        order_range = (first_order, first_order + orders - 1) if orders else None
+        timed('customer_care', lambda: bulk_insert(
+            CustomerCare.__table__,
+            ['name', 'email', 'phone', 'order_id', 'issue_type', 'description', 'priority', 'status',
+             'created_at', 'updated_at', 'admin_response', 'resolved_at'],
+            generate_issues(issues, mobiles, order_range, seed, now=now), batch_size
+        ))
+
+    if messages:
+        timed('contact_messages', lambda: bulk_insert(
+            ContactMessage.__table__,
+            ['name', 'email', 'email_normalized', 'message', 'is_read', 'admin_reply', 'created_at'],
+            generate_messages(messages, seed, now=now), batch_size
+        ))
+
+    # Caches and rollups must see the new rows
+    if orders:
+        from sales_rollups import recompute_rollups
+        recompute_rollups()
+        bump_generations(customer_orders_generation(mobile) for mobile in mobiles)
+    touch_catalog()
+
+    counts['seconds'] = round(time.perf_counter() - started, 2)
+    return counts
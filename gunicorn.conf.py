@@ -0,0 +1,155 @@
+"""
+Gunicorn configuration
+Worker and thread counts derived from the CPUs and memory the container
+actually has.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+GUNICORN_MODE picks the concurrency model:
+    gthread (default)  WORKERS processes x GUNICORN_THREADS threads each.
+                       Requests spend most of their time waiting on
+                       Postgres or Cloudinary, so threads add throughput
+                       for little memory.
+    sync               One request at a time per process (gunicorn's
+                       default), for debugging thread-safety issues.
+
+Every value can be overridden from the environment:
+    WEB_CONCURRENCY           worker processes
+    GUNICORN_THREADS          threads per worker (gthread only)
+    GUNICORN_WORKER_MEMORY_MB memory budgeted per worker when sizing
+    GUNICORN_TIMEOUT          seconds before a stuck worker is restarted
+    GUNICORN_MAX_REQUESTS     recycle workers after this many requests (0 = never)
+    PORT                      listening port (set by Render)
+    METRICS_DIR               where workers share /metrics values (default:
+                              a fresh temporary directory per master)
+
+The database pool (see config.engine_options) is per worker, so
+DB_POOL_SIZE defaults to the thread count: every thread can hold a
+connection without waiting on the pool.
+"""
+
+import os
+import shutil
+import tempfile
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def cpu_count():
+    """CPUs available to this process, honouring affinity and cgroup quotas."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    # cgroup v2: "<quota> <period>" or "max <period>"
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cpus = min(cpus, max(1, int(quota) // int(period)))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def memory_limit_mb():
+    """Memory available to this container in MB (cgroup limit or physical RAM)."""
+    for path in ('/sys/fs/cgroup/memory.max',                    # cgroup v2
+                 '/sys/fs/cgroup/memory/memory.limit_in_bytes'):  # cgroup v1
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        # "max" or a huge number means no limit
+        if value.isdigit() and int(value) < 1 << 50:
+            return int(value) // (1024 * 1024)
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return 512
+
+
+def default_workers(cpus, memory_mb, worker_memory_mb):
+    """
+    Pick a worker count: 2 * CPUs + 1, capped by memory.
+
+    Args:
+        cpus: Available CPUs
+        memory_mb: Memory limit in MB
+        worker_memory_mb: Budget per worker process in MB
+
+    Returns:
+        int: Number of workers (at least 1)
+    """
+    # Leave room for the master process and the page cache
+    by_memory = (memory_mb - worker_memory_mb // 2) // worker_memory_mb
+    return max(1, min(2 * cpus + 1, by_memory))
+
+
+mode = os.environ.get('GUNICORN_MODE', 'gthread')
+if mode not in ('gthread', 'sync'):
+    raise ValueError(f"GUNICORN_MODE must be 'gthread' or 'sync', not {mode!r}")
+
+worker_memory_mb = _env_int('GUNICORN_WORKER_MEMORY_MB', 128)
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = _env_int('WEB_CONCURRENCY', default_workers(cpu_count(), memory_limit_mb(), worker_memory_mb))
+worker_class = mode
+threads = _env_int('GUNICORN_THREADS', 4) if mode == 'gthread' else 1
+
+timeout = _env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = timeout
+keepalive = 5
+
+# Restart workers now and then so slow leaks cannot build up; the jitter
+# stops them all restarting at once
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 10000)
+max_requests_jitter = max_requests // 10
+
+# Heartbeat files on tmpfs: a slow container disk otherwise makes the
+# master think healthy workers are stuck
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+
+# Read by config.engine_options() when the workers import the app
+if not os.environ.get('DB_POOL_SIZE'):
+    os.environ['DB_POOL_SIZE'] = str(threads)
+
+# Workers share their /metrics values through files in this directory; a
+# fresh one per master, so a restart never adds up an old run's counters
+_own_metrics_dir = 'METRICS_DIR' not in os.environ
+if _own_metrics_dir:
+    os.environ['METRICS_DIR'] = tempfile.mkdtemp(prefix='kirana-metrics-')
+
+
+def on_starting(server):
+    print(f"Gunicorn: {workers} {mode} worker(s) x {threads} thread(s), "
+          f"DB pool {os.environ['DB_POOL_SIZE']}+{os.environ.get('DB_MAX_OVERFLOW', '5')} per worker")
+
+
+def post_worker_init(worker):
+    from app import app, STARTUP_SECONDS
+    from models import db, limit_statement_time
+    worker.log.info("App loaded in %.0f ms", STARTUP_SECONDS * 1000)
+    # Only web requests get the statement timeout; `flask` commands,
+    # migrations and scripts run without one
+    with app.app_context():
+        limit_statement_time(db.engine, app.config['STATEMENT_TIMEOUT_MS'])
+
+
+def child_exit(server, worker):
+    from metrics import mark_process_dead
+    mark_process_dead(worker.pid)
+
+
+def on_exit(server):
+    if _own_metrics_dir:
+        shutil.rmtree(os.environ['METRICS_DIR'], ignore_errors=True)
@@ -0,0 +1,315 @@
+"""
+Image Derivatives Module
+Resized, recompressed variants of locally stored product images.
+
+Every local image gets thumb, card and detail sizes in WebP and JPEG,
+named after a hash of the source file's content, under
+static/images/uploads/derived/. A JSON manifest maps each source file to its
+variants, and the product_image() template helper turns that into a
+<picture> element with srcset, so browsers download a small WebP instead
+of the original upload. Images without derivatives (or hosted on
+Cloudinary) are rendered exactly as before.
+
+Pillow is optional: without it nothing is generated and the helper falls
+back to the original files.
+"""
+
+import fcntl
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+
+from flask import current_app
+from markupsafe import Markup, escape
+
+from static_assets import asset_url
+
+try:
+    from PIL import Image, ImageOps
+    PILLOW_ENABLED = True
+except ImportError:
+    PILLOW_ENABLED = False
+
+
+DERIVED_DIR = 'derived'
+MANIFEST_NAME = 'manifest.json'
+
+# Longest side in pixels; images are never upscaled
+SIZES = {
+    'thumb': 160,
+    'card': 400,
+    'detail': 800,
+}
+
+FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+DEFAULT_SIZES_ATTR = {
+    'thumb': '64px',
+    'card': '(min-width: 768px) 25vw, 50vw',
+    'detail': '(min-width: 768px) 50vw, 100vw',
+}
+
+
+def _derived_path(*parts):
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], DERIVED_DIR, *parts)
+
+
+def content_hash(data):
+    """Short hash of an image's bytes, used in derivative filenames."""
+    return hashlib.sha1(data).hexdigest()[:16]
+
+
+# ==================== Manifest ====================
+
+_manifest = {}
+_manifest_mtime = None
+_checked_at = 0.0
+_manifest_lock = threading.Lock()
+
+
+def get_manifest(max_age=1.0):
+    """
+    Get the derivative manifest, re-reading the file at most every max_age seconds.
+
+    Returns:
+        dict: source filename -> {'hash', 'variants': {size: {'width', 'webp', 'jpeg'}}}
+    """
+    global _manifest, _manifest_mtime, _checked_at
+    now = time.monotonic()
+    if now - _checked_at < max_age:
+        return _manifest
+
+    path = _derived_path(MANIFEST_NAME)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        mtime = None
+    if mtime != _manifest_mtime:
+        with _manifest_lock:
+            try:
+                with open(path, encoding='utf-8') as f:
+                    _manifest = json.load(f)
+            except (OSError, ValueError):
+                _manifest = {}
+            _manifest_mtime = mtime
+    _checked_at = now
+    return _manifest
+
+
+def _update_manifest(changes, remove=()):
+    """Merge (or remove) entries in the manifest under an exclusive file lock."""
+    global _checked_at
+    directory = _derived_path()
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, MANIFEST_NAME)
+    with open(os.path.join(directory, '.manifest.lock'), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            with open(path, encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+        manifest.update(changes)
+        for source in remove:
+            manifest.pop(source, None)
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, sort_keys=True)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    _checked_at = 0.0
+
+
+# ==================== Generation ====================
+
+def _encode(image, fmt):
+    """Encode a PIL image, flattening transparency for JPEG."""
+    options = dict(FORMATS[fmt])
+    pil_format = options.pop('format')
+    if pil_format == 'JPEG':
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+    elif image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA')
+    buffer = io.BytesIO()
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def create_derivatives(source, force=False):
+    """
+    Generate every size and format for one local image.
+
+    Args:
+        source: Filename relative to the upload folder
+        force: Regenerate even if the manifest already has this content
+
+    Returns:
+        dict or None: The manifest entry, or None if nothing was generated
+    """
+    if not PILLOW_ENABLED or not source or source.startswith('http'):
+        return None
+
+    try:
+        with open(os.path.join(current_app.config['UPLOAD_FOLDER'], source), 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+
+    digest = content_hash(data)
+    existing = get_manifest(max_age=0).get(source)
+    if existing and existing['hash'] == digest and not force:
+        return existing
+
+    try:
+        original = ImageOps.exif_transpose(Image.open(io.BytesIO(data)))
+        original.load()
+    except Exception as e:
+        print(f"Cannot read image {source}: {e}")
+        return None
+
+    os.makedirs(_derived_path(), exist_ok=True)
+    variants = {}
+    for size, max_side in SIZES.items():
+        image = original.copy()
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        variant = {'width': image.width}
+        for fmt in FORMATS:
+            name = f"{digest}-{size}.{'jpg' if fmt == 'jpeg' else fmt}"
+            path = _derived_path(name)
+            if force or not os.path.exists(path):
+                fd, tmp_path = tempfile.mkstemp(dir=_derived_path(), suffix='.tmp')
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(_encode(image, fmt))
+                os.chmod(tmp_path, 0o644)  # mkstemp creates owner-only files
+                os.replace(tmp_path, path)
+            variant[fmt] = f"{DERIVED_DIR}/{name}"
+        variants[size] = variant
+
+    entry = {'hash': digest, 'variants': variants}
+    _update_manifest({source: entry})
+    return entry
+
+
+def backfill_derivatives(sources, force=False):
+    """
+    Generate derivatives for many images.
+
+    Returns:
+        tuple: (generated, skipped) counts
+    """
+    generated = skipped = 0
+    for source in sources:
+        if create_derivatives(source, force=force):
+            generated += 1
+        else:
+            skipped += 1
+    return generated, skipped
+
+
+def _variant_paths(entries):
+    return {
+        path
+        for entry in entries
+        for variant in entry['variants'].values()
+        for fmt, path in variant.items() if fmt in FORMATS
+    }
+
+
+def forget_derivatives(sources):
+    """
+    Drop the manifest entries of deleted source images.
+
+    Returns:
+        list: Variant files (relative to the upload folder) that no
+              remaining entry uses; the caller deletes them
+    """
+    manifest = get_manifest(max_age=0)
+    sources = [source for source in sources if source in manifest]
+    if not sources:
+        return []
+    _update_manifest({}, remove=sources)
+    remaining = get_manifest(max_age=0)
+    removed = _variant_paths(manifest[source] for source in sources)
+    return sorted(removed - _variant_paths(remaining.values()))
+
+
+def orphaned_derivative_files():
+    """
+    List variant files that no manifest entry points to.
+
+    Returns:
+        list: Paths relative to the upload folder
+    """
+    used = _variant_paths(get_manifest(max_age=0).values())
+    try:
+        names = os.listdir(_derived_path())
+    except OSError:
+        return []
+    return [
+        f"{DERIVED_DIR}/{name}" for name in sorted(names)
+        if not name.startswith('.') and name != MANIFEST_NAME and not name.endswith('.tmp')
+        and f"{DERIVED_DIR}/{name}" not in used
+    ]
+
+
+# ==================== Template Helper ====================
+
+def _srcset(variants, fmt):
+    seen = {}
+    for variant in variants.values():
+        seen.setdefault(variant['width'], variant[fmt])
+    return ', '.join(
+        f"{asset_url('static', filename='images/uploads/' + path)} {width}w"
+        for width, path in sorted(seen.items())
+    )
+
+
+def product_image(image, alt='', css_class='', size='card', sizes=None):
+    """
+    Render a product image, with responsive WebP/JPEG variants when available.
+
+    Usage in templates:
+        {{ product_image(product.image, product.name, 'w-full h-full object-cover') }}
+
+    Args:
+        image: Product.image (local filename or full URL)
+        alt: Alt text
+        css_class: Classes for the <img>
+        size: Variant used as the plain src ('thumb', 'card', 'detail')
+        sizes: HTML sizes attribute (defaults per size)
+
+    Returns:
+        Markup: An <img>, or a <picture> wrapping one
+    """
+    attrs = f'alt="{escape(alt)}" class="{escape(css_class)}" loading="lazy"'
+    if image.startswith('http'):
+        return Markup(f'<img src="{escape(image)}" {attrs}>')
+
+    entry = get_manifest().get(image)
+    if not entry:
+        src = asset_url('static', filename='images/uploads/' + image)
+        return Markup(f'<img src="{escape(src)}" {attrs}>')
+
+    variants = entry['variants']
+    sizes = escape(sizes or DEFAULT_SIZES_ATTR.get(size, '100vw'))
+    src = asset_url('static', filename='images/uploads/' + variants[size]['jpeg'])
+    return Markup(
+        f'<picture style="display: contents">'
+        f'<source type="image/webp" srcset="{escape(_srcset(variants, "webp"))}" sizes="{sizes}">'
+        f'<img src="{escape(src)}" srcset="{escape(_srcset(variants, "jpeg"))}" sizes="{sizes}" {attrs}>'
+        f'</picture>'
+    )
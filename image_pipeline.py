@@ -0,0 +1,251 @@
+"""
+Image Pipeline Module
+Uploads product images in the background instead of inside the admin request.
+
+The admin request only saves the file to the upload folder (see
+image_storage.save_upload), points the product at that local copy (the
+placeholder) and queues a row in image_jobs. A small thread pool then uploads the file, retrying with
+backoff, and swaps the product's image to the uploaded URL. Jobs live in
+the database, so pending or failed ones can be resumed after a restart
+with `flask image-jobs`.
+"""
+
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from cloudinary_helper import upload_image_path, cloudinary_enabled
+from image_derivatives import create_derivatives, PILLOW_ENABLED
+from image_storage import release_image
+from metrics import IMAGE_UPLOAD_SECONDS
+from models import (
+    create_image_job, claim_image_job, complete_image_job, fail_image_job,
+    requeue_image_jobs, replace_product_image, touch_catalog
+)
+
+
+# Running jobs not updated for this long are assumed to have lost their worker
+STALE_AFTER = timedelta(minutes=10)
+
+
+class CloudinaryUploader:
+    """Uploads to Cloudinary."""
+
+    def upload(self, path):
+        return upload_image_path(path)
+
+
+class LocalUploader:
+    """
+    Stand-in for Cloudinary that copies files into a local directory.
+
+    Used for development and tests. fail_times makes the first uploads
+    raise, to exercise retries.
+    """
+
+    def __init__(self, directory, url_prefix, fail_times=0):
+        self.directory = directory
+        self.url_prefix = url_prefix
+        self.fail_times = fail_times
+        os.makedirs(directory, exist_ok=True)
+
+    def upload(self, path):
+        if self.fail_times > 0:
+            self.fail_times -= 1
+            raise RuntimeError("Simulated upload failure")
+        name = os.path.basename(path)
+        shutil.copyfile(path, os.path.join(self.directory, name))
+        return self.url_prefix + name
+
+
+def create_uploader(config):
+    """
+    Build the uploader named by the IMAGE_UPLOADER config value.
+
+    Returns:
+        CloudinaryUploader, LocalUploader, or None when images should stay
+        in the local upload folder
+    """
+    name = config.get('IMAGE_UPLOADER') or ('cloudinary' if cloudinary_enabled() else None)
+    if name == 'cloudinary':
+        return CloudinaryUploader()
+    if name == 'local':
+        # Stored relative to the upload folder, like locally saved images
+        return LocalUploader(os.path.join(config['UPLOAD_FOLDER'], 'cdn'), 'cdn/')
+    if name is None:
+        return None
+    raise ValueError(f"Unknown image uploader: {name}")
+
+
+_uploader = None
+_executor = None
+_lock = threading.Lock()
+
+
+def get_uploader():
+    """Get this process's uploader (False-y when uploads are disabled)."""
+    global _uploader
+    if _uploader is None:
+        with _lock:
+            if _uploader is None:
+                _uploader = create_uploader(current_app.config) or False
+    return _uploader or None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=current_app.config.get('IMAGE_UPLOAD_WORKERS', 2),
+                    thread_name_prefix='image-upload'
+                )
+    return _executor
+
+
+def run_image_job(app, job_id):
+    """
+    Upload one job's file, retrying until it succeeds or runs out of attempts.
+
+    Args:
+        app: Flask application (jobs run outside the request context)
+        job_id: ImageJob ID
+
+    Returns:
+        bool: True if the image was uploaded
+    """
+    with app.app_context():
+        uploader = get_uploader()
+        retry_delay = app.config.get('IMAGE_UPLOAD_RETRY_DELAY', 2.0)
+        while True:
+            job = claim_image_job(job_id)
+            if job is None:
+                return False  # Finished or taken by another worker
+
+            path = os.path.join(app.config['UPLOAD_FOLDER'], job.source)
+            uploader_name = type(uploader).__name__ if uploader else 'none'
+            started = time.perf_counter()
+            try:
+                if uploader is None:
+                    raise RuntimeError("No image uploader configured")
+                url = uploader.upload(path)
+            except Exception as e:
+                IMAGE_UPLOAD_SECONDS.observe(time.perf_counter() - started, uploader=uploader_name, result='error')
+                retry = job.attempts < job.max_attempts
+                fail_image_job(job_id, str(e), retry)
+                print(f"Image job {job_id} attempt {job.attempts} failed: {e}")
+                if not retry:
+                    return False
+                time.sleep(retry_delay * 2 ** (job.attempts - 1))
+                continue
+
+            IMAGE_UPLOAD_SECONDS.observe(time.perf_counter() - started, uploader=uploader_name, result='ok')
+            complete_image_job(job_id, url)
+            replace_product_image(job.product_id, job.source, url)
+            if not url.startswith('http'):
+                _derive(url)
+            # The uploaded copy replaces the staged file, unless another
+            # product or job uses the same content
+            release_image(job.source)
+            return True
+
+
+def _derive(filename):
+    """Create resized variants of a local image and refresh cached pages."""
+    if create_derivatives(filename):
+        touch_catalog()
+
+
+def derive_product_image(filename):
+    """
+    Create resized variants of an image that stays in the upload folder.
+
+    Runs on the upload thread pool (or inline when IMAGE_UPLOAD_WORKERS is 0).
+    """
+    if not PILLOW_ENABLED:
+        return
+    app = current_app._get_current_object()
+    if app.config.get('IMAGE_UPLOAD_WORKERS', 2) <= 0:
+        _derive(filename)
+    else:
+        _get_executor().submit(_derive_in_context, app, filename)
+
+
+def _derive_in_context(app, filename):
+    with app.app_context():
+        try:
+            _derive(filename)
+        except Exception as e:
+            print(f"Image variants for {filename} failed: {e}")
+
+
+def _release_in_context(app, image):
+    with app.app_context():
+        try:
+            release_image(image)
+        except Exception as e:
+            print(f"Releasing image {image} failed: {e}")
+
+
+def release_product_image(image):
+    """
+    Delete a product's former image once nothing uses it.
+
+    Cloudinary deletions run on the upload thread pool so the admin request
+    does not wait for them.
+    """
+    if not image or image == 'default.png':
+        return
+    app = current_app._get_current_object()
+    if app.config.get('IMAGE_UPLOAD_WORKERS', 2) <= 0:
+        _release_in_context(app, image)
+    else:
+        _get_executor().submit(_release_in_context, app, image)
+
+
+def submit_image_job(job_id):
+    """Run a job on the thread pool, or inline when IMAGE_UPLOAD_WORKERS is 0."""
+    app = current_app._get_current_object()
+    if app.config.get('IMAGE_UPLOAD_WORKERS', 2) <= 0:
+        run_image_job(app, job_id)
+    else:
+        _get_executor().submit(run_image_job, app, job_id)
+
+
+def ingest_product_image(product_id, filename):
+    """
+    Queue the upload of a staged image for a product.
+
+    Args:
+        product_id: Product whose image is the staged file
+        filename: Staged file from stage_upload()
+
+    Returns:
+        int or None: Job ID, or None when there is nowhere to upload to
+    """
+    if get_uploader() is None:
+        return None
+    job_id = create_image_job(
+        product_id, filename, max_attempts=current_app.config.get('IMAGE_UPLOAD_MAX_ATTEMPTS', 3)
+    )
+    submit_image_job(job_id)
+    return job_id
+
+
+def resume_image_jobs():
+    """
+    Requeue failed and stale jobs and run every pending one.
+
+    Returns:
+        list: IDs of the jobs submitted
+    """
+    job_ids = requeue_image_jobs(stale_before=datetime.utcnow() - STALE_AFTER)
+    for job_id in job_ids:
+        submit_image_job(job_id)
+    return job_ids
@@ -0,0 +1,189 @@
+"""
+Image Storage Module
+Content-addressed product image files and garbage collection.
+
+Uploads are stored as <content hash>.<ext>, so uploading the same picture
+twice reuses one file (and one Cloudinary asset, whose public_id is the
+same hash). Which files are still needed is derived from Product.image and
+the unfinished image jobs: release_image() deletes an image as soon as
+nothing references it, and collect_garbage() sweeps everything that
+slipped through (files from before content addressing, crashed uploads).
+"""
+
+import os
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from cloudinary_helper import delete_image, get_public_id_from_url, list_images, cloudinary_enabled
+from image_derivatives import content_hash, forget_derivatives, orphaned_derivative_files
+from models import get_referenced_images, is_image_referenced
+
+
+# Files younger than this are never collected: they may belong to an
+# upload whose product row is not committed yet
+DEFAULT_MIN_AGE = timedelta(hours=1)
+
+# Subdirectories of the upload folder holding product images
+IMAGE_DIRS = ('', 'cdn')
+
+
+def _upload_path(image):
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], image)
+
+
+def save_upload(file):
+    """
+    Store an uploaded image under its content hash.
+
+    Args:
+        file: Uploaded file (werkzeug FileStorage)
+
+    Returns:
+        tuple: (filename relative to the upload folder, is_new)
+    """
+    data = file.read()
+    ext = os.path.splitext(file.filename)[1].lower()
+    filename = f"{content_hash(data)}{ext}"
+    path = _upload_path(filename)
+    if os.path.exists(path):
+        return filename, False
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return filename, True
+
+
+def image_key(image):
+    """
+    Content hash an image is stored under, whether local or on Cloudinary.
+
+    Returns:
+        str: e.g. '3f2a9c0d1b7e4a55' for 'cdn/3f2a9c0d1b7e4a55.png'
+    """
+    if image.startswith('http'):
+        image = get_public_id_from_url(image) or image
+    return os.path.splitext(os.path.basename(image))[0]
+
+
+def is_same_image(a, b):
+    """Check whether two Product.image values hold the same content."""
+    return bool(a and b) and image_key(a) == image_key(b)
+
+
+def _delete_local(image):
+    """Delete a local image file and its resized variants."""
+    for path in [image] + forget_derivatives([image]):
+        try:
+            os.remove(_upload_path(path))
+        except FileNotFoundError:
+            pass
+
+
+def release_image(image):
+    """
+    Delete an image that no product or upload job uses any more.
+
+    Args:
+        image: Former Product.image value (local filename or Cloudinary URL)
+
+    Returns:
+        bool: True if the image was deleted
+    """
+    if not image or image == 'default.png' or is_image_referenced(image):
+        return False
+
+    if image.startswith('http'):
+        public_id = get_public_id_from_url(image)
+        if not public_id:
+            return False
+        return delete_image(public_id)
+
+    _delete_local(image)
+    return True
+
+
+def _modified(image):
+    try:
+        return datetime.utcfromtimestamp(os.stat(_upload_path(image)).st_mtime)
+    except OSError:
+        return datetime.min
+
+
+def _local_images():
+    """Yield (relative path, modified time) of every stored image file."""
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    for subdir in IMAGE_DIRS:
+        directory = os.path.join(upload_folder, subdir)
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.is_file() and not entry.name.startswith('.') and not entry.name.endswith('.tmp'):
+                name = f"{subdir}/{entry.name}" if subdir else entry.name
+                yield name, datetime.utcfromtimestamp(entry.stat().st_mtime)
+
+
+def find_garbage(min_age=DEFAULT_MIN_AGE, include_cloudinary=True):
+    """
+    Find stored images that nothing references.
+
+    Args:
+        min_age: Skip files created more recently than this
+        include_cloudinary: Also list the Cloudinary folder
+
+    Returns:
+        dict: {'local': [...], 'derived': [...], 'cloudinary': [...]}
+    """
+    referenced = get_referenced_images()
+    cutoff = datetime.utcnow() - min_age
+
+    local = [
+        name for name, modified in _local_images()
+        if name not in referenced and modified < cutoff
+    ]
+    derived = [path for path in orphaned_derivative_files() if _modified(path) < cutoff]
+
+    cloudinary_ids = []
+    if include_cloudinary and cloudinary_enabled():
+        referenced_ids = {get_public_id_from_url(image) for image in referenced if image.startswith('http')}
+        for public_id, created_at in list_images():
+            created = datetime.strptime(created_at, '%Y-%m-%dT%H:%M:%SZ') if created_at else None
+            if public_id not in referenced_ids and (created is None or created < cutoff):
+                cloudinary_ids.append(public_id)
+
+    return {
+        'local': local,
+        'derived': derived,
+        'cloudinary': cloudinary_ids
+    }
+
+
+def collect_garbage(dry_run=True, min_age=DEFAULT_MIN_AGE, include_cloudinary=True):
+    """
+    Delete unreferenced local files, resized variants and Cloudinary assets.
+
+    Args:
+        dry_run: Only report what would be deleted
+        min_age: Skip files created more recently than this
+        include_cloudinary: Also collect the Cloudinary folder
+
+    Returns:
+        dict: What was (or would be) deleted, as returned by find_garbage()
+    """
+    garbage = find_garbage(min_age, include_cloudinary)
+    if dry_run:
+        return garbage
+
+    # Variants of the files being deleted go with them
+    garbage['derived'] = sorted(set(garbage['derived']) | set(forget_derivatives(garbage['local'])))
+    for path in garbage['local'] + garbage['derived']:
+        try:
+            os.remove(_upload_path(path))
+        except FileNotFoundError:
+            pass
+    garbage['cloudinary'] = [public_id for public_id in garbage['cloudinary'] if delete_image(public_id)]
+    return garbage
@@ -2,7 +2,7 @@
 import os
 from dotenv import load_dotenv
 from werkzeug.security import generate_password_hash
-from models import init_db, add_product, add_admin, get_admin_by_username, get_products_count
+from models import init_db, add_admin, get_admin_by_username, add_sample_products
 
 # Load environment variables from .env file
 load_dotenv()
@@ -25,26 +25,9 @@ def setup_database():
         print(f"Master admin created: {admin_username} (password from .env)")
     
     # Add sample products if database is empty
-    if get_products_count() == 0:
-        sample_products = [
-            ('चावल (Rice) - 1kg', 60),
-            ('गेहूं आटा (Wheat Flour) - 1kg', 45),
-            ('चीनी (Sugar) - 1kg', 50),
-            ('नमक (Salt) - 1kg', 25),
-            ('सरसों तेल (Mustard Oil) - 1L', 180),
-            ('दाल (Toor Dal) - 1kg', 140),
-            ('चाय पत्ती (Tea) - 250g', 80),
-            ('हल्दी (Turmeric) - 100g', 35),
-            ('मिर्च पाउडर (Chili Powder) - 100g', 40),
-            ('धनिया पाउडर (Coriander) - 100g', 30),
-            ('साबुन (Soap)', 35),
-            ('शैम्पू (Shampoo)', 120),
-        ]
-        
-        for name, price in sample_products:
-            add_product(name, price)
-        
-        print(f"Added {len(sample_products)} sample products")
+    added = add_sample_products()
+    if added:
+        print(f"Added {added} sample products")
     
     print("Database setup complete!")
 
@@ -0,0 +1,423 @@
+"""
+Metrics Module
+Prometheus-style counters, gauges and histograms with a /metrics endpoint.
+
+Metrics are module-level objects updated in place:
+
+    ORDERS_PLACED.inc()
+    IMAGE_UPLOAD_SECONDS.observe(1.7, uploader='cloudinary', result='ok')
+
+Each gunicorn worker keeps its own values. When METRICS_DIR is set (by
+gunicorn.conf.py, to a fresh directory per master) a thread in every
+worker writes them to <METRICS_DIR>/<pid>.json each FLUSH_INTERVAL, and
+/metrics adds up the files of all workers, so whichever worker answers
+the scrape reports the whole server. When a worker exits the master folds
+its counters and histograms into archive.json (mark_process_dead), so
+totals survive worker restarts; its gauges are dropped. Without
+METRICS_DIR (python app.py, flask run) only the current process is
+reported.
+
+The endpoint answers loopback clients, or anyone sending
+"Authorization: Bearer <METRICS_TOKEN>" when a token is configured.
+Scrapes of /metrics are not counted as requests.
+"""
+
+import atexit
+import bisect
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+
+from flask import Response, current_app, g, request
+
+
+FLUSH_INTERVAL = 1.0
+ARCHIVE_NAME = 'archive.json'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+logger = logging.getLogger(__name__)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        """Current values as {label values: value}."""
+        with self._lock:
+            return {key: self._copy(value) for key, value in self._values.items()}
+
+    def _copy(self, value):
+        return value
+
+
+class Counter(_Metric):
+    """A value that only goes up."""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """A value that goes up and down; summed across live workers."""
+
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Observations counted into buckets, plus their sum and count."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (the last one is +Inf), sum
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def _copy(self, value):
+        return [list(value[0]), value[1]]
+
+
+class Registry:
+    """All metrics of this process, by name."""
+
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Duplicate metric {metric.name}")
+        self.metrics[metric.name] = metric
+
+    def snapshot(self):
+        """{name: {label values: value}} for every metric."""
+        return {name: metric.samples() for name, metric in self.metrics.items()}
+
+
+REGISTRY = Registry()
+
+
+# ==================== Metrics ====================
+
+HTTP_REQUESTS = Counter(
+    'kirana_http_requests_total', 'HTTP requests handled', ('endpoint', 'method', 'status')
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    'kirana_http_request_duration_seconds', 'Time to build a response', ('endpoint',)
+)
+HTTP_IN_FLIGHT = Gauge('kirana_http_requests_in_flight', 'Requests being handled right now')
+DB_QUERIES = Counter('kirana_db_queries_total', 'SQL statements run by requests', ('endpoint',))
+DB_POOL_CHECKED_OUT = Gauge('kirana_db_pool_checked_out', 'Database connections in use')
+DB_POOL_OVERFLOW = Gauge('kirana_db_pool_overflow', 'Connections open beyond pool_size (negative when below)')
+CACHE_REQUESTS = Counter(
+    'kirana_cache_requests_total', 'Cache lookups by cache and result (hit or miss)', ('cache', 'result')
+)
+IMAGE_UPLOAD_SECONDS = Histogram(
+    'kirana_image_upload_duration_seconds', 'Background image upload time', ('uploader', 'result'),
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+)
+ORDERS_PLACED = Counter('kirana_orders_placed_total', 'Orders placed through the website')
+CHATBOT_QUERIES = Counter('kirana_chatbot_queries_total', 'Chatbot messages answered', ('intent',))
+SEARCHES = Counter('kirana_product_searches_total', 'Product searches by result (hit or miss)', ('result',))
+
+
+# ==================== Multiprocess Store ====================
+
+_flusher = None
+_flusher_lock = threading.Lock()
+
+
+def _encode(snapshot):
+    return {name: [[list(key), value] for key, value in samples.items()] for name, samples in snapshot.items()}
+
+
+def _decode(data):
+    return {name: {tuple(key): value for key, value in samples} for name, samples in data.items()}
+
+
+def _read(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return _decode(json.load(f))
+    except (OSError, ValueError):
+        return {}
+
+
+def _write(path, snapshot):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(_encode(snapshot), f)
+    os.replace(tmp_path, path)
+
+
+def _merge(total, snapshot, include_gauges=True):
+    """Add one process's values into total (in place)."""
+    for name, samples in snapshot.items():
+        metric = REGISTRY.metrics.get(name)
+        if metric is None or (metric.kind == 'gauge' and not include_gauges):
+            continue
+        merged = total.setdefault(name, {})
+        for key, value in samples.items():
+            if metric.kind == 'histogram':
+                current = merged.get(key)
+                if current is None or len(current[0]) != len(value[0]):
+                    merged[key] = [list(value[0]), value[1]]
+                else:
+                    current[0] = [a + b for a, b in zip(current[0], value[0])]
+                    current[1] += value[1]
+            else:
+                merged[key] = merged.get(key, 0) + value
+    return total
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _update_pool_gauges():
+    from models import db
+    pool = db.engine.pool
+    if hasattr(pool, 'checkedout'):
+        DB_POOL_CHECKED_OUT.set(pool.checkedout())
+        DB_POOL_OVERFLOW.set(pool.overflow())
+
+
+def flush(directory):
+    """Write this process's values to <directory>/<pid>.json."""
+    os.makedirs(directory, exist_ok=True)
+    _write(os.path.join(directory, f"{os.getpid()}.json"), REGISTRY.snapshot())
+
+
+def _flush_forever(app, directory):
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        try:
+            with app.app_context():
+                _update_pool_gauges()
+            flush(directory)
+        except Exception as e:
+            logger.warning("Writing metrics failed: %s", e)
+
+
+def _ensure_flusher(app, directory):
+    """Start this process's flush thread (once per worker, after the fork)."""
+    global _flusher
+    if _flusher is not None and _flusher.is_alive():
+        return
+    with _flusher_lock:
+        if _flusher is None or not _flusher.is_alive():
+            _flusher = threading.Thread(
+                target=_flush_forever, args=(app, directory), name='metrics-flush', daemon=True
+            )
+            _flusher.start()
+            atexit.register(flush, directory)
+
+
+def collect(directory=None):
+    """
+    Values of every worker, added up.
+
+    Args:
+        directory: METRICS_DIR, or None for this process only
+
+    Returns:
+        dict: {name: {label values: value}}
+    """
+    own = REGISTRY.snapshot()
+    if not directory:
+        return own
+
+    total = _merge({}, _read(os.path.join(directory, ARCHIVE_NAME)), include_gauges=False)
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        names = []
+    for name in names:
+        pid = name[:-len('.json')]
+        if not (name.endswith('.json') and pid.isdigit()) or int(pid) == os.getpid():
+            continue
+        # A worker killed before the master archived it still counts; only
+        # its gauges are stale
+        _merge(total, _read(os.path.join(directory, name)), include_gauges=_pid_alive(int(pid)))
+    return _merge(total, own)
+
+
+def mark_process_dead(pid, directory=None):
+    """
+    Fold an exited worker's counters and histograms into the archive.
+
+    Called from gunicorn's child_exit hook in the master process.
+    """
+    directory = directory or os.environ.get('METRICS_DIR')
+    if not directory:
+        return
+    path = os.path.join(directory, f"{pid}.json")
+    if not os.path.exists(path):
+        return
+    with open(os.path.join(directory, '.archive.lock'), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        archive_path = os.path.join(directory, ARCHIVE_NAME)
+        archive = _merge({}, _read(archive_path), include_gauges=False)
+        _write(archive_path, _merge(archive, _read(path), include_gauges=False))
+        os.remove(path)
+
+
+# ==================== Exposition ====================
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(values):
+    """
+    Format collected values in the Prometheus text format.
+
+    Args:
+        values: As returned by collect()
+
+    Returns:
+        str: Exposition text
+    """
+    lines = []
+    for name, metric in sorted(REGISTRY.metrics.items()):
+        lines.append(f"# HELP {name} {metric.documentation}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        samples = values.get(name, {})
+        if not samples and not metric.labelnames:
+            samples = {(): [[0] * (len(metric.buckets) + 1), 0.0] if metric.kind == 'histogram' else 0}
+        for key, value in sorted(samples.items()):
+            if metric.kind != 'histogram':
+                lines.append(f"{name}{_labels(metric.labelnames, key)} {_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(metric.buckets + (float('inf'),), value[0]):
+                cumulative += count
+                le = (('le', _number(bound)),)
+                lines.append(f"{name}_bucket{_labels(metric.labelnames, key, le)} {cumulative}")
+            lines.append(f"{name}_sum{_labels(metric.labelnames, key)} {_number(value[1])}")
+            lines.append(f"{name}_count{_labels(metric.labelnames, key)} {cumulative}")
+    return '\n'.join(lines) + '\n'
+
+
+# ==================== Flask Integration ====================
+
+def _scrape_allowed():
+    token = current_app.config.get('METRICS_TOKEN')
+    if token:
+        return request.headers.get('Authorization') == f"Bearer {token}"
+    return request.remote_addr in ('127.0.0.1', '::1')
+
+
+def init_metrics(app):
+    """
+    Record request metrics and serve them at /metrics.
+
+    Config:
+        METRICS_ENABLED: Register the hooks and endpoint (default True)
+        METRICS_DIR: Directory shared by the workers (None: this process only)
+        METRICS_TOKEN: Bearer token required by /metrics (default: loopback only)
+    """
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+    directory = app.config.get('METRICS_DIR')
+
+    @app.before_request
+    def start_request_metrics():
+        if directory:
+            _ensure_flusher(app, directory)
+        # Prometheus' own scrapes are not traffic
+        if request.endpoint == 'metrics':
+            return
+        g.metrics_started = time.perf_counter()
+        HTTP_IN_FLIGHT.inc()
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return response
+        HTTP_IN_FLIGHT.dec()
+        endpoint = request.endpoint or 'unmatched'
+        HTTP_REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+        stats = g.get('query_stats')
+        if stats is not None and stats.count:
+            DB_QUERIES.inc(stats.count, endpoint=endpoint)
+        return response
+
+    @app.teardown_request
+    def finish_request_metrics(exc):
+        # after_request does not run when the view raised
+        if g.pop('metrics_started', None) is not None:
+            HTTP_IN_FLIGHT.dec()
+            HTTP_REQUESTS.inc(endpoint=request.endpoint or 'unmatched', method=request.method, status=500)
+
+    @app.route('/metrics')
+    def metrics():
+        if not _scrape_allowed():
+            return Response('Forbidden\n', status=403, mimetype='text/plain')
+        _update_pool_gauges()
+        return Response(render(collect(directory)), content_type=CONTENT_TYPE)
@@ -1,12 +1,47 @@
 """
 Data Migration Script: SQLite to PostgreSQL
 Run this AFTER setting up PostgreSQL and running flask db upgrade
+
+Usage:
+    python migrate_data.py                                # ./kirana.db
+    python migrate_data.py --source backup/kirana.db --batch-size 20000
+    python migrate_data.py --restart                      # ignore saved progress
+    python migrate_data.py --source moved/kirana.db --label 'kirana.db@3f0c2a9e1b'
+
+Each table streams out of SQLite in id order, a batch at a time, is
+COPYed into a temporary staging table and merged with one set-based
+INSERT that skips rows the database already has:
+
+    products  by name
+    admins    by username
+    settings  by key (so settings created by bootstrap are kept)
+    orders    by import_key '<source label>:<source id>'; their order_items
+              are built from the items JSON, as create_order does
+
+Each batch commits together with its checkpoint (the last source id per
+table, in migration_checkpoints), so an interrupted run resumes where it
+stopped and re-running a finished migration changes nothing. Products,
+admins and settings migrate in parallel, one thread and connection each.
+Orders start once products are done: products get new ids here, so the
+product ids in order items are mapped by name to the PostgreSQL rows
+(product_id is left NULL for products that did not make it).
+
+The source label is the file name plus a hash of its absolute path
+('kirana.db@3f0c2a9e1b'), so two copies of database.db in different
+directories are two sources. Pass --label with the label printed by the
+first run to resume a file that has moved since.
 """
 
+import argparse
+import hashlib
+import json
 import os
 import sys
 import sqlite3
-import json
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 
 # Add the app directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -15,115 +50,313 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from app import app, db
-from models import Product, Order, Admin, Setting
+from models import (
+    MigrationCheckpoint, bulk_insert, bump_generations, customer_orders_generation,
+    normalize_mobile, order_item_values
+)
+
+BATCH_SIZE = 10000
+
+# name: source table; select: (column, SQL used when an older kirana.db lacks it);
+# stage: staging columns after src_id; convert: SQLite row -> staging values;
+# merge: INSERT ... SELECT from the staging table, skipping existing rows
+Table = namedtuple('Table', ['name', 'select', 'stage', 'convert', 'merge'])
+
+
+def _convert_product(row, now):
+    return (row['name'], row['price'], row['image'] or 'default.png',
+            bool(row['is_available']), row['created_at'] or now)
+
+
+def _convert_admin(row, now):
+    return (row['username'], row['password'], bool(row['is_master']), row['created_at'] or now)
+
+
+def _convert_setting(row, now):
+    return (row['key'], row['value'])
+
+
+def _convert_order(row, now):
+    return (row['customer_name'], normalize_mobile(row['mobile']), row['address'], row['items'],
+            row['total'], row['payment_method'] or 'cod', row['status'] or 'pending', row['date'] or now)
+
+
+TABLES = [
+    Table(
+        'products',
+        [('name', None), ('price', None), ('image', "'default.png'"), ('is_available', '1'),
+         ('created_at', 'NULL')],
+        ['name', 'price', 'image', 'is_available', 'created_at'],
+        _convert_product,
+        # Product names are not unique in the schema, so dedupe in the query
+        """INSERT INTO products (name, price, image, is_available, created_at)
+           SELECT name, price, image, is_available, created_at FROM (
+               SELECT DISTINCT ON (name) * FROM stage_products ORDER BY name, src_id
+           ) s
+           WHERE NOT EXISTS (SELECT 1 FROM products p WHERE p.name = s.name)
+           ORDER BY src_id"""
+    ),
+    Table(
+        'admins',
+        [('username', None), ('password', None), ('is_master', '0'), ('created_at', 'NULL')],
+        ['username', 'password', 'is_master', 'created_at'],
+        _convert_admin,
+        """INSERT INTO admins (username, password, is_master, created_at)
+           SELECT username, password, is_master, created_at FROM stage_admins ORDER BY src_id
+           ON CONFLICT (username) DO NOTHING"""
+    ),
+    Table(
+        'settings',
+        [('key', None), ('value', None)],
+        ['key', 'value'],
+        _convert_setting,
+        """INSERT INTO settings (key, value)
+           SELECT key, value FROM stage_settings ORDER BY src_id
+           ON CONFLICT (key) DO NOTHING"""
+    ),
+    Table(
+        'orders',
+        [('customer_name', None), ('mobile', None), ('address', None), ('items', None), ('total', None),
+         ('payment_method', "'cod'"), ('status', "'pending'"), ('date', 'NULL')],
+        ['customer_name', 'mobile', 'address', 'items', 'total', 'payment_method', 'status', 'date',
+         'import_key'],
+        _convert_order,
+        """INSERT INTO orders (customer_name, mobile, address, items, total, payment_method, status,
+                               date, import_key)
+           SELECT customer_name, mobile, address, items, total, payment_method, status, date, import_key
+           FROM stage_orders ORDER BY src_id
+           ON CONFLICT (import_key) DO NOTHING
+           RETURNING id, import_key"""
+    ),
+]
+
+
+# ==================== Migration ====================
+
+def _source_query(conn, table):
+    """Keyset-paginated SELECT for a source table, or None if the table is missing."""
+    present = {row[1] for row in conn.execute(f"PRAGMA table_info({table.name})")}
+    if not present:
+        return None
+    columns = []
+    for column, fallback in table.select:
+        if column in present:
+            columns.append(column)
+        elif fallback is not None:
+            columns.append(f"{fallback} AS {column}")
+        else:
+            raise ValueError(f"{table.name}.{column} is missing in the source database")
+    return f"SELECT id, {', '.join(columns)} FROM {table.name} WHERE id > ? ORDER BY id LIMIT ?"
+
+
+def product_id_map(sqlite_path):
+    """
+    Map source product ids to PostgreSQL product ids.
+
+    The products merge dedupes by name, so a source product is the
+    PostgreSQL product with its name (the lowest id if several share it).
+
+    Returns:
+        dict: source product id -> product id
+    """
+    conn = sqlite3.connect(sqlite_path)
+    try:
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products'").fetchone():
+            return {}
+        source = conn.execute("SELECT id, name FROM products").fetchall()
+    finally:
+        conn.close()
+    with app.app_context():
+        by_name = dict(db.session.execute(
+            db.text("SELECT name, MIN(id) FROM products GROUP BY name")
+        ).all())
+    return {source_id: by_name[name] for source_id, name in source if name in by_name}
+
+
+def _insert_order_items(inserted, staged, product_ids):
+    """
+    COPY order_items for newly inserted orders from their items JSON.
+
+    Returns:
+        int: Items skipped because they could not be read
+    """
+    rows = []
+    skipped = 0
+    for order_id, import_key in inserted:
+        try:
+            items = staged[import_key][4]
+            cart = json.loads(items)
+        except (TypeError, ValueError):
+            continue
+        for item in cart if isinstance(cart, list) else []:
+            try:
+                values = order_item_values(item)
+            except (TypeError, ValueError, AttributeError):
+                skipped += 1
+                continue
+            rows.append((order_id, product_ids.get(values['product_id']), values['name'],
+                         values['unit_price'], values['qty']))
+    bulk_insert(db.table('order_items'), ['order_id', 'product_id', 'name', 'unit_price', 'qty'], rows)
+    return skipped
+
+
+def migrate_table(table, sqlite_path, source, batch_size=BATCH_SIZE, product_ids=None):
+    """
+    Copy one table, resuming from its checkpoint.
+
+    Runs in its own thread with its own app context (so its own session and
+    connection) and SQLite connection.
+
+    Args:
+        product_ids: product_id_map() for orders
+
+    Returns:
+        dict: table, read, inserted, seconds, the mobiles of inserted orders
+            and the order items skipped
+    """
+    started = time.perf_counter()
+    result = {'table': table.name, 'read': 0, 'inserted': 0, 'mobiles': set(), 'skipped_items': 0}
+    conn = sqlite3.connect(sqlite_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        query = _source_query(conn, table)
+        if query is None:
+            result['missing'] = True
+            return result
+        stage = f"stage_{table.name}"
+        stage_columns = ['src_id'] + table.stage
+        with app.app_context():
+            checkpoint = db.session.get(MigrationCheckpoint, (source, table.name))
+            if checkpoint is None:
+                checkpoint = MigrationCheckpoint(source=source, table_name=table.name, last_id=0, rows=0)
+                db.session.add(checkpoint)
+            last_id = checkpoint.last_id
+            while True:
+                batch = conn.execute(query, (last_id, batch_size)).fetchall()
+                if not batch:
+                    break
+                now = datetime.utcnow()
+                staged = []
+                for row in batch:
+                    values = (row['id'],) + table.convert(row, now)
+                    if table.name == 'orders':
+                        values += (f"{source}:{row['id']}",)
+                    staged.append(values)
+
+                # Temporary, emptied at commit; IF NOT EXISTS because pooled connections keep it
+                db.session.execute(db.text(
+                    f"CREATE TEMP TABLE IF NOT EXISTS {stage} ON COMMIT DELETE ROWS AS "
+                    f"SELECT id AS src_id, {', '.join(table.stage)} FROM {table.name} WITH NO DATA"
+                ))
+                bulk_insert(db.table(stage), stage_columns, staged)
+                merged = db.session.execute(db.text(table.merge))
+                if table.name == 'orders':
+                    inserted = merged.all()
+                    by_key = {values[-1]: values for values in staged}
+                    result['skipped_items'] += _insert_order_items(inserted, by_key, product_ids or {})
+                    result['mobiles'].update(by_key[import_key][2] for _, import_key in inserted)
+                    count = len(inserted)
+                else:
+                    count = merged.rowcount
 
-def migrate_data():
-    """Migrate data from SQLite to PostgreSQL."""
-    sqlite_db = 'kirana.db'
-    
+                last_id = batch[-1]['id']
+                checkpoint.last_id = last_id
+                checkpoint.rows += count
+                db.session.commit()
+                result['read'] += len(batch)
+                result['inserted'] += count
+    finally:
+        conn.close()
+    result['seconds'] = round(time.perf_counter() - started, 2)
+    return result
+
+
+def source_label(sqlite_path):
+    """Label of a source database in import keys and checkpoints: '<file name>@<path hash>'."""
+    path = os.path.realpath(sqlite_path)
+    digest = hashlib.sha1(path.encode()).hexdigest()[:10]
+    return f"{os.path.basename(path)[:60]}@{digest}"
+
+
+def migrate_data(sqlite_db='kirana.db', batch_size=BATCH_SIZE, workers=len(TABLES), restart=False, label=None):
+    """
+    Migrate data from SQLite to PostgreSQL.
+
+    Args:
+        label: Source label (default: source_label(sqlite_db))
+
+    Returns:
+        bool: True if every table migrated
+    """
     if not os.path.exists(sqlite_db):
         print(f"SQLite database '{sqlite_db}' not found. No data to migrate.")
-        return
-    
-    # Connect to SQLite
-    conn = sqlite3.connect(sqlite_db)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    
+        return True
+    source = label or source_label(sqlite_db)
+
     with app.app_context():
-        print("Starting data migration from SQLite to PostgreSQL...")
-        
-        # Migrate Products
-        try:
-            cursor.execute('SELECT * FROM products')
-            products = cursor.fetchall()
-            migrated_products = 0
-            for row in products:
-                # Check if product already exists
-                existing = Product.query.filter_by(name=row['name']).first()
-                if not existing:
-                    product = Product(
-                        name=row['name'],
-                        price=row['price'],
-                        image=row['image'] if row['image'] else 'default.png',
-                        is_available=bool(row['is_available']) if 'is_available' in row.keys() else True
-                    )
-                    db.session.add(product)
-                    migrated_products += 1
-            db.session.commit()
-            print(f"✅ Migrated {migrated_products} products")
-        except Exception as e:
-            print(f"❌ Error migrating products: {e}")
-            db.session.rollback()
-        
-        # Migrate Orders
-        try:
-            cursor.execute('SELECT * FROM orders')
-            orders = cursor.fetchall()
-            migrated_orders = 0
-            for row in orders:
-                # Check if order already exists (by customer + mobile + date)
-                order = Order(
-                    customer_name=row['customer_name'],
-                    mobile=row['mobile'],
-                    address=row['address'],
-                    items=row['items'],
-                    total=row['total'],
-                    payment_method=row['payment_method'] if 'payment_method' in row.keys() else 'cod',
-                    status=row['status'] if 'status' in row.keys() else 'pending'
-                )
-                db.session.add(order)
-                migrated_orders += 1
-            db.session.commit()
-            print(f"✅ Migrated {migrated_orders} orders")
-        except Exception as e:
-            print(f"❌ Error migrating orders: {e}")
-            db.session.rollback()
-        
-        # Migrate Admins
-        try:
-            cursor.execute('SELECT * FROM admins')
-            admins = cursor.fetchall()
-            migrated_admins = 0
-            for row in admins:
-                existing = Admin.query.filter_by(username=row['username']).first()
-                if not existing:
-                    admin = Admin(
-                        username=row['username'],
-                        password=row['password'],
-                        is_master=bool(row['is_master']) if 'is_master' in row.keys() else False
-                    )
-                    db.session.add(admin)
-                    migrated_admins += 1
-            db.session.commit()
-            print(f"✅ Migrated {migrated_admins} admins")
-        except Exception as e:
-            print(f"❌ Error migrating admins: {e}")
-            db.session.rollback()
-        
-        # Migrate Settings
-        try:
-            cursor.execute('SELECT * FROM settings')
-            settings = cursor.fetchall()
-            migrated_settings = 0
-            for row in settings:
-                existing = Setting.query.filter_by(key=row['key']).first()
-                if not existing:
-                    setting = Setting(
-                        key=row['key'],
-                        value=row['value']
-                    )
-                    db.session.add(setting)
-                    migrated_settings += 1
+        if db.session.get_bind().dialect.name != 'postgresql':
+            print("❌ DATABASE_URL must point at PostgreSQL")
+            return False
+        if restart:
+            db.session.execute(db.delete(MigrationCheckpoint).where(MigrationCheckpoint.source == source))
             db.session.commit()
-            print(f"✅ Migrated {migrated_settings} settings")
-        except Exception as e:
-            print(f"❌ Error migrating settings: {e}")
-            db.session.rollback()
-        
-        print("\n🎉 Data migration complete!")
-    
-    conn.close()
+
+    print(f"Starting data migration from {sqlite_db} (source label {source}) to PostgreSQL...")
+    started = time.perf_counter()
+    mobiles = set()
+
+    def finish(futures):
+        """Report finished tables; returns the names of those that failed."""
+        failed = set()
+        for future, table in futures.items():
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"❌ Error migrating {table.name}: {e}")
+                failed.add(table.name)
+                continue
+            if result.get('missing'):
+                print(f"⏭️  No {table.name} table in {sqlite_db}")
+                continue
+            mobiles.update(result['mobiles'])
+            print(f"✅ Migrated {result['inserted']} {table.name} "
+                  f"({result['read'] - result['inserted']} already present) in {result['seconds']}s")
+            if result['skipped_items']:
+                print(f"⚠️  Skipped {result['skipped_items']} unreadable order items")
+        return failed
+
+    orders = next(table for table in TABLES if table.name == 'orders')
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        failed = finish({pool.submit(migrate_table, table, sqlite_db, source, batch_size): table
+                         for table in TABLES if table is not orders})
+        if 'products' in failed:
+            print("⏭️  Orders skipped: their items need the products migrated first")
+            failed.add('orders')
+        else:
+            product_ids = product_id_map(sqlite_db)
+            failed |= finish({pool.submit(migrate_table, orders, sqlite_db, source, batch_size, product_ids): orders})
+    ok = not failed
+
+    with app.app_context():
+        # Rollups, cached catalog/settings and customers' order lists must see the new rows
+        if mobiles:
+            from sales_rollups import recompute_rollups
+            recompute_rollups()
+        bump_generations(['catalog', 'settings'] + [customer_orders_generation(mobile) for mobile in mobiles])
+        db.session.commit()
+
+    print(f"\n🎉 Data migration {'complete' if ok else 'finished with errors'} "
+          f"in {time.perf_counter() - started:.1f}s")
+    return ok
+
 
 if __name__ == '__main__':
-    migrate_data()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--source', default='kirana.db', help='SQLite database file (default: kirana.db)')
+    parser.add_argument('--label', help='Source label for import keys and checkpoints '
+                                         '(default: file name and path hash)')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--workers', type=int, default=len(TABLES), help='Tables migrated at once')
+    parser.add_argument('--restart', action='store_true', help='Forget checkpoints and read every row again')
+    args = parser.parse_args()
+    sys.exit(0 if migrate_data(args.source, args.batch_size, args.workers, args.restart, args.label) else 1)
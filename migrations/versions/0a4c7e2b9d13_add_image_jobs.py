@@ -0,0 +1,40 @@
+"""Add image_jobs for background product image uploads
+
+Revision ID: 0a4c7e2b9d13
+Revises: f2b6d8e41a35
+Create Date: 2026-10-17 16:05:12.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0a4c7e2b9d13'
+down_revision = 'f2b6d8e41a35'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('image_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('source', sa.String(length=500), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('result_url', sa.String(length=500), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_image_jobs_product_id', 'image_jobs', ['product_id'], unique=False)
+    op.create_index('ix_image_jobs_status_updated_at', 'image_jobs', ['status', 'updated_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_image_jobs_status_updated_at', table_name='image_jobs')
+    op.drop_index('ix_image_jobs_product_id', table_name='image_jobs')
+    op.drop_table('image_jobs')
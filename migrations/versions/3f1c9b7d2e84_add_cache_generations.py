@@ -0,0 +1,32 @@
+"""Add cache generation counters
+
+Revision ID: 3f1c9b7d2e84
+Revises: a86993941024
+Create Date: 2026-10-17 09:12:40.118402
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c9b7d2e84'
+down_revision = 'a86993941024'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('cache_generations',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('value', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.bulk_insert(
+        sa.table('cache_generations', sa.column('name', sa.String), sa.column('value', sa.Integer)),
+        [{'name': 'catalog', 'value': 0}]
+    )
+
+
+def downgrade():
+    op.drop_table('cache_generations')
@@ -0,0 +1,29 @@
+"""Add products.stock for stock tracked at checkout
+
+Revision ID: 7e2c4a9d1f60
+Revises: 5c8e1f3a7d42
+Create Date: 2026-10-17 21:06:12.418530
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7e2c4a9d1f60'
+down_revision = '5c8e1f3a7d42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # NULL (every existing product) means stock is not tracked
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.add_column(sa.Column('stock', sa.Integer(), nullable=True))
+        batch_op.create_check_constraint('ck_products_stock', 'stock >= 0')
+
+
+def downgrade():
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.drop_constraint('ck_products_stock', type_='check')
+        batch_op.drop_column('stock')
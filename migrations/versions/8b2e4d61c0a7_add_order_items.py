@@ -0,0 +1,101 @@
+"""Add order_items table and backfill it from orders.items JSON
+
+Revision ID: 8b2e4d61c0a7
+Revises: 3f1c9b7d2e84
+Create Date: 2026-10-17 10:03:27.541963
+
+"""
+import json
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b2e4d61c0a7'
+down_revision = '3f1c9b7d2e84'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+
+def upgrade():
+    op.create_table('order_items',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=True),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('unit_price', sa.Float(), nullable=False),
+    sa.Column('qty', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_order_items_order_id'), 'order_items', ['order_id'], unique=False)
+    op.create_index(op.f('ix_order_items_product_id'), 'order_items', ['product_id'], unique=False)
+    backfill_order_items()
+
+
+def backfill_order_items():
+    """Copy the JSON cart of every order into order_items, BATCH_SIZE orders at a time."""
+    conn = op.get_bind()
+    orders = sa.table('orders', sa.column('id', sa.Integer), sa.column('items', sa.Text))
+    order_items = sa.table(
+        'order_items',
+        sa.column('order_id', sa.Integer),
+        sa.column('product_id', sa.Integer),
+        sa.column('name', sa.String),
+        sa.column('unit_price', sa.Float),
+        sa.column('qty', sa.Integer)
+    )
+
+    last_id = 0
+    skipped = 0
+    while True:
+        batch = conn.execute(
+            sa.select(orders.c.id, orders.c['items'])
+            .where(orders.c.id > last_id)
+            .order_by(orders.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not batch:
+            break
+
+        rows = []
+        for order_id, items_json in batch:
+            try:
+                items = json.loads(items_json or '[]')
+            except ValueError:
+                continue
+            if not isinstance(items, list):
+                continue
+            for item in items:
+                # One malformed cart line must not abort the whole migration
+                try:
+                    product_id = item.get('id')
+                    row = {
+                        'order_id': order_id,
+                        'product_id': int(product_id) if str(product_id).isdigit() else None,
+                        'name': str(item.get('name', ''))[:255],
+                        'unit_price': float(item.get('price') or 0),
+                        'qty': int(item.get('qty') or 1),
+                    }
+                except (TypeError, ValueError, AttributeError):
+                    skipped += 1
+                    continue
+                rows.append(row)
+        if rows:
+            conn.execute(order_items.insert(), rows)
+        last_id = batch[-1][0]
+
+    if skipped:
+        logger.warning("Skipped %d malformed order items while backfilling order_items", skipped)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_order_items_product_id'), table_name='order_items')
+    op.drop_index(op.f('ix_order_items_order_id'), table_name='order_items')
+    op.drop_table('order_items')
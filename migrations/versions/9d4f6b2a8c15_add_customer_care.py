@@ -0,0 +1,42 @@
+"""Add customer_care, until now only created by db.create_all()
+
+Revision ID: 9d4f6b2a8c15
+Revises: 7e2c4a9d1f60
+Create Date: 2026-10-18 10:05:12.318240
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d4f6b2a8c15'
+down_revision = '7e2c4a9d1f60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases set up before bootstrap ran migrations already have it
+    if sa.inspect(op.get_bind()).has_table('customer_care'):
+        return
+    op.create_table('customer_care',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('email', sa.String(length=255), nullable=False),
+    sa.Column('phone', sa.String(length=20), nullable=False),
+    sa.Column('order_id', sa.String(length=100), nullable=True),
+    sa.Column('issue_type', sa.String(length=100), nullable=False),
+    sa.Column('description', sa.Text(), nullable=False),
+    sa.Column('priority', sa.String(length=20), nullable=True),
+    sa.Column('status', sa.String(length=50), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('admin_response', sa.Text(), nullable=True),
+    sa.Column('resolved_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('customer_care')
@@ -0,0 +1,82 @@
+"""Keep sales_rollups per day in slots, without cancelled revenue
+
+Revision ID: a3c9e5f17b20
+Revises: 9d4f6b2a8c15
+Create Date: 2026-10-18 11:32:40.508913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c9e5f17b20'
+down_revision = '9d4f6b2a8c15'
+branch_labels = None
+depends_on = None
+
+STATUSES = ('pending', 'confirmed', 'delivered', 'cancelled')
+PAYMENT_METHODS = ('cod', 'upi')
+COUNTERS = ['order_count', 'revenue'] + [f'{s}_count' for s in STATUSES] + \
+    [f'{m}_{f}' for m in PAYMENT_METHODS for f in ('count', 'revenue')]
+
+
+def _counter_columns():
+    return [
+        sa.Column(name, sa.Integer() if name.endswith('_count') else sa.Float(), nullable=False)
+        for name in COUNTERS
+    ]
+
+
+def _sums(include_cancelled_revenue):
+    sale = "total" if include_cancelled_revenue else \
+        "CASE WHEN COALESCE(status, 'pending') <> 'cancelled' THEN total ELSE 0 END"
+    sums = ["COUNT(id)", f"COALESCE(SUM({sale}), 0)"]
+    sums += [f"SUM(CASE WHEN COALESCE(status, 'pending') = '{s}' THEN 1 ELSE 0 END)" for s in STATUSES]
+    for method in PAYMENT_METHODS:
+        sums.append(f"SUM(CASE WHEN payment_method = '{method}' THEN 1 ELSE 0 END)")
+        sums.append(f"SUM(CASE WHEN payment_method = '{method}' THEN {sale} ELSE 0 END)")
+    return ', '.join(sums)
+
+
+def _bucket(conn, granularity):
+    if conn.dialect.name == 'postgresql':
+        return f"date_trunc('{granularity}', date)"
+    pattern = '%Y-%m-%d 00:00:00.000000' if granularity == 'day' else '%Y-%m-%d %H:00:00.000000'
+    return f"strftime('{pattern}', date)"
+
+
+def upgrade():
+    # The rollups are derived data: rebuild rather than reshape them. Hourly
+    # rows were never read, and a single row per day made every checkout
+    # wait on its lock
+    op.drop_table('sales_rollups')
+    op.create_table('sales_rollups',
+    sa.Column('day', sa.DateTime(), nullable=False),
+    sa.Column('slot', sa.Integer(), nullable=False),
+    *_counter_columns(),
+    sa.PrimaryKeyConstraint('day', 'slot')
+    )
+    conn = op.get_bind()
+    day = _bucket(conn, 'day')
+    conn.execute(sa.text(
+        f"INSERT INTO sales_rollups (day, slot, {', '.join(COUNTERS)}) "
+        f"SELECT {day}, 0, {_sums(False)} FROM orders WHERE date IS NOT NULL GROUP BY {day}"
+    ))
+
+
+def downgrade():
+    op.drop_table('sales_rollups')
+    op.create_table('sales_rollups',
+    sa.Column('granularity', sa.String(length=10), nullable=False),
+    sa.Column('bucket', sa.DateTime(), nullable=False),
+    *_counter_columns(),
+    sa.PrimaryKeyConstraint('granularity', 'bucket')
+    )
+    conn = op.get_bind()
+    for granularity in ('day', 'hour'):
+        bucket = _bucket(conn, granularity)
+        conn.execute(sa.text(
+            f"INSERT INTO sales_rollups (granularity, bucket, {', '.join(COUNTERS)}) "
+            f"SELECT '{granularity}', {bucket}, {_sums(True)} FROM orders WHERE date IS NOT NULL GROUP BY {bucket}"
+        ))
@@ -0,0 +1,39 @@
+"""Add orders.import_key and migration_checkpoints for resumable data migration
+
+Revision ID: b3d5f7a91c26
+Revises: 0a4c7e2b9d13
+Create Date: 2026-10-17 18:42:37.105926
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3d5f7a91c26'
+down_revision = '0a4c7e2b9d13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('orders') as batch_op:
+        batch_op.add_column(sa.Column('import_key', sa.String(length=100), nullable=True))
+        batch_op.create_unique_constraint('uq_orders_import_key', ['import_key'])
+
+    op.create_table('migration_checkpoints',
+    sa.Column('source', sa.String(length=255), nullable=False),
+    sa.Column('table_name', sa.String(length=50), nullable=False),
+    sa.Column('last_id', sa.Integer(), nullable=False),
+    sa.Column('rows', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('source', 'table_name')
+    )
+
+
+def downgrade():
+    op.drop_table('migration_checkpoints')
+
+    with op.batch_alter_table('orders') as batch_op:
+        batch_op.drop_constraint('uq_orders_import_key', type_='unique')
+        batch_op.drop_column('import_key')
@@ -0,0 +1,26 @@
+"""Drop the per-customer 'orders:<mobile>' cache generation rows
+
+Revision ID: b7e1d4c93a06
+Revises: a3c9e5f17b20
+Create Date: 2026-10-18 12:20:03.714529
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e1d4c93a06'
+down_revision = 'a3c9e5f17b20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Customers now share 'customer_orders:<bucket>' counters; a counter
+    # that does not exist yet reads as 0, so nothing needs backfilling
+    op.execute("DELETE FROM cache_generations WHERE name LIKE 'orders:%'")
+
+
+def downgrade():
+    # The old per-customer counters are created again as orders change
+    pass
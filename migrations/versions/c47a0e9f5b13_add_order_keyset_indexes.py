@@ -0,0 +1,30 @@
+"""Add composite indexes for keyset pagination of orders
+
+Revision ID: c47a0e9f5b13
+Revises: 8b2e4d61c0a7
+Create Date: 2026-10-17 11:26:05.904417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c47a0e9f5b13'
+down_revision = '8b2e4d61c0a7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_orders_date_id', 'orders', ['date', 'id'], unique=False)
+    op.create_index('ix_orders_status_date_id', 'orders', ['status', 'date', 'id'], unique=False)
+    op.create_index('ix_orders_payment_method_date_id', 'orders', ['payment_method', 'date', 'id'], unique=False)
+    op.create_index('ix_orders_mobile_date_id', 'orders', ['mobile', 'date', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_orders_mobile_date_id', table_name='orders')
+    op.drop_index('ix_orders_payment_method_date_id', table_name='orders')
+    op.drop_index('ix_orders_status_date_id', table_name='orders')
+    op.drop_index('ix_orders_date_id', table_name='orders')
@@ -0,0 +1,29 @@
+"""Add order_items.stock_reserved: whether the line took stock when ordered
+
+Revision ID: c5f2a8e1d947
+Revises: b7e1d4c93a06
+Create Date: 2026-10-18 14:02:51.306118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5f2a8e1d947'
+down_revision = 'b7e1d4c93a06'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing lines cannot tell whether their product was tracked when
+    # they were ordered, so they are taken as not reserved: cancelling one
+    # then gives no stock back, which can undercount but never oversell
+    with op.batch_alter_table('order_items') as batch_op:
+        batch_op.add_column(sa.Column('stock_reserved', sa.Boolean(), nullable=False, server_default=sa.false()))
+
+
+def downgrade():
+    with op.batch_alter_table('order_items') as batch_op:
+        batch_op.drop_column('stock_reserved')
@@ -0,0 +1,37 @@
+"""Add products.sold_out, so restocking never re-enables a product the admin hid
+
+Revision ID: d8a3b6f04c71
+Revises: c5f2a8e1d947
+Create Date: 2026-10-18 14:40:17.552904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8a3b6f04c71'
+down_revision = 'c5f2a8e1d947'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.add_column(sa.Column('sold_out', sa.Boolean(), nullable=False, server_default=sa.false()))
+
+    # Until now a product at 0 was always made unavailable by running out
+    products = sa.table(
+        'products', sa.column('stock', sa.Integer), sa.column('is_available', sa.Boolean),
+        sa.column('sold_out', sa.Boolean)
+    )
+    op.execute(
+        products.update()
+        .where(products.c.stock == 0, products.c.is_available.is_(False))
+        .values(sold_out=True)
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.drop_column('sold_out')
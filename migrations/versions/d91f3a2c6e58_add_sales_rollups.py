@@ -0,0 +1,66 @@
+"""Add sales_rollups table and backfill it from orders
+
+Revision ID: d91f3a2c6e58
+Revises: c47a0e9f5b13
+Create Date: 2026-10-17 12:41:53.277610
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd91f3a2c6e58'
+down_revision = 'c47a0e9f5b13'
+branch_labels = None
+depends_on = None
+
+STATUSES = ('pending', 'confirmed', 'delivered', 'cancelled')
+PAYMENT_METHODS = ('cod', 'upi')
+
+
+def upgrade():
+    op.create_table('sales_rollups',
+    sa.Column('granularity', sa.String(length=10), nullable=False),
+    sa.Column('bucket', sa.DateTime(), nullable=False),
+    sa.Column('order_count', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.Column('pending_count', sa.Integer(), nullable=False),
+    sa.Column('confirmed_count', sa.Integer(), nullable=False),
+    sa.Column('delivered_count', sa.Integer(), nullable=False),
+    sa.Column('cancelled_count', sa.Integer(), nullable=False),
+    sa.Column('cod_count', sa.Integer(), nullable=False),
+    sa.Column('cod_revenue', sa.Float(), nullable=False),
+    sa.Column('upi_count', sa.Integer(), nullable=False),
+    sa.Column('upi_revenue', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('granularity', 'bucket')
+    )
+    backfill_rollups()
+
+
+def backfill_rollups():
+    """Aggregate existing orders into day and hour buckets."""
+    conn = op.get_bind()
+    sums = ["COUNT(id)", "COALESCE(SUM(total), 0)"]
+    sums += [f"SUM(CASE WHEN COALESCE(status, 'pending') = '{s}' THEN 1 ELSE 0 END)" for s in STATUSES]
+    for method in PAYMENT_METHODS:
+        sums.append(f"SUM(CASE WHEN payment_method = '{method}' THEN 1 ELSE 0 END)")
+        sums.append(f"SUM(CASE WHEN payment_method = '{method}' THEN total ELSE 0 END)")
+
+    for granularity in ('day', 'hour'):
+        if conn.dialect.name == 'postgresql':
+            bucket = f"date_trunc('{granularity}', date)"
+        else:
+            pattern = '%Y-%m-%d 00:00:00.000000' if granularity == 'day' else '%Y-%m-%d %H:00:00.000000'
+            bucket = f"strftime('{pattern}', date)"
+        conn.execute(sa.text(
+            "INSERT INTO sales_rollups (granularity, bucket, order_count, revenue, "
+            "pending_count, confirmed_count, delivered_count, cancelled_count, "
+            "cod_count, cod_revenue, upi_count, upi_revenue) "
+            f"SELECT '{granularity}', {bucket}, {', '.join(sums)} "
+            f"FROM orders WHERE date IS NOT NULL GROUP BY {bucket}"
+        ))
+
+
+def downgrade():
+    op.drop_table('sales_rollups')
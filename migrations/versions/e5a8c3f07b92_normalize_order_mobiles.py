@@ -0,0 +1,62 @@
+"""Normalize orders.mobile to 10 digits
+
+Revision ID: e5a8c3f07b92
+Revises: d91f3a2c6e58
+Create Date: 2026-10-17 13:58:12.630284
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a8c3f07b92'
+down_revision = 'd91f3a2c6e58'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def normalize_mobile(mobile):
+    """Same rules as models.normalize_mobile (copied so the migration stays frozen)."""
+    digits = ''.join(ch for ch in str(mobile or '') if ch.isdigit())
+    if len(digits) == 12 and digits.startswith('91'):
+        digits = digits[2:]
+    elif len(digits) == 11 and digits.startswith('0'):
+        digits = digits[1:]
+    return digits
+
+
+def upgrade():
+    conn = op.get_bind()
+    orders = sa.table('orders', sa.column('id', sa.Integer), sa.column('mobile', sa.String))
+
+    last_id = 0
+    while True:
+        batch = conn.execute(
+            sa.select(orders.c.id, orders.c.mobile)
+            .where(orders.c.id > last_id)
+            .order_by(orders.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not batch:
+            break
+        changes = [
+            {'order_id': order_id, 'normalized': normalize_mobile(mobile)}
+            for order_id, mobile in batch
+            if normalize_mobile(mobile) != mobile
+        ]
+        if changes:
+            conn.execute(
+                orders.update()
+                .where(orders.c.id == sa.bindparam('order_id'))
+                .values(mobile=sa.bindparam('normalized')),
+                changes
+            )
+        last_id = batch[-1][0]
+
+
+def downgrade():
+    # The original formatting is not kept; normalized numbers stay valid
+    pass
@@ -0,0 +1,61 @@
+"""Redo the contact_messages.email_normalized backfill with normalize_email
+
+Revision ID: e7c1f94b2d08
+Revises: d8a3b6f04c71
+Create Date: 2026-10-18 15:12:40.918327
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7c1f94b2d08'
+down_revision = 'd8a3b6f04c71'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def normalize_email(email):
+    """Same rules as models.normalize_email (copied so the migration stays frozen)."""
+    return (email or '').strip().lower()
+
+
+def upgrade():
+    # Databases that ran f2b6d8e41a35 before it normalized in Python were
+    # backfilled with LOWER(TRIM(email)); fix the rows where that differs
+    conn = op.get_bind()
+    messages = sa.table(
+        'contact_messages', sa.column('id', sa.Integer), sa.column('email', sa.String),
+        sa.column('email_normalized', sa.String)
+    )
+    last_id = 0
+    while True:
+        batch = conn.execute(
+            sa.select(messages.c.id, messages.c.email, messages.c.email_normalized)
+            .where(messages.c.id > last_id)
+            .order_by(messages.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not batch:
+            break
+        changes = [
+            {'message_id': message_id, 'normalized': normalize_email(email)}
+            for message_id, email, stored in batch
+            if normalize_email(email) != stored
+        ]
+        if changes:
+            conn.execute(
+                messages.update()
+                .where(messages.c.id == sa.bindparam('message_id'))
+                .values(email_normalized=sa.bindparam('normalized')),
+                changes
+            )
+        last_id = batch[-1][0]
+
+
+def downgrade():
+    # The corrected values are what the lookups expect either way
+    pass
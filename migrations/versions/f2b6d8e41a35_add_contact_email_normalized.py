@@ -0,0 +1,80 @@
+"""Add contact_messages.email_normalized with an index and backfill it
+
+Revision ID: f2b6d8e41a35
+Revises: e5a8c3f07b92
+Create Date: 2026-10-17 14:47:30.082116
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b6d8e41a35'
+down_revision = 'e5a8c3f07b92'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def normalize_email(email):
+    """Same rules as models.normalize_email (copied so the migration stays frozen)."""
+    return (email or '').strip().lower()
+
+
+def backfill_email_normalized():
+    """
+    Set email_normalized with normalize_email, BATCH_SIZE rows at a time.
+
+    SQL's LOWER(TRIM()) would disagree with the lookups on non-ASCII
+    letters and on whitespace other than spaces.
+    """
+    conn = op.get_bind()
+    messages = sa.table(
+        'contact_messages', sa.column('id', sa.Integer), sa.column('email', sa.String),
+        sa.column('email_normalized', sa.String)
+    )
+    last_id = 0
+    while True:
+        batch = conn.execute(
+            sa.select(messages.c.id, messages.c.email)
+            .where(messages.c.id > last_id)
+            .order_by(messages.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not batch:
+            break
+        conn.execute(
+            messages.update()
+            .where(messages.c.id == sa.bindparam('message_id'))
+            .values(email_normalized=sa.bindparam('normalized')),
+            [{'message_id': message_id, 'normalized': normalize_email(email)} for message_id, email in batch]
+        )
+        last_id = batch[-1][0]
+
+
+def upgrade():
+    # contact_messages was created by db.create_all() rather than a migration
+    if not sa.inspect(op.get_bind()).has_table('contact_messages'):
+        op.create_table('contact_messages',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('email', sa.String(length=255), nullable=False),
+        sa.Column('message', sa.Text(), nullable=False),
+        sa.Column('is_read', sa.Boolean(), nullable=True),
+        sa.Column('admin_reply', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+
+    with op.batch_alter_table('contact_messages') as batch_op:
+        batch_op.add_column(sa.Column('email_normalized', sa.String(length=255), nullable=True))
+    backfill_email_normalized()
+    op.create_index('ix_contact_messages_email_normalized_id', 'contact_messages', ['email_normalized', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_contact_messages_email_normalized_id', table_name='contact_messages')
+    with op.batch_alter_table('contact_messages') as batch_op:
+        batch_op.drop_column('email_normalized')
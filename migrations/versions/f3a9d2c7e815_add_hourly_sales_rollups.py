@@ -0,0 +1,81 @@
+"""Keep hourly sales_rollups next to daily ones, both in slots
+
+Revision ID: f3a9d2c7e815
+Revises: e7c1f94b2d08
+Create Date: 2026-10-18 16:05:33.147092
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a9d2c7e815'
+down_revision = 'e7c1f94b2d08'
+branch_labels = None
+depends_on = None
+
+STATUSES = ('pending', 'confirmed', 'delivered', 'cancelled')
+PAYMENT_METHODS = ('cod', 'upi')
+COUNTERS = ['order_count', 'revenue'] + [f'{s}_count' for s in STATUSES] + \
+    [f'{m}_{f}' for m in PAYMENT_METHODS for f in ('count', 'revenue')]
+
+
+def _counter_columns():
+    return [
+        sa.Column(name, sa.Integer() if name.endswith('_count') else sa.Float(), nullable=False)
+        for name in COUNTERS
+    ]
+
+
+def _sums():
+    # Cancelled orders add nothing to revenue
+    sale = "CASE WHEN COALESCE(status, 'pending') <> 'cancelled' THEN total ELSE 0 END"
+    sums = ["COUNT(id)", f"COALESCE(SUM({sale}), 0)"]
+    sums += [f"SUM(CASE WHEN COALESCE(status, 'pending') = '{s}' THEN 1 ELSE 0 END)" for s in STATUSES]
+    for method in PAYMENT_METHODS:
+        sums.append(f"SUM(CASE WHEN payment_method = '{method}' THEN 1 ELSE 0 END)")
+        sums.append(f"SUM(CASE WHEN payment_method = '{method}' THEN {sale} ELSE 0 END)")
+    return ', '.join(sums)
+
+
+def _bucket(conn, granularity):
+    if conn.dialect.name == 'postgresql':
+        return f"date_trunc('{granularity}', date)"
+    pattern = '%Y-%m-%d 00:00:00.000000' if granularity == 'day' else '%Y-%m-%d %H:00:00.000000'
+    return f"strftime('{pattern}', date)"
+
+
+def upgrade():
+    # The rollups are derived data: rebuild rather than reshape them
+    op.drop_table('sales_rollups')
+    op.create_table('sales_rollups',
+    sa.Column('granularity', sa.String(length=10), nullable=False),
+    sa.Column('bucket', sa.DateTime(), nullable=False),
+    sa.Column('slot', sa.Integer(), nullable=False),
+    *_counter_columns(),
+    sa.PrimaryKeyConstraint('granularity', 'bucket', 'slot')
+    )
+    conn = op.get_bind()
+    for granularity in ('day', 'hour'):
+        bucket = _bucket(conn, granularity)
+        conn.execute(sa.text(
+            f"INSERT INTO sales_rollups (granularity, bucket, slot, {', '.join(COUNTERS)}) "
+            f"SELECT '{granularity}', {bucket}, 0, {_sums()} FROM orders WHERE date IS NOT NULL GROUP BY {bucket}"
+        ))
+
+
+def downgrade():
+    op.drop_table('sales_rollups')
+    op.create_table('sales_rollups',
+    sa.Column('day', sa.DateTime(), nullable=False),
+    sa.Column('slot', sa.Integer(), nullable=False),
+    *_counter_columns(),
+    sa.PrimaryKeyConstraint('day', 'slot')
+    )
+    conn = op.get_bind()
+    day = _bucket(conn, 'day')
+    conn.execute(sa.text(
+        f"INSERT INTO sales_rollups (day, slot, {', '.join(COUNTERS)}) "
+        f"SELECT {day}, 0, {_sums()} FROM orders WHERE date IS NOT NULL GROUP BY {day}"
+    ))
@@ -3,8 +3,12 @@ Flask-SQLAlchemy Models for Shivkumar Kirana Store
 PostgreSQL with Flask-Migrate support
 """
 
+import csv
+import io
 from datetime import datetime
+from itertools import islice
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
 
 db = SQLAlchemy()
 
@@ -19,8 +23,16 @@ class Product(db.Model):
     price = db.Column(db.Float, nullable=False)
     image = db.Column(db.String(255), default='default.png')
     is_available = db.Column(db.Boolean, default=True)
+    # Units in stock; None means stock is not tracked and the product never runs out
+    stock = db.Column(db.Integer, nullable=True)
+    # Made unavailable by running out (not by the admin), so restocking makes it available again
+    sold_out = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        db.CheckConstraint('stock >= 0', name='ck_products_stock'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -28,6 +40,7 @@ class Product(db.Model):
             'price': self.price,
             'image': self.image,
             'is_available': self.is_available,
+            'stock': self.stock,
             'created_at': self.created_at
         }
 
@@ -45,6 +58,22 @@ class Order(db.Model):
     payment_method = db.Column(db.String(50), default='cod')
     status = db.Column(db.String(50), default='pending')
     date = db.Column(db.DateTime, default=datetime.utcnow)
+    # Source row of an order copied by migrate_data.py ('kirana.db@3f0c2a9e1b:42'), so re-runs skip it
+    import_key = db.Column(db.String(100), nullable=True)
+    
+    order_items = db.relationship(
+        'OrderItem', backref='order', cascade='all, delete-orphan',
+        order_by='OrderItem.id'
+    )
+    
+    # Keyset pagination walks (date, id) newest first, optionally per filter
+    __table_args__ = (
+        db.Index('ix_orders_date_id', 'date', 'id'),
+        db.Index('ix_orders_status_date_id', 'status', 'date', 'id'),
+        db.Index('ix_orders_payment_method_date_id', 'payment_method', 'date', 'id'),
+        db.Index('ix_orders_mobile_date_id', 'mobile', 'date', 'id'),
+        db.UniqueConstraint('import_key', name='uq_orders_import_key'),
+    )
     
     def to_dict(self):
         return {
@@ -60,6 +89,71 @@ class Order(db.Model):
         }
 
 
+class OrderItem(db.Model):
+    """Line item of an order (name and price as they were when ordered)."""
+    __tablename__ = 'order_items'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id', ondelete='CASCADE'), nullable=False, index=True)
+    # No foreign key: a cart may still hold a product that was deleted since
+    product_id = db.Column(db.Integer, nullable=True, index=True)
+    name = db.Column(db.String(255), nullable=False)
+    unit_price = db.Column(db.Float, nullable=False)
+    qty = db.Column(db.Integer, nullable=False)
+    # Whether placing the order took qty out of the product's stock; only
+    # such lines give stock back (cancel, delete) or take it again (revive)
+    stock_reserved = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+    
+    @property
+    def subtotal(self):
+        return self.unit_price * self.qty
+    
+    def to_dict(self):
+        return {
+            'id': self.product_id,
+            'name': self.name,
+            'price': self.unit_price,
+            'qty': self.qty,
+            'subtotal': self.subtotal
+        }
+
+
+class SalesRollup(db.Model):
+    """Pre-aggregated order totals, one day or hour per ROLLUP_SLOTS rows (maintained by sales_rollups)."""
+    __tablename__ = 'sales_rollups'
+    
+    granularity = db.Column(db.String(10), primary_key=True)  # 'day' or 'hour'
+    bucket = db.Column(db.DateTime, primary_key=True)  # Start of the day or hour (UTC)
+    slot = db.Column(db.Integer, primary_key=True)  # Spreads concurrent writes over several rows
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)  # Cancelled orders excluded
+    pending_count = db.Column(db.Integer, nullable=False, default=0)
+    confirmed_count = db.Column(db.Integer, nullable=False, default=0)
+    delivered_count = db.Column(db.Integer, nullable=False, default=0)
+    cancelled_count = db.Column(db.Integer, nullable=False, default=0)
+    cod_count = db.Column(db.Integer, nullable=False, default=0)
+    cod_revenue = db.Column(db.Float, nullable=False, default=0)
+    upi_count = db.Column(db.Integer, nullable=False, default=0)
+    upi_revenue = db.Column(db.Float, nullable=False, default=0)
+    
+    def to_dict(self):
+        return {
+            'granularity': self.granularity,
+            'bucket': self.bucket,
+            'slot': self.slot,
+            'order_count': self.order_count,
+            'revenue': self.revenue,
+            'pending_count': self.pending_count,
+            'confirmed_count': self.confirmed_count,
+            'delivered_count': self.delivered_count,
+            'cancelled_count': self.cancelled_count,
+            'cod_count': self.cod_count,
+            'cod_revenue': self.cod_revenue,
+            'upi_count': self.upi_count,
+            'upi_revenue': self.upi_revenue
+        }
+
+
 class Admin(db.Model):
     """Admin user model."""
     __tablename__ = 'admins'
@@ -88,6 +182,36 @@ class Setting(db.Model):
     value = db.Column(db.Text, nullable=False)
 
 
+class CacheGeneration(db.Model):
+    """Generation counters used to invalidate per-worker caches."""
+    __tablename__ = 'cache_generations'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+
+class IdempotencyKey(db.Model):
+    """Client key of an order placement, so a retried request returns the same order."""
+    __tablename__ = 'idempotency_keys'
+    
+    key = db.Column(db.String(100), primary_key=True)  # The unique constraint serializes duplicates
+    request_hash = db.Column(db.String(64), nullable=False)  # Fingerprint of the first request's body
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id', ondelete='CASCADE'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
+class MigrationCheckpoint(db.Model):
+    """How far migrate_data.py has copied each table of a source database."""
+    __tablename__ = 'migration_checkpoints'
+    
+    source = db.Column(db.String(255), primary_key=True)  # Source label, e.g. 'kirana.db@3f0c2a9e1b'
+    table_name = db.Column(db.String(50), primary_key=True)
+    last_id = db.Column(db.Integer, nullable=False, default=0)  # Highest source id copied
+    rows = db.Column(db.Integer, nullable=False, default=0)  # Rows inserted (duplicates excluded)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class CustomerCare(db.Model):
     """Customer Care - Issues and Complaints model."""
     __tablename__ = 'customer_care'
@@ -131,11 +255,16 @@ class ContactMessage(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(255), nullable=False)
     email = db.Column(db.String(255), nullable=False)
+    email_normalized = db.Column(db.String(255), nullable=True)  # Trimmed, lower-cased email for lookups
     message = db.Column(db.Text, nullable=False)
     is_read = db.Column(db.Boolean, default=False)
     admin_reply = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_contact_messages_email_normalized_id', 'email_normalized', 'id'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -148,6 +277,26 @@ class ContactMessage(db.Model):
         }
 
 
+class ImageJob(db.Model):
+    """Background upload of a product image to cloud storage."""
+    __tablename__ = 'image_jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, nullable=False, index=True)
+    source = db.Column(db.String(500), nullable=False)  # Staged file in the upload folder
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, running, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    result_url = db.Column(db.String(500), nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_image_jobs_status_updated_at', 'status', 'updated_at'),
+    )
+
+
 # ==================== Database Initialization ====================
 
 def init_db(app):
@@ -156,22 +305,209 @@ def init_db(app):
     with app.app_context():
         db.create_all()
         _create_default_settings()
+        _create_default_generations()
 
 
 def _create_default_settings():
     """Create default settings if not exist."""
-    default_settings = [
-        ('shop_open_time', '08:00'),
-        ('shop_close_time', '21:00'),
-        ('shop_phone', '9999999999'),
-    ]
-    for key, value in default_settings:
+    from settings_registry import SETTINGS
+    for key, definition in SETTINGS.items():
         if not Setting.query.filter_by(key=key).first():
-            setting = Setting(key=key, value=value)
+            setting = Setting(key=key, value=definition.default)
             db.session.add(setting)
     db.session.commit()
 
 
+def _create_default_generations():
+    """Create cache generation counters if not exist."""
+    for name in CACHE_GENERATIONS:
+        if not CacheGeneration.query.get(name):
+            db.session.add(CacheGeneration(name=name, value=0))
+    db.session.commit()
+
+
+# ==================== Cache Generation Functions ====================
+
+CACHE_GENERATIONS = ('catalog', 'settings')
+
+
+def dialect_insert():
+    """
+    Get the INSERT construct supporting ON CONFLICT for the current database.
+
+    Returns:
+        The postgresql/sqlite insert() function, or None for other databases
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert
+
+
+def limit_statement_time(engine, milliseconds):
+    """
+    Set statement_timeout on every connection the engine opens from now on (PostgreSQL).
+
+    Args:
+        engine: SQLAlchemy engine
+        milliseconds: Limit per statement (0 or less leaves it unbounded)
+
+    Returns:
+        bool: Whether a limit was set
+    """
+    if milliseconds <= 0 or engine.dialect.name != 'postgresql':
+        return False
+
+    @event.listens_for(engine, 'do_connect')
+    def add_statement_timeout(dialect, connection_record, cargs, cparams):
+        cparams['options'] = f"{cparams.get('options', '')} -c statement_timeout={int(milliseconds)}".strip()
+
+    # Connections opened before this point would not have the limit
+    engine.dispose()
+    return True
+
+
+def chunked(rows, size):
+    """Split an iterable into lists of at most `size` items."""
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def bulk_insert(table, columns, rows, batch_size=50000):
+    """
+    Insert row tuples into a table inside the current transaction.
+
+    Uses COPY ... FROM STDIN on PostgreSQL and executemany elsewhere.
+
+    Args:
+        table: Table (or lightweight db.table()) to insert into
+        columns: Column names, in the order of each row's values
+        rows: Iterable of tuples, consumed batch by batch
+
+    Returns:
+        int: Rows inserted
+    """
+    count = 0
+    if db.session.get_bind().dialect.name == 'postgresql':
+        cursor = db.session.connection().connection.cursor()
+        sql = f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+        for batch in chunked(rows, batch_size):
+            # None goes in as \N so empty strings stay empty strings
+            # (the price: a string that is exactly '\N' loads as NULL)
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(
+                row if None not in row else tuple('\\N' if value is None else value for value in row)
+                for row in batch
+            )
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+            count += len(batch)
+        cursor.close()
+        return count
+    stmt = table.insert()
+    for batch in chunked(rows, batch_size):
+        db.session.execute(stmt, [dict(zip(columns, row)) for row in batch])
+        count += len(batch)
+    return count
+
+
+def get_generation(name):
+    """Get the current value of a cache generation counter."""
+    value = db.session.query(CacheGeneration.value).filter_by(name=name).scalar()
+    return value or 0
+
+
+def get_generations(names):
+    """
+    Get several cache generation counters with one query.
+
+    Returns:
+        dict: name -> value (0 for counters that do not exist yet)
+    """
+    rows = db.session.query(CacheGeneration.name, CacheGeneration.value).filter(
+        CacheGeneration.name.in_(names)
+    ).all()
+    values = dict.fromkeys(names, 0)
+    values.update(rows)
+    return values
+
+
+def bump_generation(name):
+    """
+    Increment a cache generation counter.
+
+    The increment is not committed here, so it lands in the same
+    transaction as the data change it announces.
+    """
+    table = CacheGeneration.__table__
+    insert = dialect_insert()
+    if insert is not None:
+        stmt = insert(table).values(name=name, value=1)
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=['name'], set_={'value': table.c.value + 1}
+        ))
+        return
+    updated = CacheGeneration.query.filter_by(name=name).update(
+        {CacheGeneration.value: CacheGeneration.value + 1},
+        synchronize_session=False
+    )
+    if not updated:
+        db.session.add(CacheGeneration(name=name, value=1))
+
+
+def bump_generations(names, batch_size=1000):
+    """
+    Increment many cache generation counters (e.g. after a bulk import).
+
+    Like bump_generation() the increments are left uncommitted.
+    """
+    names = list(dict.fromkeys(names))
+    insert = dialect_insert()
+    if insert is None:
+        for name in names:
+            bump_generation(name)
+        return
+    table = CacheGeneration.__table__
+    for start in range(0, len(names), batch_size):
+        stmt = insert(table).values([{'name': name, 'value': 1} for name in names[start:start + batch_size]])
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=['name'], set_={'value': table.c.value + 1}
+        ))
+
+
+def _commit_catalog_change():
+    """Commit a product change and announce it to every worker's catalog cache."""
+    from catalog_cache import invalidate_catalog
+    from page_cache import invalidate_page_cache
+    bump_generation('catalog')
+    db.session.commit()
+    invalidate_catalog()
+    invalidate_page_cache()
+
+
+def touch_catalog():
+    """Announce a change that affects rendered products but no product rows (e.g. new image variants)."""
+    _commit_catalog_change()
+
+
+def _commit_settings_change():
+    """Commit a settings change and invalidate cached settings and pages."""
+    from settings_registry import invalidate_settings
+    from page_cache import invalidate_page_cache
+    bump_generation('settings')
+    db.session.commit()
+    invalidate_settings()
+    invalidate_page_cache()
+
+
 # ==================== Product Functions ====================
 
 def get_all_products():
@@ -184,16 +520,32 @@ def get_product_by_id(product_id):
     return Product.query.get(product_id)
 
 
-def search_products(query):
-    """Search products by name."""
-    return Product.query.filter(Product.name.ilike(f'%{query}%')).order_by(Product.name).all()
+def get_products_by_ids(product_ids):
+    """
+    Get several products with one IN (...) query.
+
+    Returns:
+        dict: {product_id: Product}; missing ids are left out
+    """
+    if not product_ids:
+        return {}
+    return {product.id: product for product in Product.query.filter(Product.id.in_(product_ids))}
 
 
-def add_product(name, price, image='default.png'):
-    """Add new product."""
-    product = Product(name=name, price=price, image=image)
+def search_products(query, limit=None):
+    """Search products by name (Hindi or English), best matches first."""
+    from catalog_cache import get_catalog
+    from metrics import SEARCHES
+    results = get_catalog().search(query, limit=limit)
+    SEARCHES.inc(result='hit' if results else 'miss')
+    return results
+
+
+def add_product(name, price, image='default.png', stock=None):
+    """Add new product (stock None: not tracked)."""
+    product = Product(name=name, price=price, image=image, stock=stock, is_available=stock != 0, sold_out=stock == 0)
     db.session.add(product)
-    db.session.commit()
+    _commit_catalog_change()
     return product.id
 
 
@@ -205,7 +557,29 @@ def update_product(product_id, name, price, image=None):
         product.price = price
         if image:
             product.image = image
-        db.session.commit()
+        _commit_catalog_change()
+
+
+def set_product_stock(product_id, stock):
+    """
+    Set a product's stock count, or None to stop tracking it.
+
+    Setting it to 0 makes the product unavailable; restocking a sold-out
+    product makes it available again. A product the admin made unavailable
+    stays that way.
+    """
+    # Locked, so an order selling out meanwhile cannot leave a restocked product unavailable
+    product = db.session.get(Product, product_id, with_for_update=True)
+    if product:
+        if stock == 0:
+            if product.is_available:
+                product.is_available = False
+                product.sold_out = True
+        elif product.sold_out:
+            product.is_available = True
+            product.sold_out = False
+        product.stock = stock
+        _commit_catalog_change()
 
 
 def delete_product(product_id):
@@ -213,7 +587,7 @@ def delete_product(product_id):
     product = Product.query.get(product_id)
     if product:
         db.session.delete(product)
-        db.session.commit()
+        _commit_catalog_change()
 
 
 def get_products_count():
@@ -221,14 +595,71 @@ def get_products_count():
     return Product.query.count()
 
 
+SAMPLE_PRODUCTS = [
+    ('चावल (Rice) - 1kg', 60),
+    ('गेहूं आटा (Wheat Flour) - 1kg', 45),
+    ('चीनी (Sugar) - 1kg', 50),
+    ('नमक (Salt) - 1kg', 25),
+    ('सरसों तेल (Mustard Oil) - 1L', 180),
+    ('दाल (Toor Dal) - 1kg', 140),
+    ('चाय पत्ती (Tea) - 250g', 80),
+    ('हल्दी (Turmeric) - 100g', 35),
+    ('मिर्च पाउडर (Chili Powder) - 100g', 40),
+    ('धनिया पाउडर (Coriander) - 100g', 30),
+    ('साबुन (Soap)', 35),
+    ('शैम्पू (Shampoo)', 120),
+]
+
+
+def add_sample_products():
+    """
+    Add the starter catalogue to an empty store.
+
+    Returns:
+        int: Number of products added (0 if products already exist)
+    """
+    if get_products_count():
+        return 0
+    db.session.add_all(Product(name=name, price=price) for name, price in SAMPLE_PRODUCTS)
+    _commit_catalog_change()
+    return len(SAMPLE_PRODUCTS)
+
+
 def toggle_product_availability(product_id):
-    """Toggle product availability."""
-    product = Product.query.get(product_id)
-    if product:
-        product.is_available = not product.is_available
-        db.session.commit()
-        return product.is_available
-    return None
+    """
+    Toggle product availability in a single UPDATE.
+
+    The admin's choice wins over sold_out: a product hidden here is not put
+    back on sale by a restock or a cancelled order.
+
+    Returns:
+        Row or None: (name, is_available) after the toggle, or None if not found
+    """
+    row = db.session.execute(
+        db.update(Product)
+        .where(Product.id == product_id)
+        .values(is_available=~Product.is_available, sold_out=False)
+        .returning(Product.name, Product.is_available)
+    ).first()
+    if row is None:
+        db.session.rollback()
+        return None
+    _commit_catalog_change()
+    return row
+
+
+def get_stock_levels():
+    """
+    Get current stock of every product that tracks it.
+
+    Stock is not part of the catalog snapshot (orders would invalidate it
+    constantly), so admin pages read it here.
+
+    Returns:
+        dict: {product_id: stock}
+    """
+    rows = db.session.execute(db.select(Product.id, Product.stock).where(Product.stock.isnot(None)))
+    return dict(rows.all())
 
 
 def get_available_products():
@@ -241,21 +672,336 @@ def get_unavailable_count():
     return Product.query.filter_by(is_available=False).count()
 
 
+def replace_product_image(product_id, old_image, new_image):
+    """
+    Swap a product's image only if it is still old_image.
+
+    Returns:
+        bool: True if the product was updated
+    """
+    updated = Product.query.filter_by(id=product_id, image=old_image).update(
+        {Product.image: new_image}, synchronize_session=False
+    )
+    if updated:
+        _commit_catalog_change()
+    else:
+        db.session.rollback()
+    return bool(updated)
+
+
+def get_referenced_images():
+    """
+    Get every stored image still in use.
+
+    An image is in use while a product shows it or an unfinished upload
+    job still has to read it.
+
+    Returns:
+        set: Product.image values and staged job files
+    """
+    images = {row.image for row in Product.query.with_entities(Product.image) if row.image}
+    images.update(
+        row.source for row in ImageJob.query.with_entities(ImageJob.source)
+        .filter(ImageJob.status.in_(('pending', 'running', 'failed')))
+    )
+    return images
+
+
+def is_image_referenced(image):
+    """Check whether any product or unfinished upload job uses an image."""
+    if Product.query.filter_by(image=image).first() is not None:
+        return True
+    return ImageJob.query.filter(
+        ImageJob.source == image, ImageJob.status.in_(('pending', 'running', 'failed'))
+    ).first() is not None
+
+
+# ==================== Image Job Functions ====================
+
+def create_image_job(product_id, source, max_attempts=3):
+    """Queue a product image upload."""
+    job = ImageJob(product_id=product_id, source=source, max_attempts=max_attempts)
+    db.session.add(job)
+    db.session.commit()
+    return job.id
+
+
+def get_image_job_by_id(job_id):
+    """Get image job by ID."""
+    return ImageJob.query.get(job_id)
+
+
+def get_recent_image_jobs(limit=50):
+    """Get the most recent image jobs, newest first."""
+    return ImageJob.query.order_by(ImageJob.id.desc()).limit(limit).all()
+
+
+def get_image_job_counts():
+    """Get the number of image jobs per status."""
+    rows = db.session.query(ImageJob.status, db.func.count(ImageJob.id)).group_by(ImageJob.status).all()
+    return dict(rows)
+
+
+def claim_image_job(job_id):
+    """
+    Atomically move a pending job to running and count the attempt.
+
+    Only one worker can claim a job; the others get None.
+
+    Returns:
+        ImageJob or None
+    """
+    claimed = ImageJob.query.filter_by(id=job_id, status='pending').update(
+        {ImageJob.status: 'running', ImageJob.attempts: ImageJob.attempts + 1,
+         ImageJob.updated_at: datetime.utcnow()},
+        synchronize_session=False
+    )
+    db.session.commit()
+    return ImageJob.query.get(job_id) if claimed else None
+
+
+def complete_image_job(job_id, result_url):
+    """Mark a job as done."""
+    ImageJob.query.filter_by(id=job_id).update(
+        {ImageJob.status: 'done', ImageJob.result_url: result_url, ImageJob.last_error: None,
+         ImageJob.updated_at: datetime.utcnow()},
+        synchronize_session=False
+    )
+    db.session.commit()
+
+
+def fail_image_job(job_id, error, retry):
+    """Record a failed attempt; the job goes back to pending if it will be retried."""
+    ImageJob.query.filter_by(id=job_id).update(
+        {ImageJob.status: 'pending' if retry else 'failed', ImageJob.last_error: error[:2000],
+         ImageJob.updated_at: datetime.utcnow()},
+        synchronize_session=False
+    )
+    db.session.commit()
+
+
+def requeue_image_jobs(stale_before=None, job_id=None):
+    """
+    Put failed jobs (or ones stuck in running) back in the queue.
+
+    Args:
+        stale_before: Requeue running jobs last touched before this time
+                      (their worker died) and all failed jobs
+        job_id: Requeue just this failed job, with fresh attempts
+
+    Returns:
+        list: IDs of all pending jobs
+    """
+    if job_id is not None:
+        ImageJob.query.filter_by(id=job_id, status='failed').update(
+            {ImageJob.status: 'pending', ImageJob.attempts: 0}, synchronize_session=False
+        )
+    elif stale_before is not None:
+        ImageJob.query.filter(
+            ImageJob.status == 'running', ImageJob.updated_at < stale_before
+        ).update({ImageJob.status: 'pending'}, synchronize_session=False)
+        ImageJob.query.filter_by(status='failed').update(
+            {ImageJob.status: 'pending', ImageJob.attempts: 0}, synchronize_session=False
+        )
+    db.session.commit()
+    return [row.id for row in ImageJob.query.with_entities(ImageJob.id).filter_by(status='pending').order_by(ImageJob.id)]
+
+
 # ==================== Order Functions ====================
 
-def create_order(customer_name, mobile, address, items, total, payment_method='cod'):
-    """Create new order."""
+def normalize_mobile(mobile):
+    """
+    Normalize an Indian mobile number to its 10 digits.
+
+    Strips spaces, dashes, a +91/91 country code and a leading 0 trunk
+    prefix, so "+91 98765-43210" and "098765 43210" both become
+    "9876543210". Anything else is returned as its bare digits.
+    """
+    digits = ''.join(ch for ch in str(mobile or '') if ch.isdigit())
+    if len(digits) == 12 and digits.startswith('91'):
+        digits = digits[2:]
+    elif len(digits) == 11 and digits.startswith('0'):
+        digits = digits[1:]
+    return digits
+
+
+CUSTOMER_ORDER_BUCKETS = 4096
+
+
+def customer_orders_generation(mobile):
+    """
+    Name of the cache generation counter covering one customer's orders.
+
+    Customers share CUSTOMER_ORDER_BUCKETS counters by a hash of their
+    mobile, so cache_generations stays bounded however many customers
+    order; a change to one customer's orders makes the cached pages of
+    the others in its bucket miss once.
+    """
+    import zlib
+    return f'customer_orders:{zlib.crc32(mobile.encode()) % CUSTOMER_ORDER_BUCKETS}'
+
+
+def _commit_customer_orders_change(mobile):
+    """Commit an order change and invalidate that customer's cached order list."""
+    from customer_orders import invalidate_customer_orders
+    bump_generation(customer_orders_generation(mobile))
+    db.session.commit()
+    invalidate_customer_orders(mobile)
+
+
+def order_item_values(item):
+    """Column values of the OrderItem for one cart item ({id, name, price, qty})."""
+    product_id = item.get('id')
+    return {
+        'product_id': int(product_id) if str(product_id).isdigit() else None,
+        'name': str(item.get('name', ''))[:255],
+        'unit_price': float(item.get('price') or 0),
+        'qty': int(item.get('qty') or 1)
+    }
+
+
+def order_items_from_cart(items):
+    """Build OrderItem rows from cart items ({id, name, price, qty})."""
+    return [OrderItem(**order_item_values(item)) for item in items]
+
+
+class OutOfStockError(Exception):
+    """A product no longer has the quantity being ordered."""
+
+    def __init__(self, product_id):
+        super().__init__(f"Product {product_id} is out of stock")
+        self.product_id = product_id
+
+
+def reserve_stock(quantities):
+    """
+    Take ordered quantities out of stock in the current transaction.
+
+    Each product is one conditional UPDATE (stock >= qty), so two orders
+    can never both take the last unit. The row lock it takes is held until
+    commit; taking them in product id order in every transaction means two
+    orders can wait for each other but never deadlock, and orders for other
+    products do not wait at all. A product that reaches zero becomes
+    unavailable.
+
+    Args:
+        quantities: [(product_id, qty)] of products whose stock is tracked
+
+    Raises:
+        OutOfStockError: If a product is short or unavailable; the caller
+            must roll back
+    """
+    sold_out = False
+    for product_id, qty in sorted(quantities):
+        remaining = db.session.execute(
+            db.update(Product)
+            .where(Product.id == product_id, Product.is_available.is_(True), Product.stock >= qty)
+            .values(
+                stock=Product.stock - qty,
+                is_available=db.case((Product.stock - qty <= 0, False), else_=Product.is_available),
+                sold_out=db.case((Product.stock - qty <= 0, True), else_=Product.sold_out)
+            )
+            .returning(Product.stock)
+        ).scalar()
+        if remaining is None:
+            raise OutOfStockError(product_id)
+        sold_out = sold_out or remaining <= 0
+    if sold_out:
+        # Only a sell-out changes what the catalog shows
+        bump_generation('catalog')
+    return sold_out
+
+
+def release_stock(quantities):
+    """
+    Put quantities back in stock in the current transaction.
+
+    Only products whose stock is tracked change. A product that sold out
+    becomes available again; one the admin made unavailable does not.
+
+    Args:
+        quantities: [(product_id, qty)]
+
+    Returns:
+        bool: True if a product came back into stock
+    """
+    restocked = False
+    for product_id, qty in sorted(quantities):
+        row = db.session.execute(
+            db.update(Product)
+            .where(Product.id == product_id, Product.stock.isnot(None))
+            .values(
+                stock=Product.stock + qty,
+                is_available=db.case((Product.sold_out, True), else_=Product.is_available),
+                sold_out=False
+            )
+            .returning(Product.stock, Product.is_available)
+        ).first()
+        restocked = restocked or (row is not None and row.is_available and row.stock <= qty)
+    if restocked:
+        bump_generation('catalog')
+    return restocked
+
+
+def order_stock_quantities(order):
+    """
+    (product_id, qty) of an order's lines that took stock when it was placed.
+
+    Lines of products that were not tracked then are left out, even if the
+    product is tracked now: that stock was never taken for the order. So
+    are products that have stopped tracking stock since.
+    """
+    quantities = {}
+    for item in order.order_items:
+        if item.stock_reserved and item.product_id is not None:
+            quantities[item.product_id] = quantities.get(item.product_id, 0) + item.qty
+    if not quantities:
+        return []
+    tracked = set(db.session.execute(
+        db.select(Product.id).where(Product.id.in_(quantities), Product.stock.isnot(None))
+    ).scalars())
+    return [(product_id, qty) for product_id, qty in quantities.items() if product_id in tracked]
+
+
+def create_order(customer_name, mobile, address, items, total, payment_method='cod', idempotency_key=None,
+                 reserve=()):
+    """
+    Create new order with its line items in one transaction.
+
+    With an idempotency_key claimed by claim_idempotency_key(), the key is
+    pointed at the order in the same transaction. reserve lists the
+    (product_id, qty) to take out of stock (see reserve_stock).
+
+    Raises:
+        OutOfStockError: Nothing was ordered; the caller must roll back
+    """
     import json
     order = Order(
         customer_name=customer_name,
-        mobile=mobile,
+        mobile=normalize_mobile(mobile),
         address=address,
         items=json.dumps(items),
         total=total,
         payment_method=payment_method
     )
+    order.order_items = order_items_from_cart(items)
+    reserved = {product_id for product_id, _ in reserve}
+    for item in order.order_items:
+        item.stock_reserved = item.product_id in reserved
     db.session.add(order)
-    db.session.commit()
+    db.session.flush()
+    sold_out = reserve_stock(reserve)
+    if idempotency_key:
+        db.session.execute(
+            db.update(IdempotencyKey).where(IdempotencyKey.key == idempotency_key).values(order_id=order.id)
+        )
+    from sales_rollups import record_order_created
+    from order_events import publish_order_event
+    publish_order_event('order_created', order, record_order_created(order))
+    _commit_customer_orders_change(order.mobile)
+    if sold_out:
+        from catalog_cache import invalidate_catalog
+        invalidate_catalog()
     return order.id
 
 
@@ -264,30 +1010,237 @@ def get_all_orders():
     return Order.query.order_by(Order.date.desc()).all()
 
 
+def get_product_sales(include_cancelled=False):
+    """
+    Get units sold and revenue per product.
+
+    Returns:
+        list: Rows of (product_id, name, units, revenue), best sellers first
+    """
+    units = db.func.sum(OrderItem.qty)
+    revenue = db.func.sum(OrderItem.qty * OrderItem.unit_price)
+    query = db.session.query(
+        OrderItem.product_id, db.func.max(OrderItem.name), units, revenue
+    ).join(Order, Order.id == OrderItem.order_id)
+    if not include_cancelled:
+        query = query.filter(Order.status != 'cancelled')
+    return query.group_by(OrderItem.product_id).order_by(revenue.desc()).all()
+
+
+def encode_order_cursor(order):
+    """Encode an order's (date, id) position as an opaque page cursor."""
+    import base64
+    raw = f"{order.date.isoformat()}|{order.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_order_cursor(cursor):
+    """Decode a page cursor into (date, id), or None if it is invalid."""
+    import base64
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        date, order_id = raw.split('|')
+        return datetime.fromisoformat(date), int(order_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def filter_orders(query, status=None, payment_method=None, date_from=None, date_to=None, mobile=None):
+    """
+    Apply admin order filters to a query.
+
+    Args:
+        date_from: First day to include (date)
+        date_to: Last day to include (date)
+    """
+    from datetime import timedelta
+    if status:
+        query = query.filter(Order.status == status)
+    if payment_method:
+        query = query.filter(Order.payment_method == payment_method)
+    if mobile:
+        query = query.filter(Order.mobile == normalize_mobile(mobile))
+    if date_from:
+        query = query.filter(Order.date >= datetime.combine(date_from, datetime.min.time()))
+    if date_to:
+        query = query.filter(Order.date < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+    return query
+
+
+def get_orders_page(after=None, before=None, limit=50, **filters):
+    """
+    Get one page of orders, newest first, using keyset pagination.
+
+    Args:
+        after: Cursor of the last order on the previous page (older orders)
+        before: Cursor of the first order on the next page (newer orders)
+        limit: Page size
+        **filters: See filter_orders()
+
+    Returns:
+        dict: {'orders': [...], 'next_cursor': str|None, 'prev_cursor': str|None}
+    """
+    query = filter_orders(Order.query, **filters).options(db.selectinload(Order.order_items))
+    position = db.tuple_(Order.date, Order.id)
+    after, before = decode_order_cursor(after), decode_order_cursor(before)
+
+    if before:
+        orders = query.filter(position > before).order_by(Order.date, Order.id).limit(limit + 1).all()
+        has_newer = len(orders) > limit
+        orders = orders[:limit][::-1]
+        has_older = True
+    else:
+        if after:
+            query = query.filter(position < after)
+        orders = query.order_by(Order.date.desc(), Order.id.desc()).limit(limit + 1).all()
+        has_older = len(orders) > limit
+        orders = orders[:limit]
+        has_newer = after is not None
+
+    return {
+        'orders': orders,
+        'next_cursor': encode_order_cursor(orders[-1]) if orders and has_older else None,
+        'prev_cursor': encode_order_cursor(orders[0]) if orders and has_newer else None
+    }
+
+
+def get_order_by_id(order_id):
+    """Get order by ID."""
+    return db.session.get(Order, order_id)
+
+
 def get_orders_count():
     """Get total order count."""
     return Order.query.count()
 
 
+def get_recent_orders(limit=5):
+    """Get the newest orders."""
+    return Order.query.order_by(Order.date.desc(), Order.id.desc()).limit(limit).all()
+
+
+def _commit_order_change(order, catalog_changed):
+    """Commit an order change, invalidating the catalog if it moved stock in or out of sale."""
+    _commit_customer_orders_change(order.mobile)
+    if catalog_changed:
+        from catalog_cache import invalidate_catalog
+        invalidate_catalog()
+
+
 def delete_order(order_id):
-    """Delete order."""
-    order = Order.query.get(order_id)
+    """Delete order, putting its stock back unless it was cancelled."""
+    # Locked, so two deletes cannot both give the stock back
+    order = db.session.get(Order, order_id, with_for_update=True)
     if order:
+        from sales_rollups import record_order_deleted
+        from order_events import publish_order_event
+        catalog_changed = False
+        if order.status != 'cancelled':
+            catalog_changed = release_stock(order_stock_quantities(order))
+        publish_order_event('order_deleted', order, record_order_deleted(order))
         db.session.delete(order)
-        db.session.commit()
+        _commit_order_change(order, catalog_changed)
 
 
 def update_order_status(order_id, status):
-    """Update order status."""
-    order = Order.query.get(order_id)
-    if order:
+    """
+    Update order status.
+
+    Cancelling puts the order's stock back; reviving a cancelled order
+    takes it out again.
+
+    Raises:
+        OutOfStockError: Reviving needs stock that is gone; the caller
+            must roll back
+    """
+    # Locked, so two admins changing it at once cannot both move stock
+    order = db.session.get(Order, order_id, with_for_update=True)
+    if order and order.status != status:
+        from sales_rollups import record_status_change
+        from order_events import publish_order_event
+        old_status = order.status
+        catalog_changed = False
+        if status == 'cancelled':
+            catalog_changed = release_stock(order_stock_quantities(order))
+        elif old_status == 'cancelled':
+            catalog_changed = reserve_stock(order_stock_quantities(order))
+        deltas = record_status_change(order, old_status, status)
         order.status = status
-        db.session.commit()
+        publish_order_event('order_status', order, deltas, old_status=old_status or 'pending')
+        _commit_order_change(order, catalog_changed)
 
 
 def get_orders_by_mobile(mobile):
     """Get orders by mobile number."""
-    return Order.query.filter_by(mobile=mobile).order_by(Order.date.desc()).all()
+    return Order.query.filter_by(mobile=normalize_mobile(mobile)).order_by(Order.date.desc()).all()
+
+
+# ==================== Idempotency Key Functions ====================
+
+def idempotency_fingerprint(payload):
+    """SHA-256 of a request body, independent of key order and whitespace."""
+    import hashlib
+    import json
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def claim_idempotency_key(key, request_hash, ttl):
+    """
+    Claim an idempotency key for a new order, without committing.
+
+    The insert relies on the primary key: a concurrent request with the
+    same key blocks on it until the first transaction ends, then sees the
+    committed key (and its order) instead of inserting a second order. An
+    expired key is taken over.
+
+    Args:
+        key: Client-supplied key
+        request_hash: idempotency_fingerprint() of the request body
+        ttl: timedelta the key is kept for
+
+    Returns:
+        IdempotencyKey: The existing key to replay, or None if claimed
+    """
+    now = datetime.utcnow()
+    values = {'key': key, 'request_hash': request_hash, 'order_id': None,
+              'created_at': now, 'expires_at': now + ttl}
+    table = IdempotencyKey.__table__
+    insert = dialect_insert()
+    if insert is not None:
+        stmt = insert(table).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['key'], set_={name: stmt.excluded[name] for name in values if name != 'key'},
+            where=table.c.expires_at < now
+        ).returning(table.c.key)
+        if db.session.execute(stmt).first() is not None:
+            return None
+        return db.session.get(IdempotencyKey, key, populate_existing=True)
+    existing = db.session.get(IdempotencyKey, key, populate_existing=True)
+    if existing is not None and existing.expires_at >= now:
+        return existing
+    if existing is not None:
+        db.session.delete(existing)
+        db.session.flush()
+    db.session.add(IdempotencyKey(**values))
+    db.session.flush()
+    return None
+
+
+def purge_idempotency_keys(now=None):
+    """
+    Delete expired idempotency keys.
+
+    Returns:
+        int: Keys deleted
+    """
+    result = db.session.execute(
+        db.delete(IdempotencyKey).where(IdempotencyKey.expires_at < (now or datetime.utcnow()))
+    )
+    db.session.commit()
+    return result.rowcount
 
 
 # ==================== Admin Functions ====================
@@ -415,10 +1368,15 @@ def get_open_customer_care_count():
 
 # ==================== Contact Message Functions ====================
 
+def normalize_email(email):
+    """Normalize an email address for lookups."""
+    return (email or '').strip().lower()
+
+
 def add_contact_message(name, email, message):
     """Add new contact message."""
     try:
-        msg = ContactMessage(name=name, email=email, message=message)
+        msg = ContactMessage(name=name, email=email, email_normalized=normalize_email(email), message=message)
         db.session.add(msg)
         db.session.commit()
         return msg.id
@@ -432,6 +1390,26 @@ def get_all_contact_messages():
     return ContactMessage.query.order_by(ContactMessage.created_at.desc()).all()
 
 
+def get_contact_messages_by_email(email, limit=20, before_id=None):
+    """
+    Get contact messages sent from an email address, newest first.
+
+    Args:
+        email: Email address (any case or surrounding spaces)
+        limit: Page size
+        before_id: ID of the last message on the previous page
+
+    Returns:
+        tuple: (messages, next_before_id or None)
+    """
+    query = ContactMessage.query.filter_by(email_normalized=normalize_email(email))
+    if before_id:
+        query = query.filter(ContactMessage.id < before_id)
+    messages = query.order_by(ContactMessage.id.desc()).limit(limit + 1).all()
+    next_before_id = messages[limit - 1].id if len(messages) > limit else None
+    return messages[:limit], next_before_id
+
+
 def get_unread_contact_messages():
     """Get unread contact messages."""
     return ContactMessage.query.filter_by(is_read=False).order_by(ContactMessage.created_at.desc()).all()
@@ -485,17 +1463,38 @@ def get_admins_count():
 # ==================== Settings Functions ====================
 
 def get_setting(key):
-    """Get setting value by key."""
-    setting = Setting.query.filter_by(key=key).first()
-    return setting.value if setting else None
+    """Get a setting's typed value from the worker's settings snapshot."""
+    from settings_registry import get_settings
+    return get_settings().get(key)
 
 
 def update_setting(key, value):
     """Update setting value."""
-    setting = Setting.query.filter_by(key=key).first()
-    if setting:
-        setting.value = value
-        db.session.commit()
+    update_settings({key: value})
+
+
+def update_settings(values):
+    """
+    Update several settings in one transaction.
+
+    Values are validated against the settings registry; missing rows are
+    created.
+
+    Args:
+        values: dict of key -> value
+
+    Raises:
+        ValueError: If a value is not valid for its setting's type
+    """
+    from settings_registry import coerce_setting
+    for key, value in values.items():
+        value = str(coerce_setting(key, value))
+        setting = Setting.query.filter_by(key=key).first()
+        if setting:
+            setting.value = value
+        else:
+            db.session.add(Setting(key=key, value=value))
+    _commit_settings_change()
 
 
 def get_all_settings():
@@ -506,9 +1505,10 @@ def get_all_settings():
 
 def get_shop_timings():
     """Get shop opening and closing times."""
-    settings = get_all_settings()
+    from settings_registry import get_settings
+    settings = get_settings()
     return {
-        'open_time': settings.get('shop_open_time', '08:00'),
-        'close_time': settings.get('shop_close_time', '21:00'),
-        'phone': settings.get('shop_phone', '9999999999')
+        'open_time': settings['shop_open_time'],
+        'close_time': settings['shop_close_time'],
+        'phone': settings['shop_phone']
     }
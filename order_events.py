@@ -0,0 +1,230 @@
+"""
+Order Events Module
+Live order feed for the admin pages (Server-Sent Events).
+
+create_order, update_order_status and delete_order publish an event in
+the same transaction as the change, carrying the order and the sales
+rollup deltas it caused, so the dashboard can update its figures without
+asking the database again. On PostgreSQL the event is
+pg_notify('order_events', ...), which is delivered only if and when the
+transaction commits. Each worker process runs one listener thread with
+its own LISTEN connection, started by the first admin stream it serves,
+and fans every notification out to all of its open streams.
+
+Other databases have no LISTEN, so there events go straight to the
+streams of the process that committed them (enough for `flask run`).
+"""
+
+import json
+import queue
+import select
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import db
+
+
+CHANNEL = 'order_events'
+MAX_PENDING_EVENTS = 100  # Per stream; a stream that falls further behind is told to resync
+KEEPALIVE_SECONDS = 15  # Comment line sent to idle streams; also how soon a closed tab is noticed
+RECONNECT_MS = 3000
+
+RESYNC = {'type': 'resync'}
+
+
+class Subscription:
+    """Events waiting to be sent on one open stream."""
+
+    def __init__(self):
+        self.queue = queue.Queue(maxsize=MAX_PENDING_EVENTS)
+        self.lagged = False
+
+    def put(self, order_event):
+        try:
+            self.queue.put_nowait(order_event)
+        except queue.Full:
+            self.lagged = True
+
+    def get(self, timeout):
+        """Next event, RESYNC if some were dropped, or None after timeout."""
+        if self.lagged:
+            self.lagged = False
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            return RESYNC
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+_subscriptions = set()
+_subscriptions_lock = threading.Lock()
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def _broadcast(order_event):
+    """Hand an event to every open stream in this process."""
+    with _subscriptions_lock:
+        subscriptions = list(_subscriptions)
+    for subscription in subscriptions:
+        subscription.put(order_event)
+
+
+# ==================== Publishing ====================
+
+def publish_order_event(kind, order, deltas=None, **extra):
+    """
+    Announce an order change to the admin streams when its transaction commits.
+
+    Args:
+        kind: 'order_created', 'order_status' or 'order_deleted'
+        order: The (flushed) order
+        deltas: Sales rollup deltas the change applied
+        extra: Other fields, e.g. old_status
+    """
+    order_event = {
+        'type': kind,
+        'order': {
+            'id': order.id,
+            'customer_name': order.customer_name,
+            'mobile': order.mobile,
+            'total': order.total,
+            'payment_method': order.payment_method,
+            'status': order.status or 'pending',
+            'date': order.date.isoformat(sep=' ') if order.date else None,
+        },
+        'day': order.date.strftime('%Y-%m-%d') if order.date else None,
+        'hour': order.date.strftime('%Y-%m-%d %H') if order.date else None,
+        'deltas': deltas or {},
+        **extra
+    }
+    if db.session.get_bind().dialect.name == 'postgresql':
+        db.session.execute(
+            db.text("SELECT pg_notify(:channel, :payload)"),
+            {'channel': CHANNEL, 'payload': json.dumps(order_event, ensure_ascii=False)}
+        )
+    else:
+        db.session.info.setdefault('order_events', []).append(order_event)
+
+
+def _deliver_after_commit(session):
+    for order_event in session.info.pop('order_events', ()):
+        _broadcast(order_event)
+
+
+def _discard_after_rollback(session):
+    session.info.pop('order_events', None)
+
+
+def init_order_events(app):
+    """Deliver events queued by publish_order_event() once their transaction commits (non-PostgreSQL)."""
+    if not event.contains(Session, 'after_commit', _deliver_after_commit):
+        event.listen(Session, 'after_commit', _deliver_after_commit)
+        event.listen(Session, 'after_rollback', _discard_after_rollback)
+
+
+# ==================== Listening ====================
+
+def _listen(engine):
+    """Listener thread: LISTEN on a dedicated connection and broadcast notifications, forever."""
+    delay = 1
+    reconnecting = False
+    while True:
+        connection = None
+        try:
+            # Taken out of the pool for good, so it never counts against the request threads
+            connection = engine.raw_connection()
+            conn = connection.driver_connection
+            connection.detach()
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANNEL}")
+            if reconnecting:
+                # Whatever was published while disconnected is lost
+                _broadcast(RESYNC)
+            delay = 1
+            while True:
+                if select.select([conn], [], [], KEEPALIVE_SECONDS) == ([], [], []):
+                    # Idle: make sure the connection is still there
+                    with conn.cursor() as cursor:
+                        cursor.execute("SELECT 1")
+                conn.poll()
+                while conn.notifies:
+                    _broadcast(json.loads(conn.notifies.pop(0).payload))
+        except Exception as e:
+            print(f"⚠️ Order events listener: {e}; reconnecting in {delay}s")
+            reconnecting = True
+            if connection is not None:
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+            time.sleep(delay)
+            delay = min(delay * 2, 30)
+
+
+def _ensure_listener():
+    """Start this process's listener thread (PostgreSQL only) if it is not running."""
+    global _listener
+    engine = db.engine
+    if engine.dialect.name != 'postgresql':
+        return
+    with _listener_lock:
+        if _listener is None or not _listener.is_alive():
+            _listener = threading.Thread(target=_listen, args=(engine,), name='order-events', daemon=True)
+            _listener.start()
+
+
+# ==================== Streaming ====================
+
+def _format(order_event):
+    """One SSE message."""
+    data = json.dumps(order_event, ensure_ascii=False)
+    return f"event: {order_event['type']}\ndata: {data}\n\n"
+
+
+def _stream(max_streams, max_seconds):
+    subscription = Subscription()
+    with _subscriptions_lock:
+        busy = len(_subscriptions) >= max_streams
+        if not busy:
+            _subscriptions.add(subscription)
+    if busy:
+        # Too many streams in this worker: ask the browser to come back later
+        yield "retry: 60000\nevent: busy\ndata: {}\n\n"
+        return
+    try:
+        yield f"retry: {RECONNECT_MS}\nevent: ready\ndata: {{}}\n\n"
+        deadline = time.monotonic() + max_seconds
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                # The browser reconnects by itself; ending now and then frees the worker thread
+                return
+            order_event = subscription.get(timeout=min(KEEPALIVE_SECONDS, remaining))
+            yield _format(order_event) if order_event is not None else ": keepalive\n\n"
+    finally:
+        with _subscriptions_lock:
+            _subscriptions.discard(subscription)
+
+
+def open_order_stream():
+    """
+    Start streaming order events to one admin page.
+
+    Each open stream holds a worker thread, so at most
+    ORDER_EVENTS_MAX_STREAMS run per process and each ends after
+    ORDER_EVENTS_MAX_SECONDS (EventSource reconnects by itself).
+
+    Returns:
+        generator: text/event-stream chunks; it subscribes when first iterated
+    """
+    _ensure_listener()
+    return _stream(current_app.config.get('ORDER_EVENTS_MAX_STREAMS', 2),
+                   current_app.config.get('ORDER_EVENTS_MAX_SECONDS', 300))
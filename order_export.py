@@ -0,0 +1,136 @@
+"""
+Order Export Module
+Streams orders as CSV or JSON Lines without loading them into memory.
+
+Rows are read through a server-side cursor (a named cursor on psycopg2)
+in chunks of CHUNK_SIZE and written out chunk by chunk, so memory use stays
+flat and the first bytes are sent before the whole table has been read.
+"""
+
+import csv
+import io
+import json
+
+from models import db, Order, OrderItem, filter_orders
+
+
+CHUNK_SIZE = 1000
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+# Spreadsheets run a cell starting with one of these as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+ORDER_FIELDS = ['id', 'date', 'customer_name', 'mobile', 'address', 'total', 'payment_method', 'status']
+ITEM_FIELDS = ['product_id', 'item_name', 'unit_price', 'qty']
+
+
+def _stream_rows(with_items=False, chunk_size=CHUNK_SIZE, **filters):
+    """
+    Yield lists of result rows, oldest order first.
+
+    With items, orders are outer-joined to order_items and each row is one
+    line item, so an order spans consecutive rows.
+    """
+    columns = [getattr(Order, field) for field in ORDER_FIELDS]
+    if with_items:
+        columns += [OrderItem.product_id, OrderItem.name, OrderItem.unit_price, OrderItem.qty]
+    query = filter_orders(db.session.query(*columns), **filters)
+    if with_items:
+        query = query.outerjoin(OrderItem, OrderItem.order_id == Order.id)
+        query = query.order_by(Order.date, Order.id, OrderItem.id)
+    else:
+        query = query.order_by(Order.date, Order.id)
+
+    result = db.session.execute(
+        query.statement.execution_options(stream_results=True, yield_per=chunk_size)
+    )
+    try:
+        for partition in result.partitions():
+            yield partition
+    finally:
+        result.close()
+
+
+def _order_dict(row):
+    order = dict(zip(ORDER_FIELDS, row))
+    order['date'] = order['date'].isoformat() if order['date'] else None
+    return order
+
+
+def _csv_safe(value):
+    """Quote customer-supplied text that a spreadsheet would run as a formula."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def generate_csv(with_items=False, chunk_size=CHUNK_SIZE, **filters):
+    """Yield CSV text chunks: a header, then one chunk per fetched batch."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(ORDER_FIELDS + (ITEM_FIELDS if with_items else []))
+    yield buffer.getvalue()
+
+    for rows in _stream_rows(with_items, chunk_size, **filters):
+        buffer.seek(0)
+        buffer.truncate()
+        for row in rows:
+            values = [_csv_safe(value) for value in row]
+            values[1] = values[1].isoformat() if values[1] else ''
+            writer.writerow(values)
+        yield buffer.getvalue()
+
+
+def generate_jsonl(with_items=False, chunk_size=CHUNK_SIZE, **filters):
+    """Yield JSON Lines chunks, one JSON object per order."""
+    if not with_items:
+        for rows in _stream_rows(False, chunk_size, **filters):
+            yield ''.join(json.dumps(_order_dict(row), ensure_ascii=False) + '\n' for row in rows)
+        return
+
+    # Item rows of one order are consecutive; an order may straddle chunks
+    current = None
+    for rows in _stream_rows(True, chunk_size, **filters):
+        lines = []
+        for row in rows:
+            if current is None or current['id'] != row[0]:
+                if current is not None:
+                    lines.append(json.dumps(current, ensure_ascii=False) + '\n')
+                current = _order_dict(row)
+                current['items'] = []
+            product_id, name, unit_price, qty = row[len(ORDER_FIELDS):]
+            if name is not None:
+                current['items'].append({
+                    'product_id': product_id,
+                    'name': name,
+                    'unit_price': unit_price,
+                    'qty': qty
+                })
+        if lines:
+            yield ''.join(lines)
+    if current is not None:
+        yield json.dumps(current, ensure_ascii=False) + '\n'
+
+
+def generate_export(export_format, with_items=False, chunk_size=CHUNK_SIZE, **filters):
+    """
+    Stream an export in the given format.
+
+    Args:
+        export_format: 'csv' or 'jsonl'
+        with_items: Include line items (one CSV row per item, or an
+                    'items' list per JSON object)
+        **filters: See models.filter_orders()
+
+    Returns:
+        generator: Text chunks
+    """
+    if export_format == 'csv':
+        return generate_csv(with_items, chunk_size, **filters)
+    if export_format == 'jsonl':
+        return generate_jsonl(with_items, chunk_size, **filters)
+    raise ValueError(f"Unknown export format: {export_format}")
@@ -0,0 +1,271 @@
+"""
+Page Cache Module
+Response cache for the anonymous storefront pages.
+
+A cached page is keyed on its path, the query parameters its view reads
+and the cache generation counters it depends on ('catalog', 'settings').
+Other parameters (?utm_source=..., cache busters) share the plain page
+instead of each filling the cache with a copy of it. Writes bump
+those counters, so stale pages are never looked up again and simply age
+out. The counters themselves are re-read at most once per
+PAGE_CACHE_CHECK_INTERVAL, which means a cache hit normally never touches
+the database.
+
+Backends:
+    memory      - per-worker LRU (default)
+    filesystem  - one file per page in PAGE_CACHE_DIR, shared by all
+                  workers on the machine; written atomically with os.replace
+    none        - caching disabled
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+from functools import wraps
+from urllib.parse import urlencode
+
+from flask import current_app, request, session, make_response
+
+from metrics import CACHE_REQUESTS
+from models import get_generations
+
+
+CachedPage = namedtuple('CachedPage', ['body', 'content_type', 'etag', 'last_modified'])
+
+
+class MemoryBackend:
+    """In-process LRU of rendered pages."""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            page = self._pages.get(key)
+            if page is not None:
+                self._pages.move_to_end(key)
+            return page
+
+    def set(self, key, page):
+        with self._lock:
+            self._pages[key] = page
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.max_entries:
+                self._pages.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+
+
+class FileSystemBackend:
+    """
+    Rendered pages stored as files, shared between worker processes.
+
+    Each file holds one JSON header line followed by the body. Files are
+    written to a temporary name and moved into place with os.replace, so a
+    reader never sees a partly written page.
+    """
+
+    PRUNE_EVERY = 50
+
+    def __init__(self, directory, max_entries=512):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._writes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest() + '.page')
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'rb') as f:
+                header = json.loads(f.readline())
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        if header.get('key') != key:
+            return None
+        return CachedPage(
+            body, header['content_type'], header['etag'],
+            datetime.fromisoformat(header['last_modified'])
+        )
+
+    def set(self, key, page):
+        header = json.dumps({
+            'key': key,
+            'content_type': page.content_type,
+            'etag': page.etag,
+            'last_modified': page.last_modified.isoformat()
+        })
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(header.encode() + b'\n')
+                f.write(page.body)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return
+
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            self._prune()
+
+    def _prune(self):
+        """Delete the least recently written pages beyond max_entries."""
+        try:
+            entries = [e for e in os.scandir(self.directory) if e.name.endswith('.page')]
+        except OSError:
+            return
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_entries]:
+            try:
+                os.unlink(entry.path)
+            except OSError:
+                pass
+
+    def clear(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.page'):
+                try:
+                    os.unlink(entry.path)
+                except OSError:
+                    pass
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+_generations = {}
+_checked_at = 0.0
+
+
+def create_backend(config):
+    """
+    Build the backend named by the PAGE_CACHE_BACKEND config value.
+
+    Returns:
+        MemoryBackend, FileSystemBackend, or None when caching is disabled
+    """
+    name = config.get('PAGE_CACHE_BACKEND', 'memory')
+    max_entries = config.get('PAGE_CACHE_MAX_ENTRIES', 512)
+    if name == 'memory':
+        return MemoryBackend(max_entries)
+    if name == 'filesystem':
+        return FileSystemBackend(config['PAGE_CACHE_DIR'], max_entries)
+    if name == 'none':
+        return None
+    raise ValueError(f"Unknown page cache backend: {name}")
+
+
+def get_backend():
+    """Get this process's page cache backend, creating it on first use."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend(current_app.config) or False
+    return _backend or None
+
+
+def _current_generations():
+    """Read the generation counters, at most once per check interval."""
+    global _generations, _checked_at
+    max_age = current_app.config.get('PAGE_CACHE_CHECK_INTERVAL', 1.0)
+    now = time.monotonic()
+    if now - _checked_at >= max_age:
+        _generations = get_generations(('catalog', 'settings'))
+        _checked_at = now
+    return _generations
+
+
+def invalidate_page_cache():
+    """Force the next request to re-check the generations (after a local write)."""
+    global _checked_at
+    _checked_at = 0.0
+
+
+def _is_cacheable_request():
+    """Only plain GETs from visitors without an admin session or pending flashes."""
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    return 'admin_id' not in session and '_flashes' not in session
+
+
+def _cache_key(depends_on, params):
+    generations = _current_generations()
+    query = urlencode(sorted((name, value) for name, value in request.args.items(multi=True) if name in params))
+    versions = ','.join(f"{name}={generations.get(name, 0)}" for name in depends_on)
+    return f"{current_app.config.get('PAGE_CACHE_VERSION', '')}|{request.path}?{query}|{versions}"
+
+
+def _page_response(page):
+    """Build a conditional response (200 or 304) for a cached page."""
+    response = make_response(page.body)
+    response.content_type = page.content_type
+    response.set_etag(page.etag)
+    response.last_modified = page.last_modified
+    response.cache_control.no_cache = True
+    response.vary.add('Cookie')
+    return response.make_conditional(request)
+
+
+def cached_page(*depends_on, params=()):
+    """
+    Decorator caching a storefront view's rendered response.
+
+    Args:
+        *depends_on: Cache generation names the page content depends on,
+                     e.g. 'catalog' for pages listing products
+        params: Query parameters the view reads; all others are left out
+                of the cache key
+
+    Usage:
+        @app.route('/products')
+        @cached_page('catalog', params=('search',))
+        def products(): ...
+    """
+    params = frozenset(params)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            backend = get_backend()
+            if backend is None or not _is_cacheable_request():
+                return view(*args, **kwargs)
+
+            key = _cache_key(depends_on, params)
+            page = backend.get(key)
+            if page is not None:
+                CACHE_REQUESTS.inc(cache='page', result='hit')
+                return _page_response(page)
+            CACHE_REQUESTS.inc(cache='page', result='miss')
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.direct_passthrough or session.modified:
+                return response
+
+            body = response.get_data()
+            page = CachedPage(
+                body, response.content_type,
+                hashlib.sha1(body).hexdigest()[:20],
+                datetime.utcnow().replace(microsecond=0)
+            )
+            backend.set(key, page)
+            return _page_response(page)
+        return wrapper
+    return decorator
@@ -0,0 +1,229 @@
+"""
+Query Stats Module
+Per-request SQL query counting, slow-query logging and an N+1 detector.
+
+SQLAlchemy engine events time every statement. While a request (or a
+count_queries() block) is active the statements are added to its
+QueryStats, and after the request the totals are sent back as a
+Server-Timing header, which browser dev tools show next to the request:
+
+    Server-Timing: db;dur=4.1;desc="3 queries", app;dur=18.7
+
+Statements slower than SLOW_QUERY_MS are logged with the request path.
+When N_PLUS_ONE_THRESHOLD is set, a request that runs the same statement
+that many times is logged as a likely N+1 (raised as NPlusOneError with
+N_PLUS_ONE_RAISE, for tests). assert_constant_query_count() checks the
+other symptom directly: a route's query count growing with result size.
+"""
+
+import heapq
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# Statements longer than this are shortened in log lines
+STATEMENT_PREVIEW = 300
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+_slow_query_ms = 200.0
+_listening = False
+
+
+class NPlusOneError(AssertionError):
+    """A route's query count depends on the number of rows it shows."""
+
+
+class QueryStats:
+    """Queries run during one request or count_queries() block."""
+
+    def __init__(self, keep=3):
+        self.count = 0
+        self.seconds = 0.0
+        self.keep = keep
+        self._slowest = []  # min-heap of (seconds, statement)
+        self.statements = Counter()
+
+    def record(self, statement, seconds):
+        self.count += 1
+        self.seconds += seconds
+        self.statements[statement] += 1
+        if len(self._slowest) < self.keep:
+            heapq.heappush(self._slowest, (seconds, statement))
+        elif seconds > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, (seconds, statement))
+
+    @property
+    def milliseconds(self):
+        return self.seconds * 1000
+
+    @property
+    def slowest(self):
+        """The slowest statements as [(milliseconds, statement)], slowest first."""
+        return [(seconds * 1000, statement) for seconds, statement in sorted(self._slowest, reverse=True)]
+
+    def repeated(self, threshold):
+        """Statements run at least threshold times, as [(statement, times)]."""
+        return [(statement, times) for statement, times in self.statements.most_common() if times >= threshold]
+
+
+def _preview(statement):
+    statement = ' '.join(statement.split())
+    if len(statement) > STATEMENT_PREVIEW:
+        return statement[:STATEMENT_PREVIEW] + '...'
+    return statement
+
+
+def _active():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+# ==================== Engine Events ====================
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - conn.info['query_started'].pop()
+    for stats in _active():
+        stats.record(statement, seconds)
+    if seconds * 1000 >= _slow_query_ms:
+        where = request.path if has_request_context() else 'background'
+        logger.warning("Slow query (%.1f ms, %s): %s", seconds * 1000, where, _preview(statement))
+
+
+def _handle_error(context):
+    # after_cursor_execute does not run for a failed statement
+    started = context.connection.info.get('query_started') if context.connection else None
+    if started:
+        started.pop()
+
+
+def _listen():
+    global _listening
+    if _listening:
+        return
+    event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(Engine, 'handle_error', _handle_error)
+    _listening = True
+
+
+# ==================== Request Hooks ====================
+
+def init_query_stats(app):
+    """
+    Time every query and report per-request totals.
+
+    Config:
+        SERVER_TIMING: Add the Server-Timing header (default True)
+        SLOW_QUERY_MS: Log statements at least this slow (default 200)
+        N_PLUS_ONE_THRESHOLD: Flag statements repeated this often in one
+                              request (0 disables)
+        N_PLUS_ONE_RAISE: Raise NPlusOneError instead of logging
+    """
+    global _slow_query_ms
+    _slow_query_ms = app.config.get('SLOW_QUERY_MS', 200.0)
+    _listen()
+
+    @app.before_request
+    def start_query_stats():
+        g.query_stats = QueryStats()
+        g.request_started = time.perf_counter()
+        _active().append(g.query_stats)
+
+    @app.after_request
+    def report_query_stats(response):
+        stats = g.get('query_stats')
+        if stats is None:
+            return response
+
+        threshold = app.config.get('N_PLUS_ONE_THRESHOLD', 0)
+        if threshold:
+            repeated = stats.repeated(threshold)
+            if repeated:
+                statement, times = repeated[0]
+                message = f"Possible N+1 on {request.path}: ran {times} times: {_preview(statement)}"
+                if app.config.get('N_PLUS_ONE_RAISE'):
+                    raise NPlusOneError(message)
+                logger.warning(message)
+
+        if app.config.get('SERVER_TIMING', True):
+            elapsed = (time.perf_counter() - g.request_started) * 1000
+            response.headers.add(
+                'Server-Timing',
+                f'db;dur={stats.milliseconds:.1f};desc="{stats.count} queries", app;dur={elapsed:.1f}'
+            )
+        return response
+
+    @app.teardown_request
+    def stop_query_stats(exc):
+        stats = g.pop('query_stats', None)
+        if stats is not None and stats in _active():
+            _active().remove(stats)
+
+
+# ==================== Test Helpers ====================
+
+@contextmanager
+def count_queries():
+    """
+    Count the queries run inside a block on this thread.
+
+    Usage:
+        with count_queries() as stats:
+            client.get('/admin/orders')
+        assert stats.count <= 4
+    """
+    stats = QueryStats()
+    _active().append(stats)
+    try:
+        yield stats
+    finally:
+        _active().remove(stats)
+
+
+def assert_constant_query_count(make_request, add_rows, sizes=(1, 10)):
+    """
+    Fail if the number of queries grows with the number of rows shown.
+
+    Usage:
+        assert_constant_query_count(
+            lambda: client.get('/api/my-orders/9876543210'),
+            lambda n: create_orders_for('9876543210', n)
+        )
+
+    Args:
+        make_request: Callable making the request under test (counted)
+        add_rows: Callable taking a row count; brings the data the request
+                  shows to that many rows (not counted)
+        sizes: Row counts to compare
+
+    Returns:
+        int: The (constant) query count
+
+    Raises:
+        NPlusOneError: If the counts differ between sizes
+    """
+    counts = {}
+    for size in sizes:
+        add_rows(size)
+        with count_queries() as stats:
+            make_request()
+        counts[size] = stats.count
+    if len(set(counts.values())) > 1:
+        detail = ', '.join(f"{size} rows: {count} queries" for size, count in counts.items())
+        raise NPlusOneError(f"Query count grows with result size ({detail})")
+    return counts[sizes[0]]
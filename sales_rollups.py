@@ -0,0 +1,257 @@
+"""
+Sales Rollups Module
+Daily and hourly order aggregates behind the admin dashboard.
+
+Every order write adjusts its day and its hour with atomic "INSERT ...
+ON CONFLICT DO UPDATE SET col = col + delta" statements in the same
+transaction, so the dashboard sums a few small rows instead of scanning
+the orders table. Each bucket is split over ROLLUP_SLOTS rows and a write
+picks one at random: with a single row per bucket every checkout in the
+store would queue on its row lock until the previous one committed.
+Reads add the slots up.
+
+Revenue leaves out cancelled orders; order_count and the status counters
+include every order. recompute_rollups() rebuilds everything from orders
+if the aggregates ever drift (e.g. after a manual SQL fix).
+"""
+
+import random
+from datetime import datetime, timedelta
+
+from models import db, Order, SalesRollup, dialect_insert
+
+
+ROLLUP_SLOTS = 16
+GRANULARITIES = ('day', 'hour')
+ORDER_STATUSES = ('pending', 'confirmed', 'delivered', 'cancelled')
+PAYMENT_METHODS = ('cod', 'upi')
+
+COUNTER_COLUMNS = (
+    ['order_count', 'revenue']
+    + [f'{status}_count' for status in ORDER_STATUSES]
+    + [f'{method}_{field}' for method in PAYMENT_METHODS for field in ('count', 'revenue')]
+)
+
+
+def bucket_start(moment, granularity='day'):
+    """Truncate a datetime to the start of its day or hour."""
+    if granularity == 'hour':
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _apply_deltas(moment, deltas):
+    """
+    Add deltas to one slot of the day and of the hour containing moment (no commit).
+
+    Returns:
+        dict: The non-zero deltas applied
+    """
+    deltas = {column: value for column, value in deltas.items() if value}
+    if not deltas or moment is None:
+        return {}
+
+    table = SalesRollup.__table__
+    insert = dialect_insert()
+    for granularity in GRANULARITIES:
+        keys = {
+            'granularity': granularity,
+            'bucket': bucket_start(moment, granularity),
+            'slot': random.randrange(ROLLUP_SLOTS)
+        }
+        if insert is not None:
+            stmt = insert(table).values(**keys, **deltas)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['granularity', 'bucket', 'slot'],
+                set_={column: table.c[column] + stmt.excluded[column] for column in deltas}
+            )
+            db.session.execute(stmt)
+            continue
+
+        updated = db.session.execute(
+            table.update()
+            .where(*(table.c[name] == value for name, value in keys.items()))
+            .values({column: table.c[column] + value for column, value in deltas.items()})
+        ).rowcount
+        if not updated:
+            db.session.execute(table.insert().values(**keys, **deltas))
+    return deltas
+
+
+def _revenue_deltas(order, sign):
+    """Revenue deltas of one order (none while it is cancelled)."""
+    total = order.total or 0
+    deltas = {'revenue': sign * total}
+    if order.payment_method in PAYMENT_METHODS:
+        deltas[f'{order.payment_method}_revenue'] = sign * total
+    return deltas
+
+
+def _order_deltas(order, sign):
+    """Counter deltas contributed by one order."""
+    deltas = {'order_count': sign}
+    status = order.status or 'pending'
+    if status in ORDER_STATUSES:
+        deltas[f'{status}_count'] = sign
+    if order.payment_method in PAYMENT_METHODS:
+        deltas[f'{order.payment_method}_count'] = sign
+    if status != 'cancelled':
+        deltas.update(_revenue_deltas(order, sign))
+    return deltas
+
+
+def record_order_created(order):
+    """Count a new (flushed) order in its day; returns the deltas applied."""
+    return _apply_deltas(order.date, _order_deltas(order, 1))
+
+
+def record_order_deleted(order):
+    """Remove a deleted order from its day; returns the deltas applied."""
+    return _apply_deltas(order.date, _order_deltas(order, -1))
+
+
+def record_status_change(order, old_status, new_status):
+    """
+    Move an order between status counters; returns the deltas applied.
+
+    Cancelling takes its revenue out, un-cancelling puts it back.
+    """
+    old_status = old_status or 'pending'
+    deltas = {}
+    if old_status in ORDER_STATUSES:
+        deltas[f'{old_status}_count'] = -1
+    if new_status in ORDER_STATUSES:
+        deltas[f'{new_status}_count'] = deltas.get(f'{new_status}_count', 0) + 1
+    if new_status == 'cancelled' and old_status != 'cancelled':
+        deltas.update(_revenue_deltas(order, -1))
+    elif old_status == 'cancelled' and new_status != 'cancelled':
+        deltas.update(_revenue_deltas(order, 1))
+    return _apply_deltas(order.date, deltas)
+
+
+def _bucket_expression(granularity):
+    """SQL expression truncating Order.date to the start of its day or hour."""
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return db.func.date_trunc(granularity, Order.date)
+    # SQLite keeps DateTime values as text in SQLAlchemy's format
+    pattern = '%Y-%m-%d %H:00:00.000000' if granularity == 'hour' else '%Y-%m-%d 00:00:00.000000'
+    return db.func.strftime(pattern, Order.date)
+
+
+def _aggregate_columns():
+    """SELECT columns computing every counter, in COUNTER_COLUMNS order."""
+    status = db.func.coalesce(Order.status, 'pending')
+    # Cancelled orders add nothing to revenue
+    sale = db.case((status != 'cancelled', Order.total), else_=0)
+    columns = [db.func.count(Order.id), db.func.coalesce(db.func.sum(sale), 0)]
+    for value in ORDER_STATUSES:
+        columns.append(db.func.sum(db.case((status == value, 1), else_=0)))
+    for method in PAYMENT_METHODS:
+        is_method = Order.payment_method == method
+        columns.append(db.func.sum(db.case((is_method, 1), else_=0)))
+        columns.append(db.func.sum(db.case((is_method, sale), else_=0)))
+    return columns
+
+
+def recompute_rollups():
+    """
+    Rebuild all rollups from the orders table, one GROUP BY per granularity (into slot 0).
+
+    Returns:
+        int: Number of rollup rows written
+    """
+    table = SalesRollup.__table__
+    if db.session.get_bind().dialect.name == 'postgresql':
+        # Hold off concurrent increments until the rebuild commits
+        db.session.execute(db.text('LOCK TABLE sales_rollups IN EXCLUSIVE MODE'))
+    db.session.execute(table.delete())
+
+    written = 0
+    for granularity in GRANULARITIES:
+        bucket = _bucket_expression(granularity)
+        select = (
+            db.select(db.literal(granularity), bucket, db.literal(0), *_aggregate_columns())
+            .where(Order.date.isnot(None))
+            .group_by(bucket)
+        )
+        result = db.session.execute(
+            table.insert().from_select(['granularity', 'bucket', 'slot'] + COUNTER_COLUMNS, select)
+        )
+        written += max(result.rowcount, 0)
+    db.session.commit()
+    return written
+
+
+def average_basket(revenue, order_count, cancelled_count):
+    """Average revenue of the orders that were not cancelled."""
+    sold = order_count - cancelled_count
+    return revenue / sold if sold else 0
+
+
+def _trend(granularity, last, count, step):
+    """
+    Per-bucket figures of the count buckets ending with last, oldest first.
+
+    Returns:
+        list: {granularity: bucket start, 'order_count', 'revenue', 'average_basket'}
+    """
+    table = SalesRollup.__table__
+    first = last - step * (count - 1)
+    by_bucket = {
+        row.bucket: row for row in db.session.execute(
+            db.select(
+                table.c.bucket,
+                db.func.sum(table.c.order_count).label('order_count'),
+                db.func.sum(table.c.revenue).label('revenue'),
+                db.func.sum(table.c.cancelled_count).label('cancelled_count')
+            )
+            .where(table.c.granularity == granularity, table.c.bucket >= first)
+            .group_by(table.c.bucket)
+        )
+    }
+
+    trend = []
+    for offset in range(count - 1, -1, -1):
+        bucket = last - step * offset
+        row = by_bucket.get(bucket)
+        trend.append({
+            granularity: bucket,
+            'order_count': row.order_count if row else 0,
+            'revenue': row.revenue if row else 0,
+            'average_basket': average_basket(row.revenue, row.order_count, row.cancelled_count) if row else 0
+        })
+    return trend
+
+
+def get_sales_summary(days=14, hours=24, now=None):
+    """
+    Summarize sales from the rollups (three aggregate queries).
+
+    Args:
+        days: Number of recent days in the daily trend
+        hours: Number of recent hours in the hourly trend
+        now: Current UTC time (for tests)
+
+    Returns:
+        dict: All-time totals, today's figures, a per-day and a per-hour trend
+    """
+    now = now or datetime.utcnow()
+    table = SalesRollup.__table__
+
+    sums = db.session.execute(
+        db.select(*[db.func.coalesce(db.func.sum(table.c[column]), 0) for column in COUNTER_COLUMNS])
+        .where(table.c.granularity == 'day')
+    ).one()
+    totals = dict(zip(COUNTER_COLUMNS, sums))
+    totals['average_basket'] = average_basket(totals['revenue'], totals['order_count'], totals['cancelled_count'])
+
+    trend = _trend('day', bucket_start(now, 'day'), days, timedelta(days=1))
+    hourly = _trend('hour', bucket_start(now, 'hour'), hours, timedelta(hours=1))
+    return {
+        'totals': totals,
+        'today': trend[-1] if trend else None,
+        'trend': trend,
+        'peak_revenue': max((point['revenue'] for point in trend), default=0),
+        'hourly': hourly,
+        'peak_hour_revenue': max((point['revenue'] for point in hourly), default=0)
+    }
@@ -0,0 +1,200 @@
+"""
+Product Search Index Module
+In-memory inverted trigram index for bilingual (Hindi/English) product names.
+
+Product names look like "चावल (Rice) - 1kg", so a name is split into word
+tokens in both scripts ("चावल", "rice", "1kg"). Every distinct token is
+broken into padded trigrams; a query token is matched by intersecting the
+trigram posting lists and then checking the candidate tokens directly.
+Lookups never touch the database.
+"""
+
+import heapq
+import unicodedata
+
+
+# Trigram padding marks the start and end of a token. Query tokens shorter
+# than a trigram are matched by scanning the distinct tokens instead.
+PAD = ' '
+
+# Match quality scores for a single query token (higher is better)
+EXACT_MATCH = 3
+PREFIX_MATCH = 2
+SUBSTRING_MATCH = 1
+
+
+def normalize(text):
+    """Normalize text for matching: NFC compose and case-fold."""
+    return unicodedata.normalize('NFC', text or '').casefold()
+
+
+def tokenize(text):
+    """
+    Split text into search tokens.
+
+    Letters, combining marks and digits are kept together, so Devanagari
+    vowel signs (matras) and the virama stay inside their word.
+
+    Args:
+        text: Product name or search query
+
+    Returns:
+        list: Normalized tokens in order of appearance
+    """
+    tokens = []
+    current = []
+    for char in normalize(text):
+        if unicodedata.category(char)[0] in 'LMN':
+            current.append(char)
+        elif current:
+            tokens.append(''.join(current))
+            current = []
+    if current:
+        tokens.append(''.join(current))
+    return tokens
+
+
+def trigrams(token, full=True):
+    """
+    Get the padded trigrams of a token.
+
+    Args:
+        token: A normalized token
+        full: Pad both ends (indexing); a query token is padded only at
+              the front so it can still match longer tokens
+
+    Returns:
+        set: Trigram strings
+    """
+    padded = PAD * 2 + token + (PAD if full else '')
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class ProductSearchIndex:
+    """
+    Inverted trigram index over product names.
+
+    Built once from a list of products and read-only afterwards, so any
+    number of threads can search it without locking. A catalog snapshot
+    whose names have not changed reuses the previous snapshot's index.
+    """
+
+    def __init__(self, products=()):
+        """
+        Build the index.
+
+        Args:
+            products: Iterable of (product_id, name) pairs
+        """
+        self._sort_keys = {}        # product_id -> tie-break key for ranking
+        self._token_docs = {}       # token -> set of product_ids
+        self._gram_tokens = {}      # trigram -> set of tokens
+        for product_id, name in products:
+            self._add(product_id, name)
+
+    def __len__(self):
+        return len(self._sort_keys)
+
+    def _add(self, product_id, name):
+        """Index one product (while building)."""
+        normalized = normalize(name)
+        self._sort_keys[product_id] = (len(normalized), normalized, product_id)
+        for token in set(tokenize(name)):
+            docs = self._token_docs.get(token)
+            if docs is None:
+                docs = self._token_docs[token] = set()
+                for gram in trigrams(token):
+                    self._gram_tokens.setdefault(gram, set()).add(token)
+            docs.add(product_id)
+
+    def _match_tokens(self, query_token):
+        """Find indexed tokens containing query_token, with match scores."""
+        if len(query_token) < 3:
+            # Too short for an inner trigram ("al" in "dal"): scan the
+            # distinct tokens, which are far fewer than the products
+            candidates = [token for token in self._token_docs if query_token in token]
+        else:
+            # Inner trigrams alone allow substring matches ("ice" in "rice")
+            candidates = None
+            for gram in trigrams(query_token, full=False):
+                if PAD in gram:
+                    continue
+                tokens = self._gram_tokens.get(gram)
+                if not tokens:
+                    return {}
+                candidates = set(tokens) if candidates is None else candidates & tokens
+                if not candidates:
+                    return {}
+
+        matches = {}
+        for token in candidates:
+            if token == query_token:
+                matches[token] = EXACT_MATCH
+            elif token.startswith(query_token):
+                matches[token] = PREFIX_MATCH
+            elif query_token in token:
+                matches[token] = SUBSTRING_MATCH
+        return matches
+
+    def _match_docs(self, query_token):
+        """Group the products matching query_token by their best match score."""
+        levels = {}
+        seen = set()
+        matches = self._match_tokens(query_token)
+        for score in (EXACT_MATCH, PREFIX_MATCH, SUBSTRING_MATCH):
+            docs = set()
+            for token, token_score in matches.items():
+                if token_score == score:
+                    docs |= self._token_docs[token]
+            docs -= seen
+            if docs:
+                levels[score] = docs
+                seen |= docs
+        return levels
+
+    def search(self, query, limit=None):
+        """
+        Search the index.
+
+        Every query token must match some token of a product name (exactly,
+        as a prefix or as a substring). Results are ranked by match quality,
+        then by shorter name, then alphabetically.
+
+        Args:
+            query: Search text in Hindi and/or English
+            limit: Maximum number of results (None for all)
+
+        Returns:
+            list: Matching product IDs, best first
+        """
+        query_tokens = list(dict.fromkeys(tokenize(query)))
+        if not query_tokens:
+            return []
+
+        # score -> product_ids, combined with set operations per level
+        scores = None
+        for query_token in query_tokens:
+            levels = self._match_docs(query_token)
+            if scores is None:
+                scores = levels
+            else:
+                combined = {}
+                for total, docs in scores.items():
+                    for score, token_docs in levels.items():
+                        both = docs & token_docs
+                        if both:
+                            combined.setdefault(total + score, set()).update(both)
+                scores = combined
+            if not scores:
+                return []
+
+        sort_key = self._sort_keys.__getitem__
+        ranked = []
+        for total in sorted(scores, reverse=True):
+            if limit is None:
+                ranked.extend(sorted(scores[total], key=sort_key))
+                continue
+            ranked.extend(heapq.nsmallest(limit - len(ranked), scores[total], key=sort_key))
+            if len(ranked) >= limit:
+                break
+        return ranked
@@ -0,0 +1,132 @@
+"""
+Settings Registry Module
+Typed shop settings, loaded once per worker.
+
+Every known setting is declared in SETTINGS with its type and default.
+A worker keeps one immutable snapshot of all settings tagged with the
+'settings' cache generation, which update_setting() bumps in the same
+transaction. Readers just take the current snapshot reference, so they
+never lock and never query the database while the generation is unchanged.
+"""
+
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from types import MappingProxyType
+
+from flask import current_app
+
+from metrics import CACHE_REQUESTS
+from models import get_all_settings, get_generation
+
+
+def parse_time(value):
+    """Validate a 'HH:MM' time and return it in canonical form."""
+    return datetime.strptime(value.strip(), '%H:%M').strftime('%H:%M')
+
+
+def parse_bool(value):
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+SettingDefinition = namedtuple('SettingDefinition', ['key', 'default', 'parse'])
+
+SETTINGS = {
+    definition.key: definition for definition in (
+        SettingDefinition('shop_open_time', '08:00', parse_time),
+        SettingDefinition('shop_close_time', '21:00', parse_time),
+        SettingDefinition('shop_phone', '9999999999', str),
+    )
+}
+
+
+def coerce_setting(key, value):
+    """
+    Convert a stored (text) value to its declared type.
+
+    Unknown keys are returned unchanged.
+
+    Raises:
+        ValueError: If the value is not valid for the setting's type
+    """
+    definition = SETTINGS.get(key)
+    if definition is None:
+        return value
+    try:
+        return definition.parse(value)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid value for setting {key}: {value!r}") from e
+
+
+class SettingsSnapshot:
+    """Immutable view of all settings at one generation."""
+
+    __slots__ = ('generation', 'values')
+
+    def __init__(self, generation, stored):
+        values = {key: definition.default for key, definition in SETTINGS.items()}
+        for key, value in stored.items():
+            try:
+                values[key] = coerce_setting(key, value)
+            except ValueError:
+                print(f"Ignoring invalid stored setting {key}={value!r}")
+        self.generation = generation
+        self.values = MappingProxyType(values)
+
+    def __getitem__(self, key):
+        return self.values[key]
+
+    def __contains__(self, key):
+        return key in self.values
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+
+_snapshot = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def get_settings(max_age=None):
+    """
+    Get the current settings snapshot.
+
+    Args:
+        max_age: Seconds a checked snapshot may be reused without reading the
+                 generation counter again. Defaults to the
+                 SETTINGS_CHECK_INTERVAL config value; pass 0 on admin pages.
+
+    Returns:
+        SettingsSnapshot: Shared, read-only settings
+    """
+    global _snapshot, _checked_at
+
+    if max_age is None:
+        max_age = current_app.config.get('SETTINGS_CHECK_INTERVAL', 1.0)
+
+    snapshot = _snapshot
+    now = time.monotonic()
+    if snapshot is not None and now - _checked_at < max_age:
+        CACHE_REQUESTS.inc(cache='settings', result='hit')
+        return snapshot
+
+    generation = get_generation('settings')
+    if snapshot is None or snapshot.generation != generation:
+        with _lock:
+            snapshot = _snapshot
+            if snapshot is None or snapshot.generation != generation:
+                snapshot = SettingsSnapshot(generation, get_all_settings())
+                _snapshot = snapshot
+        CACHE_REQUESTS.inc(cache='settings', result='miss')
+    else:
+        CACHE_REQUESTS.inc(cache='settings', result='hit')
+    _checked_at = now
+    return snapshot
+
+
+def invalidate_settings():
+    """Force the next get_settings() call to re-check the generation."""
+    global _checked_at
+    _checked_at = 0.0
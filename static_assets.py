@@ -0,0 +1,250 @@
+"""
+Static Assets Module
+Fingerprinted static URLs with far-future caching.
+
+build.py writes an asset manifest: every file under static/ is hashed, and
+compressible ones (icons, CSS, JS, SVG) also get .gz and, when the brotli
+package is installed, .br copies in ASSET_BUILD_DIR. Templates call
+asset_url('static', filename=...) instead of url_for(); it returns
+/assets/<name>.<hash>.<ext>, which is served with
+"Cache-Control: public, max-age=31536000, immutable" because the URL
+changes whenever the content does.
+
+Files added after the build (product uploads) are fingerprinted on first
+use and remembered per process, keyed on their size and mtime.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import threading
+
+from flask import abort, request, send_file, url_for
+from werkzeug.utils import safe_join
+
+try:
+    import brotli
+    BROTLI_ENABLED = True
+except ImportError:
+    BROTLI_ENABLED = False
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_FOLDER = os.path.join(BASE_DIR, 'static')
+ASSET_BUILD_DIR = os.path.join(BASE_DIR, '.assets')
+MANIFEST_NAME = 'manifest.json'
+
+ONE_YEAR = 365 * 24 * 60 * 60
+HASH_LENGTH = 12
+
+# Already-compressed formats (images, fonts) gain nothing from gzip/brotli
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.svg', '.ico', '.json', '.txt', '.html', '.xml', '.map'}
+MIN_COMPRESS_SIZE = 256
+
+# (file extension, Content-Encoding), most preferred first
+ENCODINGS = (('.br', 'br'), ('.gz', 'gzip'))
+
+_FINGERPRINTED = re.compile(r'^(?P<stem>.+)\.(?P<hash>[0-9a-f]{%d})(?P<ext>\.[^./]+)?$' % HASH_LENGTH)
+
+
+def file_hash(path):
+    """Short content hash of a file."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def fingerprinted_name(filename, digest):
+    """'images/logo.png' -> 'images/logo.<hash>.png'"""
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}.{digest}{ext}"
+
+
+# ==================== Build ====================
+
+def _compress(path, build_dir, filename):
+    """Write .gz (and .br) copies of a static file; returns the encodings written."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    target = os.path.join(build_dir, filename)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+
+    written = []
+    variants = [('.gz', 'gzip', lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+    if BROTLI_ENABLED:
+        variants.insert(0, ('.br', 'br', lambda d: brotli.compress(d, quality=11)))
+    for suffix, encoding, compress in variants:
+        compressed = compress(data)
+        if len(compressed) >= len(data):
+            continue
+        with open(target + suffix, 'wb') as f:
+            f.write(compressed)
+        written.append(encoding)
+    return written
+
+
+def build_asset_manifest(static_folder=STATIC_FOLDER, build_dir=ASSET_BUILD_DIR):
+    """
+    Fingerprint every static file and precompress the compressible ones.
+
+    Args:
+        static_folder: Directory served as /static
+        build_dir: Where the manifest and compressed copies are written
+
+    Returns:
+        dict: The manifest (relative filename -> entry)
+    """
+    files = {}
+    for root, dirs, names in os.walk(static_folder):
+        dirs[:] = [d for d in dirs if not d.startswith('.')]
+        for name in names:
+            if name.startswith('.') or name.endswith('.tmp'):
+                continue
+            path = os.path.join(root, name)
+            filename = os.path.relpath(path, static_folder).replace(os.sep, '/')
+            stat = os.stat(path)
+            digest = file_hash(path)
+            entry = {
+                'hash': digest,
+                'size': stat.st_size,
+                'mtime': stat.st_mtime_ns,
+                'encodings': []
+            }
+            ext = os.path.splitext(name)[1].lower()
+            if ext in COMPRESSIBLE_EXTENSIONS and stat.st_size >= MIN_COMPRESS_SIZE:
+                entry['encodings'] = _compress(path, build_dir, filename)
+            files[filename] = entry
+
+    os.makedirs(build_dir, exist_ok=True)
+    tmp_path = os.path.join(build_dir, MANIFEST_NAME + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(files, f, sort_keys=True)
+    os.replace(tmp_path, os.path.join(build_dir, MANIFEST_NAME))
+    _reset()
+    return files
+
+
+# ==================== Lookup ====================
+
+_manifest = None
+_runtime = {}  # filename -> (size, mtime_ns, hash) for files not in the manifest
+_lock = threading.Lock()
+
+
+def _reset():
+    global _manifest
+    _manifest = None
+    _runtime.clear()
+
+
+def get_asset_manifest():
+    """Get the build manifest ({} if build.py has not run)."""
+    global _manifest
+    if _manifest is None:
+        try:
+            with open(os.path.join(ASSET_BUILD_DIR, MANIFEST_NAME), encoding='utf-8') as f:
+                _manifest = json.load(f)
+        except (OSError, ValueError):
+            _manifest = {}
+    return _manifest
+
+
+def current_hash(filename):
+    """
+    Get the fingerprint of a static file as it is on disk now.
+
+    Returns:
+        str or None: The hash, or None if the file does not exist
+    """
+    path = safe_join(STATIC_FOLDER, filename)
+    if path is None:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    entry = get_asset_manifest().get(filename)
+    if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime_ns:
+        return entry['hash']
+
+    cached = _runtime.get(filename)
+    if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+        return cached[2]
+    digest = file_hash(path)
+    with _lock:
+        _runtime[filename] = (stat.st_size, stat.st_mtime_ns, digest)
+    return digest
+
+
+def asset_url(endpoint, **values):
+    """
+    url_for() replacement that fingerprints static files.
+
+    Usage in templates:
+        {{ asset_url('static', filename='favicon.ico') }}
+
+    Non-static endpoints and missing files fall back to url_for().
+    """
+    if endpoint == 'static' and 'filename' in values:
+        digest = current_hash(values['filename'])
+        if digest:
+            filename = values.pop('filename')
+            return url_for('asset', filename=fingerprinted_name(filename, digest), **values)
+    return url_for(endpoint, **values)
+
+
+# ==================== Serving ====================
+
+def _precompressed(filename, digest):
+    """Pick a precompressed copy the client accepts, as (path, encoding)."""
+    entry = get_asset_manifest().get(filename)
+    if not entry or entry['hash'] != digest:
+        return None, None
+    for suffix, encoding in ENCODINGS:
+        if encoding in entry['encodings'] and request.accept_encodings[encoding]:
+            path = os.path.join(ASSET_BUILD_DIR, filename + suffix)
+            if os.path.exists(path):
+                return path, encoding
+    return None, None
+
+
+def serve_asset(fingerprinted):
+    """
+    Serve /assets/<name>.<hash>.<ext>.
+
+    A current fingerprint is cached for a year as immutable; an outdated
+    one (an old page still linking the previous version) gets the current
+    file with no-cache.
+    """
+    match = _FINGERPRINTED.match(fingerprinted)
+    if not match:
+        abort(404)
+    filename = match['stem'] + (match['ext'] or '')
+    digest = current_hash(filename)
+    if digest is None:
+        abort(404)
+
+    current = digest == match['hash']
+    max_age = ONE_YEAR if current else None  # None makes send_file add no-cache
+
+    path, encoding = _precompressed(filename, digest)
+    if path:
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        response = send_file(path, mimetype=mimetype, conditional=True,
+                             etag=f"{digest}-{encoding}", max_age=max_age)
+        response.headers['Content-Encoding'] = encoding
+    else:
+        response = send_file(safe_join(STATIC_FOLDER, filename), conditional=True,
+                             etag=digest, max_age=max_age)
+    response.vary.add('Accept-Encoding')
+
+    if current:
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+    return response
@@ -0,0 +1,95 @@
+"""
+Shared fixtures: the app against a throwaway SQLite database.
+
+config.py reads the environment when it is imported, so the test settings
+are put in place before `app` is.
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_db_dir = tempfile.mkdtemp(prefix='kirana-tests-')
+os.environ.update({
+    'SECRET_KEY': 'test-secret',
+    'DATABASE_URL': f"sqlite:///{os.path.join(_db_dir, 'test.db')}",
+    'PAGE_CACHE_BACKEND': 'none',
+    'CATALOG_CHECK_INTERVAL': '0',
+    'SETTINGS_CHECK_INTERVAL': '0',
+    'IMAGE_UPLOAD_WORKERS': '0',
+    'ORDER_EVENTS_MAX_STREAMS': '0',
+    'METRICS_DIR': '',
+})
+
+
+@pytest.fixture(scope='session')
+def app():
+    """The app, with the database migrated to the latest revision."""
+    from flask_migrate import upgrade
+    from app import app as flask_app
+    from models import _create_default_settings, _create_default_generations
+
+    flask_app.config['TESTING'] = True
+    with flask_app.app_context():
+        upgrade(directory=os.path.join(ROOT, 'migrations'))
+        _create_default_settings()
+        _create_default_generations()
+    return flask_app
+
+
+@pytest.fixture
+def db(app):
+    """The database inside an app context, emptied again after the test."""
+    from models import db as database, CacheGeneration, _create_default_settings
+    from catalog_cache import invalidate_catalog
+    from page_cache import invalidate_page_cache
+    from settings_registry import invalidate_settings
+
+    with app.app_context():
+        yield database
+        database.session.rollback()
+        for table in reversed(database.metadata.sorted_tables):
+            if table.name != CacheGeneration.__tablename__:
+                database.session.execute(table.delete())
+        # Bump rather than reset the counters: they only ever go up, so
+        # nothing cached during this test can look current to the next one
+        database.session.execute(
+            CacheGeneration.__table__.update().values(value=CacheGeneration.value + 1)
+        )
+        database.session.commit()
+        _create_default_settings()
+        invalidate_catalog()
+        invalidate_settings()
+        invalidate_page_cache()
+
+
+@pytest.fixture
+def client(app, db):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin_client(client):
+    """A test client logged in as an admin."""
+    with client.session_transaction() as session:
+        session['admin_id'] = 1
+        session['admin_username'] = 'admin'
+    return client
+
+
+@pytest.fixture
+def make_order(db):
+    """Create orders straight through models.create_order (returns the id)."""
+    from models import create_order
+
+    def make(mobile='9876543210', items=None, **fields):
+        items = items or [{'id': 1, 'name': 'चावल (Rice)', 'price': 50.0, 'qty': 1}]
+        total = sum(item['price'] * item['qty'] for item in items)
+        return create_order(fields.pop('customer_name', 'Test Customer'), mobile,
+                            fields.pop('address', '12 Market Road'), items, total, **fields)
+    return make
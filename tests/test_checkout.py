@@ -0,0 +1,219 @@
+import pytest
+
+
+@pytest.mark.parametrize('url', ['/api/cart/quote', '/api/place-order'])
+@pytest.mark.parametrize('body', ['[1, 2]', '"text"', 'null', '{not json', ''])
+def test_body_must_be_a_json_object(client, url, body):
+    response = client.post(url, data=body, content_type='application/json')
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+
+
+def test_place_order_rejects_non_text_fields(client):
+    response = client.post('/api/place-order', json={
+        'customer_name': ['Ram'], 'mobile': 9876543210, 'address': 'x', 'items': [{'id': 1, 'qty': 1}]
+    })
+    assert response.status_code == 400
+
+
+@pytest.fixture
+def rice(db):
+    from models import add_product
+    return add_product('चावल (Rice) - 1kg', 60.0, stock=3)
+
+
+def order_body(product_id, qty=1, total=None, **fields):
+    body = {
+        'customer_name': 'Ram', 'mobile': '9876543210', 'address': '12 Market Road',
+        'items': [{'id': product_id, 'qty': qty}], 'payment_method': 'cod', **fields
+    }
+    if total is not None:
+        body['total'] = total
+    return body
+
+
+def stock_of(product_id):
+    from models import db, Product
+    db.session.expire_all()
+    product = db.session.get(Product, product_id)
+    return product.stock, product.is_available
+
+
+# ==================== Oversell ====================
+
+def test_order_larger_than_stock_is_refused(client, rice):
+    from models import Order
+
+    response = client.post('/api/place-order', json=order_body(rice, qty=4))
+    assert response.status_code == 409
+    assert response.get_json()['quote']['unavailable'] == [{'id': rice, 'reason': 'out_of_stock', 'stock': 3}]
+    assert Order.query.count() == 0
+    assert stock_of(rice) == (3, True)
+
+
+def test_last_units_sell_out_once(client, rice):
+    assert client.post('/api/place-order', json=order_body(rice, qty=2)).status_code == 200
+    assert client.post('/api/place-order', json=order_body(rice, qty=1)).status_code == 200
+    assert stock_of(rice) == (0, False)
+
+    response = client.post('/api/place-order', json=order_body(rice, qty=1))
+    assert response.status_code == 409
+    assert stock_of(rice) == (0, False)
+
+
+def test_reserve_refuses_stock_taken_after_pricing(db, rice):
+    from models import OutOfStockError, Order, create_order, set_product_stock
+
+    # The cart was priced while 3 were left; another order took 2 since
+    set_product_stock(rice, 1)
+    items = [{'id': rice, 'name': 'चावल (Rice) - 1kg', 'price': 60.0, 'qty': 2}]
+    with pytest.raises(OutOfStockError):
+        create_order('Ram', '9876543210', 'x', items, 120.0, reserve=[(rice, 2)])
+    db.session.rollback()
+    assert Order.query.count() == 0
+    assert stock_of(rice) == (1, True)
+
+
+def test_cancel_and_delete_give_stock_back(client, rice):
+    from models import delete_order, update_order_status
+
+    first = client.post('/api/place-order', json=order_body(rice, qty=2)).get_json()['order_id']
+    second = client.post('/api/place-order', json=order_body(rice, qty=1)).get_json()['order_id']
+    assert stock_of(rice) == (0, False)
+
+    update_order_status(first, 'cancelled')
+    assert stock_of(rice) == (2, True)
+    delete_order(second)
+    assert stock_of(rice) == (3, True)
+    # Deleting a cancelled order must not give its stock back twice
+    delete_order(first)
+    assert stock_of(rice) == (3, True)
+
+
+def test_stock_counted_after_the_order_is_not_given_back(client, db):
+    from models import add_product, set_product_stock, update_order_status, delete_order
+
+    dal = add_product('Toor Dal', 120.0)  # Stock not tracked yet
+    first = client.post('/api/place-order', json=order_body(dal, qty=2)).get_json()['order_id']
+    second = client.post('/api/place-order', json=order_body(dal, qty=1)).get_json()['order_id']
+    set_product_stock(dal, 10)
+
+    update_order_status(first, 'cancelled')
+    assert stock_of(dal) == (10, True)
+    # Reviving takes nothing either: nothing was given back
+    update_order_status(first, 'confirmed')
+    assert stock_of(dal) == (10, True)
+    delete_order(second)
+    assert stock_of(dal) == (10, True)
+
+
+def test_reviving_takes_reserved_stock_again(client, rice):
+    from models import OutOfStockError, update_order_status, set_product_stock
+
+    order_id = client.post('/api/place-order', json=order_body(rice, qty=2)).get_json()['order_id']
+    update_order_status(order_id, 'cancelled')
+    assert stock_of(rice) == (3, True)
+    update_order_status(order_id, 'confirmed')
+    assert stock_of(rice) == (1, True)
+
+    update_order_status(order_id, 'cancelled')
+    set_product_stock(rice, 1)
+    with pytest.raises(OutOfStockError):
+        update_order_status(order_id, 'confirmed')
+
+
+def test_cancel_does_not_re_enable_a_product_the_admin_hid(client, rice):
+    from models import set_product_stock, toggle_product_availability, update_order_status
+
+    order_id = client.post('/api/place-order', json=order_body(rice, qty=1)).get_json()['order_id']
+    toggle_product_availability(rice)  # Hidden by the admin, 2 still in stock
+    set_product_stock(rice, 0)
+    update_order_status(order_id, 'cancelled')
+    assert stock_of(rice) == (1, False)
+    set_product_stock(rice, 5)
+    assert stock_of(rice) == (5, False)
+
+
+def test_cancel_re_enables_a_product_that_sold_out(client, rice):
+    from models import update_order_status
+
+    order_id = client.post('/api/place-order', json=order_body(rice, qty=3)).get_json()['order_id']
+    assert stock_of(rice) == (0, False)
+    update_order_status(order_id, 'cancelled')
+    assert stock_of(rice) == (3, True)
+
+
+# ==================== Idempotent Replay ====================
+
+def test_replayed_request_returns_the_first_order(client, rice):
+    from models import Order
+
+    headers = {'Idempotency-Key': 'checkout-1'}
+    first = client.post('/api/place-order', json=order_body(rice), headers=headers)
+    second = client.post('/api/place-order', json=order_body(rice), headers=headers)
+
+    assert first.status_code == second.status_code == 200
+    assert second.get_json()['order_id'] == first.get_json()['order_id']
+    assert second.headers['Idempotent-Replayed'] == 'true'
+    assert 'Idempotent-Replayed' not in first.headers
+    assert Order.query.count() == 1
+    assert stock_of(rice) == (2, True)
+
+
+def test_key_reused_for_another_cart_is_refused(client, rice):
+    headers = {'Idempotency-Key': 'checkout-2'}
+    assert client.post('/api/place-order', json=order_body(rice), headers=headers).status_code == 200
+    response = client.post('/api/place-order', json=order_body(rice, qty=2), headers=headers)
+    assert response.status_code == 422
+
+
+def test_refused_order_does_not_use_up_its_key(client, rice):
+    headers = {'Idempotency-Key': 'checkout-3'}
+    assert client.post('/api/place-order', json=order_body(rice, total=50), headers=headers).status_code == 409
+    response = client.post('/api/place-order', json=order_body(rice, total=60), headers=headers)
+    assert response.status_code == 200
+    assert 'Idempotent-Replayed' not in response.headers
+
+
+# ==================== Price Tampering ====================
+
+def test_quote_uses_catalog_prices(client, rice):
+    response = client.post('/api/cart/quote', json={
+        'items': [{'id': rice, 'qty': 2, 'price': 1, 'name': 'Free rice'}]
+    })
+    quote = response.get_json()
+    assert quote['items'] == [{'id': rice, 'name': 'चावल (Rice) - 1kg', 'price': 60.0, 'qty': 2, 'subtotal': 120.0}]
+    assert quote['total'] == 120.0
+
+
+def test_order_is_saved_at_catalog_prices(client, rice):
+    from models import db, Order
+
+    body = order_body(rice, qty=2)
+    body['items'][0].update(price=1, name='Free rice')
+    response = client.post('/api/place-order', json=body)
+    assert response.status_code == 200
+    assert response.get_json()['total'] == 120.0
+
+    order = db.session.get(Order, response.get_json()['order_id'])
+    assert order.total == 120.0
+    assert [(item.name, item.unit_price, item.qty) for item in order.order_items] == [
+        ('चावल (Rice) - 1kg', 60.0, 2)
+    ]
+
+
+def test_tampered_total_is_refused(client, rice):
+    from models import Order
+
+    response = client.post('/api/place-order', json=order_body(rice, qty=2, total=2))
+    assert response.status_code == 409
+    assert response.get_json()['quote']['total'] == 120.0
+    assert Order.query.count() == 0
+    assert stock_of(rice) == (3, True)
+
+
+@pytest.mark.parametrize('qty', [0, -1, 1.5, 'two', True, None])
+def test_invalid_quantities_are_refused(client, rice, qty):
+    response = client.post('/api/place-order', json=order_body(rice, qty=qty))
+    assert response.status_code == 400
+    assert stock_of(rice) == (3, True)
@@ -0,0 +1,26 @@
+from models import add_contact_message, get_contact_messages_by_email
+
+
+def test_lookup_ignores_case_and_spaces(db):
+    sent = add_contact_message('Priya', 'Priya.Sharma@Example.com ', 'Is the shop open on Sunday?')
+    add_contact_message('Amit', 'amit@example.com', 'Need a bill')
+
+    messages, next_before_id = get_contact_messages_by_email('  PRIYA.SHARMA@example.COM')
+    assert [m.id for m in messages] == [sent]
+    assert next_before_id is None
+
+
+def test_lookup_pages_newest_first(db):
+    ids = [add_contact_message('Priya', 'priya@example.com', f'Message {n}') for n in range(5)]
+
+    first, before_id = get_contact_messages_by_email('priya@example.com', limit=3)
+    rest, last = get_contact_messages_by_email('priya@example.com', limit=3, before_id=before_id)
+    assert [m.id for m in first] == ids[:1:-1]
+    assert [m.id for m in rest] == ids[1::-1]
+    assert last is None
+
+
+def test_check_reply_page(client):
+    add_contact_message('Priya', 'Priya@Example.com', 'Is the shop open on Sunday?')
+    response = client.post('/check-reply', data={'email': 'priya@example.com'})
+    assert 'Is the shop open on Sunday?' in response.get_data(as_text=True)
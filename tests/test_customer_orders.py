@@ -0,0 +1,61 @@
+from customer_orders import _mask, get_customer_orders
+
+
+MOBILE = '9876543210'
+
+
+def test_mask_keeps_the_tail():
+    assert _mask('9876543210', 4) == '••••••3210'
+    assert _mask('12', 4) == '12'
+    assert _mask(None, 4) == ''
+
+
+def test_orders_are_masked(db, make_order):
+    make_order(customer_name='Ramesh Kumar Sharma', address='Flat 4, Gandhi Nagar')
+    order = get_customer_orders(MOBILE)['orders'][0]
+    assert order['customer_name'] == 'Ramesh'
+    assert order['mobile'] == '••••••3210'
+    assert order['address'] == '••••••' + ' Nagar'
+    assert order['items'][0]['subtotal'] == 50.0
+
+
+def test_unchanged_page_is_not_modified(client, make_order):
+    make_order()
+    first = client.get(f'/api/my-orders/{MOBILE}')
+    assert first.status_code == 200
+    assert first.headers['Cache-Control'] == 'private, no-cache'
+    etag = first.headers['ETag']
+
+    again = client.get(f'/api/my-orders/{MOBILE}', headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.get_data() == b''
+
+
+def test_new_order_changes_the_etag(client, make_order):
+    make_order()
+    etag = client.get(f'/api/my-orders/{MOBILE}').headers['ETag']
+
+    make_order()
+    response = client.get(f'/api/my-orders/{MOBILE}', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert len(response.get_json()['orders']) == 2
+
+
+def test_status_change_is_seen(client, make_order):
+    from models import update_order_status
+
+    order_id = make_order()
+    etag = client.get(f'/api/my-orders/{MOBILE}').headers['ETag']
+    update_order_status(order_id, 'delivered')
+    response = client.get(f'/api/my-orders/{MOBILE}', headers={'If-None-Match': etag})
+    assert response.get_json()['orders'][0]['status'] == 'delivered'
+
+
+def test_other_customers_orders_are_not_shown(client, make_order):
+    make_order(mobile='9123456789')
+    assert client.get(f'/api/my-orders/{MOBILE}').get_json()['orders'] == []
+
+
+def test_short_mobile_is_refused(client):
+    assert client.get('/api/my-orders/98765').status_code == 400
@@ -0,0 +1,117 @@
+import json
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+import datagen
+import migrate_data
+
+
+NOW = datetime(2026, 10, 1, 12, 0)
+
+
+def quiet(line):
+    pass
+
+
+# ==================== datagen ====================
+
+def test_rows_depend_only_on_the_seed():
+    products = [(1, 'Rice', 50.0), (2, 'Dal', 120.0)]
+    mobiles = datagen.customer_mobiles(5, seed=7)
+    first = list(datagen.generate_orders(20, products, mobiles, 100, seed=7, now=NOW))
+    again = list(datagen.generate_orders(20, products, mobiles, 100, seed=7, now=NOW))
+    assert first == again
+    assert list(datagen.generate_products(10, seed=7, now=NOW)) == list(datagen.generate_products(10, seed=7, now=NOW))
+    assert datagen.customer_mobiles(5, seed=8) != mobiles
+
+
+def test_order_totals_match_their_items():
+    products = [(1, 'Rice', 50.0), (2, 'Dal', 120.0), (3, 'Salt', 20.0)]
+    mobiles = datagen.customer_mobiles(5)
+    for order, items in datagen.generate_orders(50, products, mobiles, 1, now=NOW):
+        order_id, name, mobile, address, cart, total = order[:6]
+        assert (name, address) == datagen.customer_profile(mobile)
+        assert mobile in mobiles
+        assert [item[0] for item in items] == [order_id] * len(items)
+        assert total == pytest.approx(sum(unit_price * qty for _, _, _, unit_price, qty in items))
+        assert len(json.loads(cart)) == len(items)
+
+
+def test_json_only_orders_have_no_item_rows():
+    orders = datagen.generate_orders(10, [(1, 'Rice', 50.0)], ['9876543210'], 1, items='json', now=NOW)
+    assert all(items == [] for _, items in orders)
+
+
+def test_generate_loads_every_table(db):
+    from models import ContactMessage, CustomerCare, Order, OrderItem, Product, normalize_email
+    from sales_rollups import get_sales_summary
+
+    counts = datagen.generate(products=30, orders=200, customers=20, issues=10, messages=10, log=quiet)
+    assert {key: counts[key] for key in ('products', 'orders', 'customer_care', 'contact_messages')} == {
+        'products': 30, 'orders': 200, 'customer_care': 10, 'contact_messages': 10
+    }
+    assert Product.query.count() == 30 and Order.query.count() == 200
+    assert OrderItem.query.count() == counts['order_items']
+    assert CustomerCare.query.count() == 10
+    assert all(m.email_normalized == normalize_email(m.email) for m in ContactMessage.query)
+    # Rollups were rebuilt from the new orders
+    revenue = db.session.query(db.func.sum(Order.total)).filter(Order.status != 'cancelled').scalar()
+    assert get_sales_summary(days=400)['totals']['revenue'] == pytest.approx(revenue)
+
+    # A second run adds after the existing ids
+    datagen.generate(orders=5, customers=20, seed=1, log=quiet)
+    assert Order.query.count() == 205
+
+
+def test_orders_need_products(db):
+    with pytest.raises(ValueError):
+        datagen.generate(orders=5, log=quiet)
+
+
+# ==================== migrate_data ====================
+
+def test_source_label_tells_same_named_files_apart(tmp_path):
+    first = migrate_data.source_label(str(tmp_path / 'a' / 'kirana.db'))
+    second = migrate_data.source_label(str(tmp_path / 'b' / 'kirana.db'))
+    assert first.startswith('kirana.db@') and second.startswith('kirana.db@')
+    assert first != second
+    assert migrate_data.source_label(str(tmp_path / 'a' / '..' / 'a' / 'kirana.db')) == first
+
+
+@pytest.fixture
+def source_db(tmp_path):
+    """An old-style kirana.db: products without image or created_at columns."""
+    path = str(tmp_path / 'kirana.db')
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT, price REAL, is_available INTEGER)")
+    conn.executemany("INSERT INTO products VALUES (?, ?, ?, 1)", [(7, 'Rice', 50.0), (9, 'Dal', 120.0)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_missing_source_columns_get_defaults(source_db):
+    conn = sqlite3.connect(source_db)
+    try:
+        products = migrate_data.TABLES[0]
+        query = migrate_data._source_query(conn, products)
+        assert "'default.png' AS image" in query and 'NULL AS created_at' in query
+        assert conn.execute(query, (0, 10)).fetchall() == [(7, 'Rice', 50.0, 'default.png', 1, None),
+                                                           (9, 'Dal', 120.0, 'default.png', 1, None)]
+        assert migrate_data._source_query(conn, migrate_data.TABLES[3]) is None
+    finally:
+        conn.close()
+
+
+def test_source_products_map_by_name(db, source_db):
+    from models import add_product
+
+    rice = add_product('Rice', 55.0)
+    add_product('Rice', 60.0)
+    assert migrate_data.product_id_map(source_db) == {7: rice}
+
+
+def test_only_postgresql_is_a_target(db, source_db):
+    assert migrate_data.migrate_data(source_db) is False
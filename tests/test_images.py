@@ -0,0 +1,162 @@
+import io
+import os
+import time
+from datetime import timedelta
+
+import pytest
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+
+import image_derivatives
+import image_pipeline
+from image_derivatives import create_derivatives, get_manifest, product_image
+from image_storage import collect_garbage, release_image, save_upload
+
+
+@pytest.fixture
+def uploads(app, db, tmp_path, monkeypatch):
+    """An empty upload folder, with no manifest or uploader cached from before."""
+    monkeypatch.setitem(app.config, 'UPLOAD_FOLDER', str(tmp_path))
+    monkeypatch.setitem(app.config, 'IMAGE_UPLOAD_RETRY_DELAY', 0)
+    monkeypatch.setattr(image_derivatives, '_manifest', {})
+    monkeypatch.setattr(image_derivatives, '_manifest_mtime', None)
+    monkeypatch.setattr(image_derivatives, '_checked_at', 0.0)
+    monkeypatch.setattr(image_pipeline, '_uploader', None)
+    return tmp_path
+
+
+def png(width=600, height=300, color=(200, 40, 40)):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def upload(data, filename='photo.PNG'):
+    return save_upload(FileStorage(io.BytesIO(data), filename=filename))
+
+
+def age(path, hours=2):
+    old = time.time() - hours * 3600
+    os.utime(path, (old, old))
+
+
+# ==================== Storage ====================
+
+def test_same_content_is_stored_once(uploads):
+    first, is_new = upload(png())
+    second, again_new = upload(png(), filename='copy.png')
+    assert first == second
+    assert first.endswith('.png')
+    assert (is_new, again_new) == (True, False)
+    assert os.listdir(uploads) == [first]
+
+
+def test_release_keeps_images_still_in_use(uploads):
+    from models import add_product, delete_product
+
+    image, _ = upload(png())
+    product_id = add_product('Toor Dal', 120.0, image=image)
+    assert release_image(image) is False
+    assert (uploads / image).exists()
+
+    delete_product(product_id)
+    assert release_image(image) is True
+    assert not (uploads / image).exists()
+
+
+# ==================== Derivatives ====================
+
+def test_derivatives_are_resized_never_upscaled(uploads):
+    image, _ = upload(png(600, 300))
+    entry = create_derivatives(image)
+    widths = {size: variant['width'] for size, variant in entry['variants'].items()}
+    assert widths == {'thumb': 160, 'card': 400, 'detail': 600}
+    for variant in entry['variants'].values():
+        assert (uploads / variant['webp']).exists()
+        assert (uploads / variant['jpeg']).exists()
+    assert get_manifest(max_age=0)[image] == entry
+    # Same content again: nothing is regenerated
+    assert create_derivatives(image) == entry
+
+
+def test_product_image_uses_the_variants(app, uploads):
+    image, _ = upload(png())
+    with app.test_request_context():
+        plain = str(product_image(image, alt='Dal'))
+        create_derivatives(image)
+        picture = str(product_image(image, alt='Dal'))
+        remote = str(product_image('https://res.cloudinary.com/x/image/upload/v1/kirana/a.png'))
+    assert plain.startswith('<img') and image in plain
+    assert picture.startswith('<picture')
+    assert 'type="image/webp"' in picture and '-card.jpg' in picture and ' 160w' in picture
+    assert remote == '<img src="https://res.cloudinary.com/x/image/upload/v1/kirana/a.png" alt="" class="" loading="lazy">'
+
+
+def test_release_removes_variants_too(uploads):
+    image, _ = upload(png())
+    entry = create_derivatives(image)
+    assert release_image(image) is True
+    assert image not in get_manifest(max_age=0)
+    assert not (uploads / entry['variants']['card']['webp']).exists()
+
+
+# ==================== Garbage Collection ====================
+
+def test_garbage_collection(uploads):
+    from models import add_product
+
+    kept, _ = upload(png(color=(0, 128, 0)))
+    add_product('Toor Dal', 120.0, image=kept)
+    create_derivatives(kept)
+    orphan, _ = upload(png(color=(0, 0, 128)))
+    create_derivatives(orphan)
+    young, _ = upload(png(color=(128, 128, 0)))
+    stray = uploads / 'derived' / 'ffffffffffffffff-card.webp'
+    stray.write_bytes(b'old variant')
+    for path in uploads.rglob('*'):
+        if path.is_file() and path.name != young:
+            age(path)
+
+    dry = collect_garbage(dry_run=True, include_cloudinary=False)
+    assert dry['local'] == [orphan]
+    assert dry['derived'] == ['derived/ffffffffffffffff-card.webp']
+    assert (uploads / orphan).exists()
+
+    done = collect_garbage(dry_run=False, include_cloudinary=False)
+    assert done['local'] == [orphan]
+    assert len(done['derived']) == 1 + 6  # the stray file and the orphan's variants
+    assert not (uploads / orphan).exists() and not stray.exists()
+    assert (uploads / kept).exists() and (uploads / young).exists()
+    assert collect_garbage(dry_run=False, include_cloudinary=False, min_age=timedelta(0))['local'] == [young]
+
+
+# ==================== Upload Pipeline ====================
+
+def test_upload_job_retries_then_swaps_the_image(app, uploads):
+    from models import add_product, get_image_job_by_id, get_product_by_id
+
+    image_pipeline._uploader = image_pipeline.LocalUploader(str(uploads / 'cdn'), 'cdn/', fail_times=1)
+    staged, _ = upload(png())
+    product_id = add_product('Toor Dal', 120.0, image=staged)
+
+    job_id = image_pipeline.ingest_product_image(product_id, staged)
+    job = get_image_job_by_id(job_id)
+    assert (job.status, job.attempts, job.result_url) == ('done', 2, f'cdn/{staged}')
+    assert get_product_by_id(product_id).image == f'cdn/{staged}'
+    # The staged copy is released, and the uploaded one gets its variants
+    assert not (uploads / staged).exists()
+    assert f'cdn/{staged}' in get_manifest(max_age=0)
+
+
+def test_upload_job_gives_up(app, uploads):
+    from models import add_product, get_image_job_by_id, get_product_by_id
+
+    image_pipeline._uploader = image_pipeline.LocalUploader(str(uploads / 'cdn'), 'cdn/', fail_times=5)
+    staged, _ = upload(png())
+    product_id = add_product('Toor Dal', 120.0, image=staged)
+
+    job = get_image_job_by_id(image_pipeline.ingest_product_image(product_id, staged))
+    assert (job.status, job.attempts) == ('failed', 3)
+    assert 'Simulated upload failure' in job.last_error
+    assert get_product_by_id(product_id).image == staged
+    assert (uploads / staged).exists()
@@ -0,0 +1,6 @@
+def test_scrapes_are_not_counted(client):
+    client.get('/about')
+    client.get('/metrics')
+    body = client.get('/metrics').get_data(as_text=True)
+    assert 'endpoint="about"' in body
+    assert 'endpoint="metrics"' not in body
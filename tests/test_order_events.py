@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+import order_events
+
+
+def read(stream):
+    """Next SSE message as (event, data)."""
+    lines = dict(line.split(': ', 1) for line in next(stream).strip().split('\n') if ': ' in line)
+    return lines.get('event'), json.loads(lines['data']) if 'data' in lines else None
+
+
+@pytest.fixture
+def open_stream(db):
+    streams = []
+
+    def open_(max_streams=5, max_seconds=1):
+        stream = order_events._stream(max_streams, max_seconds)
+        streams.append(stream)
+        assert read(stream)[0] == 'ready'
+        return stream
+    yield open_
+    for stream in streams:
+        stream.close()
+    assert not order_events._subscriptions
+
+
+def test_every_stream_gets_the_event(open_stream, make_order):
+    first, second = open_stream(), open_stream()
+    order_id = make_order(customer_name='Ram')
+    for stream in (first, second):
+        kind, data = read(stream)
+        assert kind == 'order_created'
+        assert data['order']['id'] == order_id
+        assert data['order']['customer_name'] == 'Ram'
+        assert data['deltas']
+
+
+def test_status_change_carries_the_old_status(open_stream, make_order):
+    from models import update_order_status
+
+    order_id = make_order()
+    stream = open_stream()
+    update_order_status(order_id, 'cancelled')
+    kind, data = read(stream)
+    assert (kind, data['old_status'], data['order']['status']) == ('order_status', 'pending', 'cancelled')
+
+
+def test_rolled_back_changes_are_not_sent(db, open_stream):
+    from models import Order
+
+    stream = open_stream()
+    order = Order(customer_name='Ram', mobile='9876543210', address='x', items='[]', total=0)
+    db.session.add(order)
+    db.session.flush()
+    order_events.publish_order_event('order_created', order)
+    db.session.rollback()
+    assert next(stream) == ': keepalive\n\n'
+
+
+def test_streams_past_the_limit_are_turned_away(open_stream):
+    open_stream(max_streams=1)
+    busy = order_events._stream(1, 1)
+    assert next(busy).startswith('retry: 60000\nevent: busy')
+    with pytest.raises(StopIteration):
+        next(busy)
+
+
+def test_lagging_stream_is_told_to_resync(open_stream, make_order, monkeypatch):
+    monkeypatch.setattr(order_events, 'MAX_PENDING_EVENTS', 2)
+    stream = open_stream()
+    for _ in range(3):
+        make_order()
+    assert read(stream) == ('resync', {'type': 'resync'})
+    assert next(stream) == ': keepalive\n\n'
+
+
+def test_events_route(admin_client):
+    # The tests run with ORDER_EVENTS_MAX_STREAMS=0
+    response = admin_client.get('/admin/orders/events')
+    assert response.mimetype == 'text/event-stream'
+    assert 'event: busy' in response.get_data(as_text=True)
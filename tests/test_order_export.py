@@ -0,0 +1,71 @@
+import csv
+import io
+import json
+
+import pytest
+
+from order_export import _csv_safe, generate_export
+
+
+ITEMS = [
+    {'id': 1, 'name': 'चावल (Rice)', 'price': 50.0, 'qty': 2},
+    {'id': 2, 'name': 'Toor Dal', 'price': 120.0, 'qty': 1},
+]
+
+
+@pytest.mark.parametrize('value', ['=HYPERLINK("http://x")', '+91 98765', '-1', '@SUM(A1)', '\tx', '\rx'])
+def test_formula_prefixes_are_quoted(value):
+    assert _csv_safe(value) == "'" + value
+
+
+@pytest.mark.parametrize('value', ['Ram', '12 Market Road', '', 50.0, -3, None])
+def test_other_values_are_unchanged(value):
+    assert _csv_safe(value) == value
+
+
+def test_csv_neutralizes_customer_text(db, make_order):
+    make_order(customer_name='=cmd|"/c calc"!A1', address='@SUM(1+1)')
+    rows = list(csv.reader(io.StringIO(''.join(generate_export('csv')))))
+    assert rows[0][:3] == ['id', 'date', 'customer_name']
+    assert rows[1][2] == '\'=cmd|"/c calc"!A1'
+    assert rows[1][4] == "'@SUM(1+1)"
+
+
+def test_csv_with_items_has_one_row_per_item(db, make_order):
+    order_id = make_order(items=ITEMS)
+    rows = list(csv.DictReader(io.StringIO(''.join(generate_export('csv', with_items=True)))))
+    assert [(row['id'], row['item_name'], row['qty']) for row in rows] == [
+        (str(order_id), 'चावल (Rice)', '2'), (str(order_id), 'Toor Dal', '1')
+    ]
+
+
+def test_jsonl_groups_items_across_chunks(db, make_order):
+    first = make_order(items=ITEMS)
+    second = make_order(mobile='9123456789')
+    # One row per chunk: the first order's items straddle two chunks
+    lines = ''.join(generate_export('jsonl', with_items=True, chunk_size=1)).splitlines()
+    orders = [json.loads(line) for line in lines]
+    assert [order['id'] for order in orders] == [first, second]
+    assert [item['name'] for item in orders[0]['items']] == ['चावल (Rice)', 'Toor Dal']
+    assert len(orders[1]['items']) == 1
+
+
+def test_export_filters_by_mobile(db, make_order):
+    make_order()
+    wanted = make_order(mobile='9123456789')
+    lines = ''.join(generate_export('jsonl', mobile='9123456789')).splitlines()
+    assert [json.loads(line)['id'] for line in lines] == [wanted]
+
+
+def test_unknown_format_is_refused(db):
+    with pytest.raises(ValueError):
+        generate_export('xlsx')
+
+
+def test_export_route_streams_an_attachment(admin_client, make_order):
+    make_order()
+    response = admin_client.get('/admin/orders/export?format=jsonl')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert 'attachment' in response.headers['Content-Disposition']
+    assert len(response.get_data(as_text=True).splitlines()) == 1
@@ -0,0 +1,83 @@
+from datetime import datetime
+
+import pytest
+
+from models import decode_order_cursor, get_orders_page
+
+
+@pytest.fixture
+def orders(db, make_order):
+    """Seven orders, all placed at the same moment: only their ids order them."""
+    from models import Order
+
+    ids = [make_order() for _ in range(7)]
+    db.session.execute(db.update(Order).values(date=datetime(2026, 10, 1, 9, 30)))
+    db.session.commit()
+    return ids
+
+
+def page_ids(page):
+    return [order.id for order in page['orders']]
+
+
+def walk(limit, **filters):
+    """Every page from newest to oldest, as lists of ids."""
+    pages = [get_orders_page(limit=limit, **filters)]
+    while pages[-1]['next_cursor']:
+        pages.append(get_orders_page(after=pages[-1]['next_cursor'], limit=limit, **filters))
+    return pages
+
+
+def test_ties_on_date_are_ordered_by_id(orders):
+    pages = walk(limit=3)
+    assert [page_ids(page) for page in pages] == [orders[6:3:-1], orders[3:0:-1], orders[:1]]
+    assert pages[0]['prev_cursor'] is None
+    assert pages[-1]['next_cursor'] is None
+
+
+def test_previous_page_across_ties(orders):
+    first, second = walk(limit=3)[:2]
+    back = get_orders_page(before=second['prev_cursor'], limit=3)
+    assert page_ids(back) == page_ids(first)
+    assert back['prev_cursor'] is None
+
+
+def test_page_size_equal_to_row_count(orders):
+    pages = walk(limit=7)
+    assert len(pages) == 1
+    assert page_ids(pages[0]) == orders[::-1]
+
+
+def test_deleted_cursor_row_does_not_skip_or_repeat(orders):
+    from models import delete_order
+
+    first = get_orders_page(limit=3)
+    # The order the cursor points at is gone before the next page is read
+    delete_order(first['orders'][-1].id)
+    second = get_orders_page(after=first['next_cursor'], limit=3)
+    assert page_ids(second) == orders[3:0:-1]
+
+
+def test_rows_deleted_between_pages_are_just_missing(orders):
+    from models import delete_order
+
+    first = get_orders_page(limit=3)
+    delete_order(orders[2])
+    delete_order(orders[0])
+    second = get_orders_page(after=first['next_cursor'], limit=3)
+    assert page_ids(second) == [orders[3], orders[1]]
+    assert second['next_cursor'] is None
+
+
+def test_invalid_cursor_reads_the_first_page(orders):
+    assert decode_order_cursor('not-a-cursor') is None
+    assert page_ids(get_orders_page(after='not-a-cursor', limit=3)) == orders[6:3:-1]
+
+
+def test_cursor_respects_filters(orders):
+    from models import update_order_status
+
+    for order_id in orders[::2]:
+        update_order_status(order_id, 'delivered')
+    pages = walk(limit=2, status='delivered')
+    assert [order_id for page in pages for order_id in page_ids(page)] == orders[::-2]
@@ -0,0 +1,29 @@
+import pytest
+
+import page_cache
+
+
+@pytest.fixture
+def page_backend(monkeypatch):
+    backend = page_cache.MemoryBackend()
+    monkeypatch.setattr(page_cache, '_backend', backend)
+    return backend
+
+
+def test_unread_query_params_share_the_cached_page(client, page_backend):
+    assert client.get('/products').status_code == 200
+    client.get('/products?utm_source=whatsapp')
+    client.get('/products?_=1697000000')
+    assert len(page_backend._pages) == 1
+
+
+def test_read_query_params_get_their_own_page(client, page_backend):
+    from models import add_product
+    add_product('चावल (Rice) - 1kg', 60.0)
+    add_product('Toor Dal', 120.0)
+
+    rice = client.get('/products?search=rice&utm_source=x')
+    dal = client.get('/products?search=dal')
+    assert len(page_backend._pages) == 2
+    assert 'Rice' in rice.get_data(as_text=True)
+    assert 'Rice' not in dal.get_data(as_text=True)
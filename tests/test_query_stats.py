@@ -0,0 +1,30 @@
+from query_stats import assert_constant_query_count, count_queries
+
+
+def test_admin_orders_query_count_is_constant(admin_client, make_order, db):
+    from models import Order
+
+    def add_orders(count):
+        items = [
+            {'id': 1, 'name': 'चावल (Rice)', 'price': 50.0, 'qty': 2},
+            {'id': 2, 'name': 'दाल (Dal)', 'price': 90.0, 'qty': 1},
+        ]
+        for _ in range(count - Order.query.count()):
+            make_order(items=items)
+
+    def list_orders():
+        response = admin_client.get('/admin/orders')
+        assert response.status_code == 200
+
+    assert_constant_query_count(list_orders, add_orders, sizes=(1, 10, 30))
+
+
+def test_count_queries_nests(db):
+    from models import Product
+
+    with count_queries() as outer:
+        Product.query.count()
+        with count_queries() as inner:
+            Product.query.count()
+    assert inner.count == 1
+    assert outer.count == 2
@@ -0,0 +1,76 @@
+import random
+
+import pytest
+
+from sales_rollups import get_sales_summary, recompute_rollups
+
+
+def summary_numbers(summary):
+    """The summary's numbers, for comparing two summaries."""
+    return {
+        'totals': summary['totals'],
+        'trend': [(point['day'], point['order_count'], point['revenue']) for point in summary['trend']],
+        'hourly': [(point['hour'], point['order_count'], point['revenue']) for point in summary['hourly']],
+    }
+
+
+def test_incremental_rollups_match_a_recompute(db, make_order):
+    from models import delete_order, update_order_status
+
+    rng = random.Random(7)
+    order_ids = []
+    for _ in range(40):
+        items = [{'id': rng.randint(1, 5), 'name': 'Item', 'price': rng.choice([12.5, 40.0, 99.0]),
+                  'qty': rng.randint(1, 3)}]
+        order_ids.append(make_order(items=items, payment_method=rng.choice(['cod', 'upi'])))
+    for _ in range(60):
+        update_order_status(rng.choice(order_ids), rng.choice(['pending', 'confirmed', 'delivered', 'cancelled']))
+    for order_id in rng.sample(order_ids, 8):
+        delete_order(order_id)
+
+    incremental = summary_numbers(get_sales_summary())
+    recompute_rollups()
+    recomputed = summary_numbers(get_sales_summary())
+
+    assert incremental['totals'] == pytest.approx(recomputed['totals'])
+    for trend in ('trend', 'hourly'):
+        for before, after in zip(incremental[trend], recomputed[trend]):
+            assert before[0] == after[0]
+            assert before[1:] == pytest.approx(after[1:])
+    assert sum(point[1] for point in incremental['hourly']) == incremental['totals']['order_count']
+
+
+def test_cancelled_orders_add_no_revenue(db, make_order):
+    from models import update_order_status
+
+    make_order(items=[{'id': 1, 'name': 'Rice', 'price': 60.0, 'qty': 1}], payment_method='upi')
+    cancelled = make_order(items=[{'id': 1, 'name': 'Rice', 'price': 60.0, 'qty': 2}], payment_method='upi')
+    update_order_status(cancelled, 'cancelled')
+
+    totals = get_sales_summary()['totals']
+    assert totals['order_count'] == 2
+    assert totals['cancelled_count'] == 1
+    assert totals['revenue'] == totals['upi_revenue'] == 60.0
+    assert totals['average_basket'] == 60.0
+
+    # Un-cancelling puts the revenue back
+    update_order_status(cancelled, 'confirmed')
+    assert get_sales_summary()['totals']['revenue'] == 180.0
+
+
+def test_orders_land_in_their_day_and_hour(db, make_order):
+    from datetime import datetime, timedelta
+    from models import db as database, Order
+    from sales_rollups import recompute_rollups
+
+    ids = [make_order(), make_order(), make_order()]
+    now = datetime(2026, 10, 1, 12, 20)
+    database.session.execute(database.update(Order).where(Order.id == ids[0]).values(date=now - timedelta(hours=1)))
+    database.session.execute(database.update(Order).where(Order.id.in_(ids[1:])).values(date=now))
+    database.session.commit()
+    recompute_rollups()
+
+    summary = get_sales_summary(days=2, hours=3, now=now)
+    assert [point['order_count'] for point in summary['hourly']] == [0, 1, 2]
+    assert [point['hour'].hour for point in summary['hourly']] == [10, 11, 12]
+    assert [point['order_count'] for point in summary['trend']] == [0, 3]
@@ -0,0 +1,77 @@
+from catalog_cache import CatalogSnapshot, CatalogProduct, get_catalog
+from search_index import ProductSearchIndex, tokenize
+
+
+PRODUCTS = [
+    (1, 'चावल (Rice) - 1kg'),
+    (2, 'बासमती चावल (Basmati Rice) - 5kg'),
+    (3, 'तूर दाल (Toor Dal)'),
+    (4, 'Dal Makhani Masala'),
+]
+
+
+def test_tokens_keep_devanagari_matras_together():
+    assert tokenize('बासमती चावल (Basmati Rice) - 5kg') == ['बासमती', 'चावल', 'basmati', 'rice', '5kg']
+
+
+def test_every_query_token_must_match():
+    index = ProductSearchIndex(PRODUCTS)
+    assert sorted(index.search('rice')) == [1, 2]
+    assert index.search('basmati rice') == [2]
+    assert index.search('चावल') == [1, 2]
+    assert index.search('rice dal') == []
+
+
+def test_exact_match_ranks_before_prefix_and_substring():
+    index = ProductSearchIndex(PRODUCTS + [(5, 'Ricebran Oil'), (6, 'Puffed Rice Mix')])
+    # Exact "rice" tokens first (shorter name first), then the "ricebran" prefix
+    assert index.search('rice') == [6, 1, 2, 5]
+    # All substring matches: shortest names win
+    assert index.search('ice', limit=2) == [5, 6]
+
+
+def test_short_and_substring_queries():
+    index = ProductSearchIndex(PRODUCTS)
+    assert sorted(index.search('al')) == [3, 4]
+    assert index.search('makh') == [4]
+    assert index.search('   ') == []
+
+
+def product(product_id, name, is_available=True):
+    return CatalogProduct(product_id, name, 10.0, 'default.png', is_available, None)
+
+
+def test_snapshot_reuses_index_when_names_are_unchanged():
+    first = CatalogSnapshot(1, [product(1, 'Rice'), product(2, 'Dal')])
+    # A sell-out changes availability, not names
+    second = CatalogSnapshot(2, [product(1, 'Rice', is_available=False), product(2, 'Dal')], first)
+    assert second.search_index is first.search_index
+    assert [p.id for p in second.available] == [2]
+
+
+def test_snapshot_rebuilds_index_when_a_name_changes():
+    first = CatalogSnapshot(1, [product(1, 'Rice'), product(2, 'Dal')])
+    renamed = CatalogSnapshot(2, [product(1, 'Basmati Rice'), product(2, 'Dal')], first)
+    added = CatalogSnapshot(3, [product(1, 'Rice'), product(2, 'Dal'), product(3, 'Sugar')], first)
+    assert renamed.search_index is not first.search_index
+    assert [p.id for p in renamed.search('basmati')] == [1]
+    assert added.search_index is not first.search_index
+
+
+def test_catalog_follows_the_generation(db):
+    from models import add_product, set_product_stock, update_product
+
+    rice = add_product('चावल (Rice) - 1kg', 60.0, stock=5)
+    first = get_catalog()
+    assert [p.id for p in first.search('rice')] == [rice]
+
+    set_product_stock(rice, 0)
+    sold_out = get_catalog()
+    assert sold_out is not first
+    assert sold_out.search_index is first.search_index
+    assert sold_out.get(rice).is_available is False
+
+    update_product(rice, 'Basmati Rice', 90.0)
+    renamed = get_catalog()
+    assert renamed.search_index is not first.search_index
+    assert [p.id for p in renamed.search('basmati')] == [rice]
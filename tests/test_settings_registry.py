@@ -0,0 +1,46 @@
+import pytest
+
+from models import get_all_settings, update_settings
+from settings_registry import SettingsSnapshot, coerce_setting, get_settings
+
+
+def test_times_are_made_canonical():
+    assert coerce_setting('shop_open_time', ' 7:05 ') == '07:05'
+
+
+@pytest.mark.parametrize('value', ['25:00', '8am', ''])
+def test_invalid_times_are_refused(value):
+    with pytest.raises(ValueError):
+        coerce_setting('shop_close_time', value)
+
+
+def test_unknown_keys_pass_through():
+    assert coerce_setting('delivery_note', ' as typed ') == ' as typed '
+
+
+def test_snapshot_falls_back_to_defaults():
+    snapshot = SettingsSnapshot(1, {'shop_open_time': 'soon', 'shop_phone': '9000000000'})
+    assert snapshot['shop_open_time'] == '08:00'
+    assert snapshot['shop_close_time'] == '21:00'
+    assert snapshot['shop_phone'] == '9000000000'
+    with pytest.raises(TypeError):
+        snapshot.values['shop_phone'] = 'x'
+
+
+def test_update_is_validated_and_seen_at_once(db):
+    before = get_settings()
+    update_settings({'shop_open_time': '9:30', 'shop_close_time': '22:00'})
+    after = get_settings()
+    assert after is not before
+    assert after['shop_open_time'] == '09:30'
+    assert get_all_settings()['shop_open_time'] == '09:30'
+    assert get_settings() is after
+
+
+def test_invalid_update_changes_nothing(admin_client):
+    response = admin_client.post('/admin/settings', data={
+        'open_time': '10:00', 'close_time': 'late', 'phone': '9000000000'
+    })
+    assert response.status_code == 302
+    assert get_settings()['shop_open_time'] == '08:00'
+    assert get_all_settings()['shop_phone'] != '9000000000'
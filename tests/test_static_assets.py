@@ -0,0 +1,85 @@
+import gzip
+
+import pytest
+
+import static_assets
+from static_assets import asset_url, build_asset_manifest, fingerprinted_name
+
+
+CSS = 'body { color: #333; }\n' * 40
+
+
+@pytest.fixture
+def static(tmp_path, monkeypatch):
+    """A static folder of its own, built into a manifest."""
+    folder = tmp_path / 'static'
+    build_dir = tmp_path / 'build'
+    (folder / 'css').mkdir(parents=True)
+    (folder / 'css' / 'style.css').write_text(CSS)
+    (folder / 'logo.png').write_bytes(b'\x89PNG not really')
+    monkeypatch.setattr(static_assets, 'STATIC_FOLDER', str(folder))
+    monkeypatch.setattr(static_assets, 'ASSET_BUILD_DIR', str(build_dir))
+    build_asset_manifest(str(folder), str(build_dir))
+    yield folder
+    static_assets._reset()
+
+
+def url(app, filename):
+    with app.test_request_context():
+        return asset_url('static', filename=filename)
+
+
+def test_fingerprinted_name():
+    assert fingerprinted_name('images/logo.png', 'abc123') == 'images/logo.abc123.png'
+
+
+def test_manifest_compresses_text_files_only(static):
+    manifest = static_assets.get_asset_manifest()
+    assert 'gzip' in manifest['css/style.css']['encodings']
+    assert manifest['logo.png']['encodings'] == []
+    built = static.parent / 'build' / 'css' / 'style.css.gz'
+    assert gzip.decompress(built.read_bytes()).decode() == CSS
+
+
+def test_urls_change_with_the_content(app, static):
+    first = url(app, 'css/style.css')
+    digest = static_assets.get_asset_manifest()['css/style.css']['hash']
+    assert first == f'/assets/css/style.{digest}.css'
+
+    (static / 'css' / 'style.css').write_text(CSS + 'p {}\n')
+    assert url(app, 'css/style.css') != first
+    assert url(app, 'missing.css') == '/static/missing.css'
+
+
+def test_current_asset_is_immutable(client, static):
+    response = client.get(url(client.application, 'logo.png'))
+    assert response.status_code == 200
+    assert response.cache_control.max_age == static_assets.ONE_YEAR
+    assert response.cache_control.immutable and response.cache_control.public
+
+
+def test_precompressed_copy_is_served(client, static):
+    response = client.get(url(client.application, 'css/style.css'), headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.vary
+    assert gzip.decompress(response.get_data()).decode() == CSS
+
+    plain = client.get(url(client.application, 'css/style.css'))
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.get_data(as_text=True) == CSS
+
+
+def test_outdated_fingerprint_gets_the_current_file_uncached(client, static):
+    old = url(client.application, 'logo.png')
+    (static / 'logo.png').write_bytes(b'\x89PNG new logo')
+    response = client.get(old)
+    assert response.status_code == 200
+    assert response.get_data() == b'\x89PNG new logo'
+    assert response.cache_control.no_cache
+    assert not response.cache_control.immutable
+
+
+@pytest.mark.parametrize('path', ['/assets/logo.png', '/assets/missing.0123456789ab.png',
+                                  '/assets/..%2Fconfig.0123456789ab.py'])
+def test_unknown_assets_are_not_found(client, static, path):
+    assert client.get(path).status_code == 404